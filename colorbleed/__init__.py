@@ -6,6 +6,7 @@ import avalon.api
 
 from .launcher_actions import register_launcher_actions
 from .lib import collect_container_metadata
+from . import dbprofile
 
 PACKAGE_DIR = os.path.dirname(__file__)
 PLUGINS_DIR = os.path.join(PACKAGE_DIR, "plugins")
@@ -43,6 +44,9 @@ def install():
         except Exception as exc:
             print(exc)
 
+    # Record the database queries when enabled with CB_DB_PROFILE
+    dbprofile.install()
+
 
 def uninstall():
     print("Deregistering global plug-ins..")
@@ -50,3 +54,5 @@ def uninstall():
     avalon.api.deregister_plugin_path(avalon.api.Loader, LOAD_PATH)
 
     pyblish.api.deregister_target("local")
+
+    dbprofile.uninstall()
@@ -0,0 +1,491 @@
+"""Caching of database documents.
+
+A publish queries the same project, asset and subset documents for every
+instance. The `DocumentCache` is a read-through cache that can be used in
+place of `avalon.io` for those lookups so that each unique query only hits
+the database once per publish.
+
+Example:
+    >>> cache = get_document_cache(instance.context)
+    >>> asset = cache.find_one({"type": "asset", "name": "hero"})
+
+Outside of publishing the `TTLCache` keeps data around for a limited time
+so that host callbacks don't query the database on every call.
+
+"""
+
+import os
+import copy
+import json
+import time
+import logging
+import threading
+
+from avalon import io, api
+from bson import json_util
+from bson.errors import InvalidId
+
+log = logging.getLogger(__name__)
+
+DEFAULT_SESSION_CACHE_TTL = 60.0
+
+
+def _freeze(value):
+    """Return a hashable representation of a query value"""
+    if isinstance(value, dict):
+        return tuple(sorted((str(key), _freeze(item))
+                            for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, set):
+        return tuple(sorted(_freeze(item) for item in value))
+    return value
+
+
+def _get_types(query):
+    """Return the document types a query filters on, None when unknown"""
+    document_type = query.get("type")
+    if document_type is None:
+        return None
+    if isinstance(document_type, dict):
+        types = document_type.get("$in")
+        return set(types) if types is not None else None
+    return {document_type}
+
+
+class DocumentCache(object):
+    """Read-through cache for `avalon.io` document queries.
+
+    The results are cached by their query, projection and sort so only
+    identical queries share their results. Copies of the cached documents
+    are returned so callers can freely edit the returned documents.
+
+    The cache does not know about changes to the database, so whoever
+    inserts or updates documents that may have been cached must call
+    `invalidate` with the changed document types.
+
+    Args:
+        database (module, optional): The database to query, this should
+            implement `find` and `find_one` like `avalon.io`.
+            Defaults to `avalon.io`.
+
+    """
+
+    def __init__(self, database=None):
+        self.database = database or io
+        self.hits = 0
+        self.misses = 0
+
+        self._cache = dict()
+
+        # Whether document ids exist per document type
+        self._ids = dict()
+
+    def find_one(self, filter, projection=None, sort=None):
+        """Return the first document matching the filter like `io.find_one`
+
+        Args:
+            filter (dict): The query filter.
+            projection (dict, optional): The fields to return.
+            sort (list, optional): List of (key, direction) pairs.
+
+        Returns:
+            dict or None: The matching document.
+
+        """
+        key = ("find_one", _freeze(filter), _freeze(projection), _freeze(sort))
+        if key in self._cache:
+            self.hits += 1
+        else:
+            self.misses += 1
+            document = self.database.find_one(filter,
+                                              projection=projection,
+                                              sort=sort)
+            self._cache[key] = (_get_types(filter), document)
+            if document is not None:
+                self._remember_ids(filter, [document])
+
+        return copy.deepcopy(self._cache[key][1])
+
+    def find(self, filter, projection=None, sort=None):
+        """Return all documents matching the filter like `io.find`
+
+        Unlike `io.find` this returns a list instead of a cursor.
+
+        Args:
+            filter (dict): The query filter.
+            projection (dict, optional): The fields to return.
+            sort (list, optional): List of (key, direction) pairs.
+
+        Returns:
+            list: The matching documents.
+
+        """
+        key = ("find", _freeze(filter), _freeze(projection), _freeze(sort))
+        if key in self._cache:
+            self.hits += 1
+        else:
+            self.misses += 1
+            cursor = self.database.find(filter,
+                                        projection=projection,
+                                        sort=sort)
+            documents = list(cursor)
+            self._cache[key] = (_get_types(filter), documents)
+            self._remember_ids(filter, documents)
+
+        return copy.deepcopy(self._cache[key][1])
+
+    def distinct(self, key, filter):
+        """Return the distinct values for `key` of the matching documents
+
+        Args:
+            key (str): The field to return the distinct values for.
+            filter (dict): The query filter.
+
+        Returns:
+            list: The distinct values.
+
+        """
+        cache_key = ("distinct", key, _freeze(filter))
+        if cache_key in self._cache:
+            self.hits += 1
+        else:
+            self.misses += 1
+            values = self.database.distinct(key, filter)
+            self._cache[cache_key] = (_get_types(filter), list(values))
+
+        return list(self._cache[cache_key][1])
+
+    def _remember_ids(self, filter, documents):
+        """Store the ids of found documents as existing for their type"""
+        types = _get_types(filter)
+        if not types or len(types) != 1:
+            return
+
+        known = self._ids.setdefault(next(iter(types)), dict())
+        for document in documents:
+            if "_id" in document:
+                known[str(document["_id"])] = True
+
+    def get_existing_ids(self, ids, document_type):
+        """Return which of the ids exist as documents of the type
+
+        Only the ids that were not looked up or found by other queries of
+        this cache before are queried, all of them in a single query.
+
+        Args:
+            ids (list): Document ids as string or ObjectId.
+            document_type (str): The document type, e.g. "asset".
+
+        Returns:
+            set: The ids (str) that exist in the database.
+
+        """
+        known = self._ids.setdefault(document_type, dict())
+
+        ids = set(str(_id) for _id in ids)
+        unknown = dict()
+        for _id in ids:
+            if _id in known:
+                continue
+            try:
+                unknown[_id] = io.ObjectId(_id)
+            except InvalidId:
+                known[_id] = False
+
+        if unknown:
+            self.misses += 1
+            found = self.database.find({"_id": {"$in": list(unknown.values())},
+                                        "type": document_type},
+                                       projection={"_id": True})
+            found = set(str(doc["_id"]) for doc in found)
+            for _id in unknown:
+                known[_id] = _id in found
+        else:
+            self.hits += 1
+
+        return set(_id for _id in ids if known[_id])
+
+    def invalidate(self, types=None):
+        """Remove cached results that may include documents of `types`
+
+        Queries that do not filter on a document type are always removed
+        because they could match any document.
+
+        Args:
+            types (list, optional): The changed document types, e.g.
+                ["subset", "version"]. When not provided the full cache
+                is cleared.
+
+        """
+        if types is None:
+            self._cache.clear()
+            self._ids.clear()
+            return
+
+        types = set(types)
+        for document_type in types:
+            self._ids.pop(document_type, None)
+
+        for key, (cached_types, _) in list(self._cache.items()):
+            if cached_types is None or cached_types & types:
+                self._cache.pop(key)
+
+    def clear(self):
+        """Clear the full cache"""
+        self._cache.clear()
+        self._ids.clear()
+
+
+def get_document_cache(context):
+    """Return the document cache shared by the plug-ins of a publish
+
+    The cache is stored in the context's data as "documentCache".
+
+    Args:
+        context (pyblish.api.Context): The publish context.
+
+    Returns:
+        DocumentCache: The document cache of the context.
+
+    """
+    cache = context.data.get("documentCache")
+    if cache is None:
+        cache = DocumentCache()
+        context.data["documentCache"] = cache
+    return cache
+
+
+def add_document_snapshot(context, documents):
+    """Serve the document cache of the context from a snapshot first
+
+    Args:
+        context (pyblish.api.Context): The publish context.
+        documents (list): Serialized documents, see `create_snapshot`.
+
+    """
+    cache = get_document_cache(context)
+    if not isinstance(cache.database, DocumentSnapshot):
+        cache.database = DocumentSnapshot(database=cache.database)
+        cache.clear()
+
+    cache.database.add(deserialize_documents(documents))
+
+
+def serialize_documents(documents):
+    """Return the documents as JSON compatible data
+
+    Values like ObjectId and datetime are converted to their MongoDB
+    Extended JSON representation so they can be restored with
+    `deserialize_documents`.
+
+    """
+    return json.loads(json_util.dumps(documents))
+
+
+def deserialize_documents(data):
+    """Return the documents from data created by `serialize_documents`"""
+    return json_util.loads(json.dumps(data))
+
+
+def create_snapshot(asset_name):
+    """Return the documents a publish of an asset queries
+
+    This only includes the project and the asset, the subsets and versions
+    change while publishing so those are always queried from the database.
+
+    Args:
+        asset_name (str): The asset name.
+
+    Returns:
+        list: The serialized documents, see `serialize_documents`.
+
+    """
+
+    project = io.find_one({"type": "project",
+                           "name": api.Session["AVALON_PROJECT"]})
+    asset = io.find_one({"type": "asset",
+                         "name": asset_name,
+                         "parent": project["_id"]})
+    assert asset, "Asset not found: %s" % asset_name
+
+    return serialize_documents([project, asset])
+
+
+def _get_value(document, key):
+    """Return the value of a (dotted) key of the document"""
+    value = document
+    for part in key.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _matches(document, filter):
+    """Return whether the document matches the query filter
+
+    Raises:
+        ValueError: When the filter uses an unsupported query operator.
+
+    """
+    for key, expected in filter.items():
+        if key.startswith("$"):
+            raise ValueError("Unsupported query operator: %s" % key)
+
+        value = _get_value(document, key)
+        if isinstance(expected, dict):
+            if list(expected) != ["$in"]:
+                raise ValueError("Unsupported query: %s" % expected)
+            if value not in expected["$in"]:
+                return False
+        elif value != expected:
+            return False
+
+    return True
+
+
+class DocumentSnapshot(object):
+    """Read-only set of documents to query instead of the database.
+
+    This serves `find_one` queries from the documents in the snapshot so
+    that for example farm jobs don't need to query the database for the
+    documents that were already known at submission. Only the documents of
+    `types` are served, e.g. the subsets and versions are created and
+    updated by other publishes so a snapshot of those would be outdated.
+
+    Only unsorted equality and `$in` queries on the type of the documents
+    are supported. Other queries, queries that don't match any of the
+    documents and all other functions are passed on to the database.
+
+    Projections are ignored, the full documents are returned.
+
+    Args:
+        documents (list, optional): The documents.
+        database (module, optional): The database for the queries that
+            can't be served from the snapshot. Defaults to `avalon.io`.
+
+    """
+
+    # The document types that don't change while publishing
+    types = frozenset(["project", "asset"])
+
+    def __init__(self, documents=None, database=None):
+        self.database = database or io
+        self.documents = list()
+        self.misses = 0
+
+        if documents:
+            self.add(documents)
+
+    def add(self, documents):
+        """Add the documents of the snapshot's `types` to the snapshot"""
+        self.documents.extend(document for document in documents
+                              if document.get("type") in self.types)
+
+    def find_one(self, filter, projection=None, sort=None):
+        """Return the first matching document like `io.find_one`"""
+        documents = []
+        types = _get_types(filter)
+        if not sort and types and types <= self.types:
+            try:
+                documents = [document for document in self.documents
+                             if _matches(document, filter)]
+            except ValueError:
+                pass
+
+        if not documents:
+            self.misses += 1
+            log.debug("Snapshot miss, querying database: %s", filter)
+            return self.database.find_one(filter,
+                                          projection=projection,
+                                          sort=sort)
+
+        return documents[0]
+
+    def find(self, filter, projection=None, sort=None):
+        """Pass on to the database, the snapshot may be incomplete"""
+        return self.database.find(filter, projection=projection, sort=sort)
+
+    def distinct(self, key, filter):
+        """Pass on to the database, the snapshot may be incomplete"""
+        return self.database.distinct(key, filter)
+
+
+def get_session_cache_ttl():
+    """Return the time in seconds to keep session data cached.
+
+    This can be overridden with the `CB_SESSION_CACHE_TTL` environment
+    variable. A value of 0 disables the caching.
+
+    Returns:
+        float: The time to live in seconds.
+
+    """
+    value = os.environ.get("CB_SESSION_CACHE_TTL")
+    if not value:
+        return DEFAULT_SESSION_CACHE_TTL
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        log.warning("Invalid CB_SESSION_CACHE_TTL value: %s", value)
+        return DEFAULT_SESSION_CACHE_TTL
+
+
+class TTLCache(object):
+    """Cache of values that expire after a time to live.
+
+    The cache is thread-safe. Copies of the cached values are returned
+    so callers can freely edit the returned values.
+
+    Args:
+        ttl (float, optional): The time in seconds the values remain valid.
+            Defaults to `get_session_cache_ttl()`.
+
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = get_session_cache_ttl() if ttl is None else ttl
+
+        self._cache = dict()
+        self._lock = threading.Lock()
+
+    def get(self, key, factory):
+        """Return the value for key, using `factory()` when not cached
+
+        Args:
+            key (hashable): The key of the value.
+            factory (callable): Function returning the value to cache
+                when the key is not cached or has expired.
+
+        Returns:
+            object: The value.
+
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(key)
+
+        if cached is None or now - cached[0] >= self.ttl:
+            value = factory()
+            if self.ttl > 0:
+                with self._lock:
+                    self._cache[key] = (now, value)
+        else:
+            value = cached[1]
+
+        return copy.deepcopy(value)
+
+    def invalidate(self, key=None):
+        """Remove the cached value for key, or all values when not provided
+
+        Args:
+            key (hashable, optional): The key to remove.
+
+        """
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
@@ -0,0 +1,255 @@
+"""Instrumentation of the database queries done through `avalon.io`.
+
+The profiler wraps the query functions of `avalon.io` to record the amount
+of calls and the time spent per calling plug-in and function. This is
+opt-in and only installed when the `CB_DB_PROFILE` environment variable is
+set, see `install()`. The queries of each publish are reported when the
+publish finished, also when it failed, see `report()`.
+
+The time recorded for `find` only includes the creation of the cursor since
+the documents are fetched lazily while iterating it.
+
+Example:
+    >>> profiler.install()
+    >>> pyblish.util.publish()
+    >>> profiler.summary()["total"]
+    {'count': 125, 'time': 0.8}
+
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import functools
+from collections import defaultdict
+
+import pyblish.api
+import avalon.api
+from avalon import io
+
+log = logging.getLogger(__name__)
+
+METHODS = ["find",
+           "find_one",
+           "distinct",
+           "aggregate",
+           "insert_one",
+           "insert_many",
+           "update_one",
+           "update_many",
+           "replace_one",
+           "save",
+           "delete_one",
+           "delete_many"]
+
+# Frames of these modules are skipped when finding the calling function
+_SKIP_MODULES = {__name__, io.__name__, "colorbleed.dbcache"}
+
+
+def is_enabled():
+    """Return whether database profiling is enabled with `CB_DB_PROFILE`"""
+    return os.environ.get("CB_DB_PROFILE", "").lower() in ("1", "true")
+
+
+def _get_plugin_name(frame):
+    """Return the name of the plug-in or loader the frame belongs to"""
+    for name in ("self", "cls"):
+        obj = frame.f_locals.get(name)
+        if obj is None:
+            continue
+        cls = obj if isinstance(obj, type) else type(obj)
+        if issubclass(cls, (pyblish.api.Plugin, avalon.api.Loader)):
+            return cls.__name__
+
+
+def _get_caller():
+    """Return the calling plug-in and function of the current query"""
+    frame = sys._getframe(2)
+    function = None
+    plugin = None
+    while frame is not None:
+        module = frame.f_globals.get("__name__")
+        if function is None and module not in _SKIP_MODULES:
+            function = "{0}.{1}".format(module, frame.f_code.co_name)
+        plugin = _get_plugin_name(frame)
+        if plugin:
+            break
+        frame = frame.f_back
+
+    return plugin, function
+
+
+class QueryProfiler(object):
+    """Record the database queries done through `avalon.io`
+
+    Args:
+        module (module, optional): The module to instrument.
+            Defaults to `avalon.io`.
+
+    """
+
+    def __init__(self, module=None):
+        self.module = module or io
+        self.installed = False
+
+        self._originals = dict()
+        self._records = defaultdict(lambda: [0, 0.0])
+        self._lock = threading.Lock()
+
+    def install(self):
+        """Wrap the query functions of the module"""
+        if self.installed:
+            return
+
+        for method in METHODS:
+            original = getattr(self.module, method, None)
+            if original is None:
+                continue
+            self._originals[method] = original
+            setattr(self.module, method, self._wrap(method, original))
+
+        self.installed = True
+        log.info("Installed database query profiler.")
+
+    def uninstall(self):
+        """Restore the original query functions of the module"""
+        for method, original in self._originals.items():
+            setattr(self.module, method, original)
+
+        self._originals.clear()
+        self.installed = False
+
+    def _wrap(self, method, original):
+
+        @functools.wraps(original)
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                duration = time.time() - start
+                plugin, function = _get_caller()
+                self.record(method, plugin, function, duration)
+
+        return wrapper
+
+    def record(self, method, plugin, function, duration):
+        """Record a single query
+
+        Args:
+            method (str): The query method, e.g. "find_one".
+            plugin (str or None): The calling plug-in or loader.
+            function (str or None): The calling function.
+            duration (float): The time spent in seconds.
+
+        """
+        with self._lock:
+            record = self._records[(method, plugin, function)]
+            record[0] += 1
+            record[1] += duration
+
+    def reset(self):
+        """Remove all recorded queries"""
+        with self._lock:
+            self._records.clear()
+
+    def summary(self):
+        """Return the amount of queries and time spent per caller
+
+        Returns:
+            dict: The "total" and per "plugins" and "functions" the "count"
+                and "time" of the queries, also split per query "methods".
+
+        """
+
+        def _add(entry, method, count, duration):
+            entry["count"] += count
+            entry["time"] += duration
+            methods = entry.setdefault("methods", dict())
+            stats = methods.setdefault(method, {"count": 0, "time": 0.0})
+            stats["count"] += count
+            stats["time"] += duration
+
+        def _new():
+            return {"count": 0, "time": 0.0}
+
+        total = _new()
+        plugins = defaultdict(_new)
+        functions = defaultdict(_new)
+        with self._lock:
+            records = list(self._records.items())
+
+        for (method, plugin, function), (count, duration) in records:
+            total["count"] += count
+            total["time"] += duration
+            _add(plugins[plugin or "<none>"], method, count, duration)
+            _add(functions[function or "<none>"], method, count, duration)
+
+        return {"total": total,
+                "plugins": dict(plugins),
+                "functions": dict(functions)}
+
+
+profiler = QueryProfiler()
+
+
+def report(context):
+    """Report the database queries done per plug-in during the publish.
+
+    The summary is stored in the context as "databaseQueries". When the
+    `CB_DB_PROFILE_DIR` environment variable is set the summary is also
+    written as JSON file into that folder.
+
+    This is called with the "published" signal of Pyblish, which is also
+    emitted when the publish failed.
+
+    Args:
+        context (pyblish.api.Context): The publish context.
+
+    """
+    if not profiler.installed or context is None:
+        return
+
+    summary = profiler.summary()
+    context.data["databaseQueries"] = summary
+
+    total = summary["total"]
+    log.info("Database queries: %s (%.3f seconds)" % (total["count"],
+                                                      total["time"]))
+
+    plugins = sorted(summary["plugins"].items(),
+                     key=lambda item: item[1]["count"],
+                     reverse=True)
+    for plugin, stats in plugins:
+        log.info("  %s: %s (%.3f seconds)" % (plugin,
+                                              stats["count"],
+                                              stats["time"]))
+
+    directory = os.environ.get("CB_DB_PROFILE_DIR")
+    if directory:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        fname = "database_queries_{0}.json".format(
+            context.data.get("time", "unknown"))
+        path = os.path.join(directory, fname)
+        log.info("Writing database query report: %s" % path)
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=4, sort_keys=True)
+
+
+def install():
+    """Install the query profiler when enabled with `CB_DB_PROFILE`"""
+    if is_enabled():
+        profiler.install()
+        pyblish.api.register_callback("published", report)
+
+
+def uninstall():
+    """Uninstall the query profiler"""
+    if profiler.installed:
+        profiler.uninstall()
+        pyblish.api.deregister_callback("published", report)
@@ -0,0 +1,359 @@
+"""Detect incomplete or corrupt image files from their headers.
+
+Only the headers (and for some formats the last bytes) of the files are
+read, the pixels are never decoded. This makes it fast enough to check
+every frame of long sequences, e.g. for frames that were only partially
+written because the render task was killed.
+
+Supported are OpenEXR, PNG, JPEG and TIFF files:
+
+    >>> check_image("beauty.1001.exr")
+    'Missing chunk 12 of 135 in offset table'
+
+"""
+
+import os
+import struct
+
+# OpenEXR scanlines per chunk for each compression
+_EXR_LINES_PER_CHUNK = {0: 1,     # NONE
+                        1: 1,     # RLE
+                        2: 1,     # ZIPS
+                        3: 16,    # ZIP
+                        4: 32,    # PIZ
+                        5: 16,    # PXR24
+                        6: 32,    # B44
+                        7: 32,    # B44A
+                        8: 32,    # DWAA
+                        9: 256}   # DWAB
+
+_EXR_MAGIC = b"\x76\x2f\x31\x01"
+_EXR_TILED = 0x200
+_EXR_NON_IMAGE = 0x800
+_EXR_MULTIPART = 0x1000
+
+_PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+_PNG_END = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+
+_JPEG_MAGIC = b"\xff\xd8\xff"
+_JPEG_END = b"\xff\xd9"
+
+# TIFF tags of the strip or tile data and their byte counts
+_TIFF_OFFSETS = {273: 279,   # StripOffsets: StripByteCounts
+                 324: 325}   # TileOffsets: TileByteCounts
+_TIFF_TYPES = {3: "H", 4: "I"}
+
+
+class InvalidImage(ValueError):
+    """Raised when an image file is incomplete or corrupt"""
+
+
+def _read(f, size):
+    """Read exactly size bytes from the file"""
+    data = f.read(size)
+    if len(data) != size:
+        raise InvalidImage("Unexpected end of file at byte "
+                           "{0}".format(f.tell()))
+    return data
+
+
+def _unpack(f, fmt):
+    return struct.unpack(fmt, _read(f, struct.calcsize(fmt)))
+
+
+def _read_exr_string(f):
+    """Read a null terminated attribute name or type"""
+    chars = []
+    while True:
+        char = _read(f, 1)
+        if char == b"\x00":
+            return b"".join(chars).decode("ascii", "replace")
+        chars.append(char)
+        if len(chars) > 255:
+            raise InvalidImage("Invalid header attribute name")
+
+
+def _read_exr_header(f):
+    """Return the attributes of an OpenEXR header as (type, value) pairs"""
+    header = dict()
+    while True:
+        name = _read_exr_string(f)
+        if not name:
+            return header
+
+        type_name = _read_exr_string(f)
+        size, = _unpack(f, "<i")
+        if size < 0:
+            raise InvalidImage("Invalid size of attribute: {0}".format(name))
+        header[name] = (type_name, _read(f, size))
+
+
+def _get_level_count(size, rounding):
+    """Return the amount of mipmap levels for the size in pixels"""
+    count = 0
+    while size > 1:
+        size = (size + rounding) // 2
+        count += 1
+    return count + 1
+
+
+def _get_level_size(size, level, rounding):
+    """Return the size in pixels at the mipmap level"""
+    divisor = 1 << level
+    return max(1, (size + (divisor - 1 if rounding else 0)) // divisor)
+
+
+def _get_exr_chunk_count(header, tiled):
+    """Return the amount of chunks in the offset table of the part"""
+    if "chunkCount" in header:
+        return struct.unpack("<i", header["chunkCount"][1])[0]
+
+    try:
+        xmin, ymin, xmax, ymax = struct.unpack("<4i",
+                                               header["dataWindow"][1])
+        compression = ord(header["compression"][1][:1])
+    except (KeyError, struct.error, TypeError):
+        raise InvalidImage("Missing dataWindow or compression attribute")
+
+    width = xmax - xmin + 1
+    height = ymax - ymin + 1
+    if width < 1 or height < 1:
+        raise InvalidImage("Invalid dataWindow: "
+                           "{0}".format((xmin, ymin, xmax, ymax)))
+
+    if not tiled:
+        lines = _EXR_LINES_PER_CHUNK.get(compression)
+        if lines is None:
+            # Unknown compression, the chunk count can't be computed
+            return None
+        return (height + lines - 1) // lines
+
+    try:
+        tile_width, tile_height, mode = struct.unpack(
+            "<IIB", header["tiles"][1]
+        )
+    except (KeyError, struct.error):
+        raise InvalidImage("Missing tiles attribute")
+    if not tile_width or not tile_height:
+        raise InvalidImage("Invalid tile size")
+
+    level_mode, rounding = mode & 0x0f, mode >> 4
+    if level_mode == 0:
+        x_levels = y_levels = [0]
+    elif level_mode == 1:
+        x_levels = range(_get_level_count(max(width, height), rounding))
+        y_levels = None
+    elif level_mode == 2:
+        x_levels = range(_get_level_count(width, rounding))
+        y_levels = range(_get_level_count(height, rounding))
+    else:
+        raise InvalidImage("Invalid tile level mode: {0}".format(mode))
+
+    def _get_tiles(x_level, y_level):
+        level_width = _get_level_size(width, x_level, rounding)
+        level_height = _get_level_size(height, y_level, rounding)
+        return (((level_width + tile_width - 1) // tile_width) *
+                ((level_height + tile_height - 1) // tile_height))
+
+    if y_levels is None:
+        # Mipmap levels scale down both directions at once
+        return sum(_get_tiles(level, level) for level in x_levels)
+    return sum(_get_tiles(x, y) for x in x_levels for y in y_levels)
+
+
+def _is_exr_tiled(header, version):
+    """Return whether the OpenEXR part is stored in tiles"""
+    kind = header.get("type", (None, b""))[1].rstrip(b"\x00")
+    if kind:
+        return kind in (b"tiledimage", b"deeptile")
+    return bool(version & _EXR_TILED)
+
+
+def _check_exr(f, size):
+    version, = _unpack(f, "<I")
+    if version & 0xff != 2:
+        raise InvalidImage("Unsupported OpenEXR version: "
+                           "{0}".format(version & 0xff))
+
+    multipart = bool(version & _EXR_MULTIPART)
+    headers = list()
+    while True:
+        header = _read_exr_header(f)
+        if not header:
+            break
+        headers.append(header)
+        if not multipart:
+            break
+
+    if not headers:
+        raise InvalidImage("Missing header")
+
+    counts = list()
+    for header in headers:
+        count = _get_exr_chunk_count(header, _is_exr_tiled(header, version))
+        if count is None:
+            return
+        counts.append(count)
+
+    # The offset tables of all parts directly follow the headers
+    total = sum(counts)
+    if total < 1:
+        raise InvalidImage("Empty offset table")
+    if f.tell() + total * 8 > size:
+        raise InvalidImage("Offset table is truncated")
+
+    offsets = struct.unpack("<{0}Q".format(total), _read(f, total * 8))
+    minimum = f.tell()
+    for index, offset in enumerate(offsets):
+        if offset < minimum or offset >= size:
+            raise InvalidImage("Missing chunk {0} of {1} in offset "
+                               "table".format(index + 1, total))
+
+    if version & _EXR_NON_IMAGE:
+        # Deep data chunks have a different layout, only check offsets
+        return
+
+    # The last chunk in the file must be complete
+    offset = max(offsets)
+    part = 0
+    if multipart:
+        f.seek(offset)
+        part, = _unpack(f, "<i")
+        if not 0 <= part < len(headers):
+            raise InvalidImage("Invalid part number in chunk")
+        offset += 4
+
+    if headers[part].get("type", (None, b""))[1].startswith(b"deep"):
+        return
+
+    coordinates = 16 if _is_exr_tiled(headers[part], version) else 4
+    f.seek(offset + coordinates)
+    data_size, = _unpack(f, "<i")
+    if offset + coordinates + 4 + data_size > size:
+        raise InvalidImage("Last chunk is truncated")
+
+
+def _check_png(f, size):
+    f.seek(8)
+    length, chunk_type = _unpack(f, ">I4s")
+    if chunk_type != b"IHDR" or length != 13:
+        raise InvalidImage("Missing IHDR chunk")
+
+    f.seek(max(0, size - len(_PNG_END)))
+    if f.read() != _PNG_END:
+        raise InvalidImage("Missing IEND chunk")
+
+
+def _check_jpeg(f, size):
+    # Allow some trailing padding after the end of image marker
+    f.seek(max(0, size - 1024))
+    if _JPEG_END not in f.read():
+        raise InvalidImage("Missing end of image marker")
+
+
+def _check_tiff(f, size):
+    f.seek(0)
+    order = "<" if _read(f, 2) == b"II" else ">"
+    magic, = _unpack(f, order + "H")
+    if magic == 43:
+        # BigTIFF, only the magic number is checked
+        return
+
+    ifd, = _unpack(f, order + "I")
+    if not 8 <= ifd < size:
+        raise InvalidImage("Invalid offset of first IFD: {0}".format(ifd))
+
+    f.seek(ifd)
+    count, = _unpack(f, order + "H")
+    entries = dict()
+    for _ in range(count):
+        tag, kind, amount, value = _unpack(f, order + "HHI4s")
+        entries[tag] = (kind, amount, value)
+
+    def _get_values(tag):
+        kind, amount, value = entries[tag]
+        fmt = _TIFF_TYPES.get(kind)
+        if fmt is None:
+            raise InvalidImage("Invalid type of TIFF tag {0}".format(tag))
+
+        fmt = "{0}{1}{2}".format(order, amount, fmt)
+        length = struct.calcsize(fmt)
+        if length > 4:
+            offset, = struct.unpack(order + "I", value)
+            if offset + length > size:
+                raise InvalidImage("TIFF tag {0} is truncated".format(tag))
+            f.seek(offset)
+            value = _read(f, length)
+        return struct.unpack(fmt, value[:length])
+
+    for offsets_tag, counts_tag in _TIFF_OFFSETS.items():
+        if offsets_tag not in entries or counts_tag not in entries:
+            continue
+
+        offsets = _get_values(offsets_tag)
+        counts = _get_values(counts_tag)
+        if not offsets or len(offsets) != len(counts):
+            raise InvalidImage("Invalid TIFF tag {0}".format(offsets_tag))
+        end = max(offset + count for offset, count in zip(offsets, counts))
+        if end > size:
+            raise InvalidImage("Image data is truncated")
+
+
+_CHECKS = [(_EXR_MAGIC, _check_exr),
+           (_PNG_MAGIC, _check_png),
+           (_JPEG_MAGIC, _check_jpeg),
+           (b"II*\x00", _check_tiff),
+           (b"MM\x00*", _check_tiff),
+           (b"II+\x00", _check_tiff),
+           (b"MM\x00+", _check_tiff)]
+
+EXTENSIONS = {".exr": _EXR_MAGIC,
+              ".png": _PNG_MAGIC,
+              ".jpg": _JPEG_MAGIC,
+              ".jpeg": _JPEG_MAGIC,
+              ".tif": None,
+              ".tiff": None}
+
+
+def is_supported(path):
+    """Return whether the file's extension is a supported image format"""
+    return os.path.splitext(path)[1].lower() in EXTENSIONS
+
+
+def check_image(path, size=None):
+    """Return the reason why the image file is incomplete or corrupt
+
+    Args:
+        path (str): The image file.
+        size (int, optional): The size of the file in bytes, when already
+            known.
+
+    Returns:
+        str or None: The reason, None when the file seems valid.
+
+    """
+    try:
+        with open(path, "rb") as f:
+            if size is None:
+                size = os.fstat(f.fileno()).st_size
+
+            magic = f.read(8)
+            for prefix, check in _CHECKS:
+                if magic.startswith(prefix):
+                    break
+            else:
+                return "Unknown image format"
+
+            expected = EXTENSIONS.get(os.path.splitext(path)[1].lower())
+            if expected is not None and expected != prefix:
+                return "File content does not match its extension"
+
+            f.seek(len(prefix))
+            check(f, size)
+
+    except InvalidImage as exc:
+        return str(exc)
+    except (IOError, OSError) as exc:
+        return "Unable to read file: {0}".format(exc)
+    except struct.error as exc:
+        return "Invalid header: {0}".format(exc)
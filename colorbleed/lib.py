@@ -1,17 +1,21 @@
 import os
 import re
 import sys
-import errno
+import hashlib
 import logging
 import importlib
+import threading
 import itertools
 
 from .vendor import pather
 from .vendor.pather.error import ParseError
-from .vendor import speedcopy
+from . import transfer
+from . import dbcache
+from . import sequence
 
 import avalon.io as io
 import avalon.api
+import pymongo.errors
 from avalon import schema
 from avalon.vendor import six
 
@@ -63,28 +67,145 @@ def is_latest(representation):
         return False
 
 
+def get_outdated_representations(representation_ids):
+    """Return whether the representations are from an older version
+
+    This resolves all representations with a constant number of queries
+    instead of querying the database per representation like `is_latest`.
+
+    Args:
+        representation_ids (list): The representation database ids as
+            string or ObjectId.
+
+    Returns:
+        dict: Representation id (str) to whether it is outdated (bool).
+            Representations that are missing in the database are excluded.
+
+    """
+
+    ids = set(io.ObjectId(str(_id)) for _id in representation_ids)
+    if not ids:
+        return {}
+
+    representations = list(io.find({"_id": {"$in": list(ids)},
+                                    "type": "representation"},
+                                   projection={"parent": True}))
+    if not representations:
+        return {}
+
+    version_ids = set(doc["parent"] for doc in representations)
+    versions = dict((doc["_id"], doc) for doc in io.find(
+        {"_id": {"$in": list(version_ids)}, "type": "version"},
+        projection={"parent": True, "name": True}
+    ))
+
+    # Get highest version name per subset
+    subset_ids = set(doc["parent"] for doc in versions.values())
+    highest = dict((doc["_id"], doc["name"]) for doc in io.aggregate([
+        {"$match": {"type": "version",
+                    "parent": {"$in": list(subset_ids)}}},
+        {"$group": {"_id": "$parent",
+                    "name": {"$max": "$name"}}}
+    ]))
+
+    outdated = dict()
+    for representation in representations:
+        version = versions.get(representation["parent"])
+        if version is None:
+            continue
+        latest = highest.get(version["parent"], version["name"])
+        outdated[str(representation["_id"])] = version["name"] != latest
+
+    return outdated
+
+
+def get_outdated_containers(containers):
+    """Return the outdated state of the containers
+
+    Args:
+        containers (list): The containers, e.g. from `host.ls()`.
+
+    Returns:
+        list: (container, outdated) pairs. The outdated state is None when
+            the container's representation is missing in the database.
+
+    """
+
+    containers = list(containers)
+    outdated = get_outdated_representations(
+        set(container["representation"] for container in containers)
+    )
+    return [(container, outdated.get(str(container["representation"])))
+            for container in containers]
+
+
 def any_outdated():
     """Return whether the current scene has any outdated content"""
 
-    checked = set()
     host = avalon.api.registered_host()
-    for container in host.ls():
-        representation = container['representation']
-        if representation in checked:
-            continue
-
-        representation_doc = io.find_one({"_id": io.ObjectId(representation),
-                                          "type": "representation"},
-                                         projection={"parent": True})
-        if representation_doc and not is_latest(representation_doc):
-            return True
-        elif not representation_doc:
+    result = False
+    for container, outdated in get_outdated_containers(host.ls()):
+        if outdated is None:
             log.debug("Container '{objectName}' has an invalid "
                       "representation, it is missing in the "
                       "database".format(**container))
+        elif outdated:
+            result = True
+
+    return result
 
-        checked.add(representation)
-    return False
+
+def any_outdated_async(callback, host=None, deferred=None):
+    """Check whether the current scene has outdated content in a thread
+
+    Only the representation ids of the containers are collected on the
+    calling thread, the database queries run in a background thread so
+    the host stays responsive.
+
+    Args:
+        callback (callable): Function called with whether any container
+            is outdated (bool).
+        host (module, optional): The host to list the containers from.
+            Defaults to the registered host.
+        deferred (callable, optional): Function used to invoke the
+            callback from the worker thread, e.g. `maya.utils.executeDeferred`
+            to run the callback on the main thread. When not provided the
+            callback is called from the worker thread.
+
+    Returns:
+        threading.Thread: The started worker thread.
+
+    """
+
+    if host is None:
+        host = avalon.api.registered_host()
+
+    # Snapshot the containers so the host is not accessed from the thread
+    representations = set(str(container["representation"])
+                          for container in host.ls())
+
+    def _check():
+        try:
+            outdated = get_outdated_representations(representations)
+        except Exception:
+            log.error("Failed to check for outdated content.", exc_info=True)
+            return
+
+        missing = len(representations) - len(outdated)
+        if missing:
+            log.debug("%s representation(s) of containers are missing in "
+                      "the database" % missing)
+
+        result = any(outdated.values())
+        if deferred is not None:
+            deferred(callback, result)
+        else:
+            callback(result)
+
+    thread = threading.Thread(target=_check, name="OutdatedCheck")
+    thread.daemon = True
+    thread.start()
+    return thread
 
 
 def update_task_from_path(path):
@@ -124,6 +245,7 @@ def update_task_from_path(path):
     if changes:
         log.info("Updating work task to: %s", context)
         avalon.api.update_current_task(**changes)
+        clear_session_cache()
 
 
 def _rreplace(s, a, b, n=1):
@@ -278,6 +400,16 @@ def collect_container_metadata(container):
     return hostlib.get_additional_data(container)
 
 
+# Cached project and asset data of the current session, this is cleared
+# whenever the current task changes. See `clear_session_cache`.
+session_cache = dbcache.TTLCache()
+
+
+def clear_session_cache():
+    """Clear the cached project and asset data of the current session"""
+    session_cache.invalidate()
+
+
 def get_asset_fps():
     """Returns project's FPS, if not found will return 25 by default
 
@@ -315,14 +447,14 @@ def get_project_data():
 
     """
 
-    project_name = io.active_project()
-    project = io.find_one({"name": project_name,
-                           "type": "project"},
-                          projection={"data": True})
-
-    data = project.get("data", {})
+    def _get_data():
+        project = io.find_one({"name": project_name,
+                               "type": "project"},
+                              projection={"data": True})
+        return project.get("data", {})
 
-    return data
+    project_name = io.active_project()
+    return session_cache.get(("project", project_name), _get_data)
 
 
 def get_asset_data(asset=None):
@@ -335,13 +467,15 @@ def get_asset_data(asset=None):
         dict
     """
 
-    asset_name = asset or avalon.api.Session["AVALON_ASSET"]
-    document = io.find_one({"name": asset_name,
-                            "type": "asset"})
-
-    data = document.get("data", {})
+    def _get_data():
+        document = io.find_one({"name": asset_name,
+                                "type": "asset"},
+                               projection={"data": True})
+        return document.get("data", {})
 
-    return data
+    asset_name = asset or avalon.api.Session["AVALON_ASSET"]
+    key = ("asset", avalon.api.Session["AVALON_PROJECT"], asset_name)
+    return session_cache.get(key, _get_data)
 
 
 def publish_remote():
@@ -377,6 +511,26 @@ def publish_remote():
     print("All good. Success!")
 
 
+def get_resource_store():
+    """Return the content-addressed resource store of the current project.
+
+    The store is only used when the `CB_RESOURCE_STORE` environment variable
+    is set to "1" or "True". It is located in the project's resources folder.
+
+    Returns:
+        colorbleed.transfer.ResourceStore or None: The store, if enabled.
+
+    """
+    if os.environ.get("CB_RESOURCE_STORE") not in {"1", "True"}:
+        return None
+
+    root = os.path.join(avalon.api.registered_root(),
+                        avalon.api.Session["AVALON_PROJECT"],
+                        "resources",
+                        "store")
+    return transfer.ResourceStore(root)
+
+
 class Integrator(object):
     """Integrate the instance into the database and to published location.
 
@@ -414,9 +568,16 @@ class Integrator(object):
             This is optional because "files" and "stagingDir" are provided and
             those will result in transfers too.
 
+        stagingTransferMode (str): How to transfer the files inside the
+            staging directory: "copy" (default), "hardlink" or "move". Only
+            use "move" when no other plug-in reads the staged files after
+            integration. See `colorbleed.plugin.Extractor`.
+
         assumedTemplateData (dict): Destination data collected
             by CollectAssumedDestination collector. Used to validate the
             collected information is still correct at this time of publish.
+            The version must match only when the instance has resources
+            since only those were mapped to the assumed destination.
 
         publishFamilies (list): Output avalon families.
             This overrides "families" for the publish so that the integrated
@@ -429,14 +590,118 @@ class Integrator(object):
 
     def __init__(self):
         self.log = logging.getLogger("colorbleed.lib.Integrator")
+        self.resource_store = None
+
+        # Read-through cache for the database queries, this is replaced by
+        # the document cache of the publish context in `prepare`.
+        self.cache = dbcache.DocumentCache()
+
+        # Cache of the file stats, this is replaced by the stat cache of the
+        # publish context in `prepare`.
+        self.stat_cache = transfer.StatCache()
+
+        # The checksums of the integrated files per source path
+        self.checksums = dict()
+
+        # The subset and version number registered by `prepare` which are
+        # rolled back when the publish fails, see `rollback`.
+        self._created_subset = None
+        self._allocated_version = None
 
     def process(self, instance):
-        self.register(instance)
-        self.integrate(instance.data["transfers"])
+        self._created_subset = None
+        self._allocated_version = None
+        try:
+            documents = self.prepare(instance)
+            self.integrate(instance.data["transfers"],
+                           directory=instance.data.get("versionDir"),
+                           stagingdir=instance.data.get("stagingDir"),
+                           mode=instance.data.get("stagingTransferMode",
+                                                  "copy"))
+            self.register(documents)
+        except Exception:
+            self.rollback()
+            raise
+
+        self.remove_journal(instance.data.get("versionDir"))
+
+    def remove_journal(self, directory):
+        """Remove the transfer journal of the registered version directory
+
+        The journal is kept until the version is registered so that an
+        unregistered version directory can be resumed by rerunning its
+        publish, see `integrate`.
 
-    def register(self, instance):
+        """
+        if not directory:
+            return
+
+        try:
+            transfer.TransferJournal(os.path.normpath(directory)).remove()
+        except OSError as exc:
+            self.log.warning("Unable to remove transfer journal of "
+                             "%s: %s" % (directory, exc))
+
+    def rollback(self):
+        """Release the version number and subset registered by `prepare`
+
+        The version number is only released when no other publish allocated
+        a newer number in the meantime and a newly created subset is only
+        removed when no other publish allocated a version of it. As such
+        a failed publish leaves no empty subset behind and its version number
+        is reused by the next publish, e.g. the rerun that resumes its
+        partially integrated files.
+
+        """
+
+        if self._allocated_version is not None:
+            subset_id, number, previous = self._allocated_version
+            if previous is None:
+                update = {"$unset": {"data.lastVersion": ""}}
+            else:
+                update = {"$set": {"data.lastVersion": previous}}
+
+            try:
+                result = io.update_many({"_id": subset_id,
+                                         "data.lastVersion": number}, update)
+            except pymongo.errors.PyMongoError as exc:
+                self.log.warning("Unable to release version "
+                                 "'v{0:03d}': {1}".format(number, exc))
+            else:
+                if result.modified_count:
+                    self.log.info("Released unregistered version "
+                                  "'v{0:03d}'".format(number))
+            self._allocated_version = None
+
+        if self._created_subset is not None:
+            subset = self._created_subset
+            try:
+                version = io.find_one({"type": "version",
+                                       "parent": subset["_id"]},
+                                      projection={"_id": True})
+                if version is None:
+                    io.delete_many({"_id": subset["_id"],
+                                    "data.lastVersion": {"$exists": False}})
+            except pymongo.errors.PyMongoError as exc:
+                self.log.warning("Unable to remove subset "
+                                 "'{0}': {1}".format(subset["name"], exc))
+            self._created_subset = None
+            self.cache.invalidate(["subset"])
+
+    def prepare(self, instance):
+        """Create the database documents and the transfers for the instance.
+
+        The documents are not inserted into the database yet, see `register`.
+
+        Returns:
+            dict: The subset, version and representation documents.
+
+        """
 
         context = instance.context
+        self.cache = dbcache.get_document_cache(context)
+        self.stat_cache = transfer.get_stat_cache(context)
+
         # Atomicity
         # Guarantee atomic publishes - each asset contains
         # an identical set of members.
@@ -457,23 +722,33 @@ class Integrator(object):
                  avalon.api.Session["AVALON_ASSET"])
         LOCATION = avalon.api.Session["AVALON_LOCATION"]
 
-        project = io.find_one({"name": PROJECT,
-                               "type": "project"},
-                              projection={"name": True,
+        project = self.cache.find_one({"name": PROJECT,
+                                       "type": "project"},
+                                      projection={
+                                          "name": True,
                                           "config.template.publish": True})
         assert project, "Could not find project '%s'" % PROJECT
 
-        asset = io.find_one({"type": "asset",
-                             "name": ASSET,
-                             "parent": project["_id"]})
+        asset = self.cache.find_one({"type": "asset",
+                                     "name": ASSET,
+                                     "parent": project["_id"]})
         assert asset, "Could not find asset '%s'" % ASSET
 
         subset, is_new_subset = self.get_or_create_subset(asset, instance)
 
+        def can_resume(number):
+            return self.can_resume_version(instance=instance,
+                                           stagingdir=stagingdir,
+                                           project=project,
+                                           asset=asset,
+                                           subset=subset,
+                                           number=number)
+
         version = self.create_version(instance=instance,
                                       subset=subset,
                                       is_new_subset=is_new_subset,
-                                      locations=[LOCATION])
+                                      locations=[LOCATION],
+                                      resume=can_resume)
 
         representations = self.create_representations(
             instance=instance,
@@ -484,56 +759,294 @@ class Integrator(object):
             version=version
         )
 
-        # Insert all documents into the database and set the parent ids
-        if is_new_subset:
-            self.log.debug("Registering subset..")
-            io.insert_one(subset)
-
+        return {"subset": subset,
+                "isNewSubset": is_new_subset,
+                "version": version,
+                "representations": representations,
+                "files": instance.data["files"],
+                "stagingDir": stagingdir}
+
+    def register(self, documents):
+        """Insert the documents created by `prepare` into the database"""
+
+        # Store the checksums of the integrated files with the representation
+        # they belong to, one representation is created per entry in files.
+        for representation, files in zip(documents["representations"],
+                                         documents["files"]):
+            if not isinstance(files, list):
+                files = [files]
+
+            description = representation["data"].get("sequence")
+            if description:
+                # Store a single checksum of the frames' checksums in frame
+                # order to keep the representations of sequences small
+                checksum = self.get_sequence_checksum(
+                    documents["stagingDir"], description
+                )
+                if checksum:
+                    representation["data"]["checksum"] = checksum
+                continue
+
+            checksums = list()
+            for fname in files:
+                src = os.path.join(documents["stagingDir"], fname)
+                checksum = self.checksums.get(src)
+                if checksum:
+                    checksums.append([fname, "{0}:{1}".format(
+                        transfer.CHECKSUM_ALGORITHM, checksum
+                    )])
+
+            if checksums:
+                representation["data"]["checksums"] = checksums
+
+        # Insert all documents into the database, the subset is already
+        # registered when its version number was allocated.
         self.log.debug("Registering version..")
-        io.insert_one(version)
+        io.insert_one(documents["version"])
 
+        representations = documents["representations"]
         self.log.info("Registering %s representations" % len(representations))
         io.insert_many(representations)
 
-    def integrate(self, transfers):
+        # Ensure later queries in this publish see the new documents
+        self.cache.invalidate(["subset", "version", "representation"])
+
+    def get_sequence_checksum(self, stagingdir, description):
+        """Return the checksum of the checksums of the sequence's files
+
+        Returns:
+            str or None: The checksum prefixed with the algorithm or None
+                when not all files have a checksum.
+
+        """
+        hasher = hashlib.new(transfer.CHECKSUM_ALGORITHM)
+        for fname in sequence.iter_filenames(description):
+            checksum = self.checksums.get(os.path.join(stagingdir, fname))
+            if not checksum:
+                return None
+            hasher.update(checksum.encode("ascii"))
+
+        return "{0}:{1}".format(transfer.CHECKSUM_ALGORITHM,
+                                hasher.hexdigest())
+
+    def integrate(self,
+                  transfers,
+                  directory=None,
+                  stagingdir=None,
+                  mode="copy"):
         """Copy the files
 
+        The files are copied in parallel, see `colorbleed.transfer`. When any
+        of the copies fails all copied files are removed again and a
+        `TransferError` is raised.
+
+        When `directory` is provided the files inside it are first copied into
+        a temporary sibling directory which is renamed to `directory` once all
+        files are copied, so the version is never seen partially written.
+        The completed transfers are journaled so that rerunning a failed
+        or interrupted integration only copies the files that are missing.
+        The journal remains in `directory` until it is removed with
+        `remove_journal` once the version is registered, so only a directory
+        with a journal of this publish's files is ever integrated into again.
+        A partial directory without such a journal is removed.
+
+        The files inside `stagingdir` can be hardlinked or moved instead of
+        copied by setting the `mode`, see `transfer_file`.
+
         Args:
             transfers (list): The source to destination paths to integrate.
+            directory (str, optional): The version directory to integrate
+                into atomically.
+            stagingdir (str, optional): The staging directory of the
+                instance.
+            mode (str, optional): The transfer mode for the files inside the
+                staging directory: "copy", "hardlink" or "move".
         """
 
-        for src, dest in transfers:
-            self.log.info("Copying file {} -> {}".format(src, dest))
-            self.copy_file(src, dest)
+        self.resource_store = get_resource_store()
+        if self.resource_store:
+            self.log.debug("Using resource store: "
+                           "%s" % self.resource_store.root)
+
+        if stagingdir:
+            stagingdir = os.path.normpath(stagingdir)
+
+        def get_mode(src):
+            """Return the transfer mode for the source file"""
+            if mode == "copy" or not stagingdir:
+                return "copy"
+            if not transfer.is_inside(src, stagingdir, resolve=False):
+                return "copy"
+            return mode
+
+        if not directory:
+            def transfer_file(src, dst):
+                return self._transfer_file(src, dst, mode=get_mode(src))[1]
+
+            # Moved files can't be rolled back by removing them
+            plan = transfer.TransferPlan(transfers)
+            self.log.info("Integrating %i files.." % len(plan))
+
+            executor = transfer.TransferExecutor(
+                filesystem_limits=transfer.get_filesystem_limits(),
+                copy_function=transfer_file,
+                rollback=mode != "move"
+            )
+            executor.log = self.log
+            executor.execute(plan)
+            return
+
+        directory = os.path.normpath(directory)
+        partial = transfer.get_partial_directory(directory)
+        sources = set(os.path.normpath(src) for src, _ in transfers)
+
+        def is_owned(path):
+            """Return whether the journal shows this publish wrote `path`"""
+            journaled = transfer.TransferJournal(path).get_sources()
+            return bool(journaled) and all(os.path.normpath(src) in sources
+                                           for src in journaled)
+
+        if os.path.isdir(directory):
+            if os.path.isdir(partial):
+                raise RuntimeError("Both the version directory and its "
+                                   "partial directory exist: %s" % directory)
+
+            # Only a directory that was renamed on a previous run of this
+            # publish, but whose documents were never registered, still has
+            # its journal. Never touch any other existing version.
+            if not is_owned(directory):
+                raise RuntimeError("Version directory already exists and "
+                                   "was not written by this publish: "
+                                   "%s" % directory)
+
+            self.log.info("Resuming from existing directory: %s" % directory)
+            os.rename(directory, partial)
+            self.stat_cache.invalidate_tree(directory)
+
+        elif os.path.isdir(partial) and not is_owned(partial):
+            # Left behind by a publish that failed before it wrote any file
+            # or by another publish that released this version number
+            self.log.info("Removing orphaned partial directory: "
+                          "%s" % partial)
+            transfer.remove_tree(partial)
+            self.stat_cache.invalidate_tree(partial)
+
+        # Integrate the files inside the version directory into the partial
+        # directory instead
+        remapped = list()
+        for src, dst in transfers:
+            if transfer.is_inside(dst, directory, resolve=False):
+                relative = os.path.relpath(os.path.normpath(dst), directory)
+                dst = os.path.join(partial, relative)
+            remapped.append([src, dst])
+
+        journal = transfer.TransferJournal(partial,
+                                           stat_cache=self.stat_cache)
+
+        def transfer_file(src, dst):
+            entry = journal.get_completed(src, dst)
+            if entry:
+                self.log.info("Skipping completed file {}".format(dst))
+                if entry["checksum"]:
+                    self.checksums[src] = entry["checksum"]
+                return entry["checksum"]
+
+            method, checksum = self._transfer_file(src, dst,
+                                                   mode=get_mode(src))
+            journal.record(src, dst,
+                           checksum=checksum,
+                           moved=method == "move")
+            return checksum
+
+        plan = transfer.TransferPlan(remapped)
+        self.log.info("Integrating %i files into %s.." % (len(plan), partial))
+
+        executor = transfer.TransferExecutor(
+            filesystem_limits=transfer.get_filesystem_limits(),
+            copy_function=transfer_file,
+            rollback=False
+        )
+        executor.log = self.log
+        try:
+            executor.execute(plan)
+        finally:
+            journal.close()
+
+        transfer.ensure_directory(partial)
+        os.rename(partial, directory)
+        self.stat_cache.invalidate_tree(partial)
+        self.stat_cache.invalidate_tree(directory)
+
+    def _transfer_file(self, src, dst, mode="copy"):
+        """Transfer the file and invalidate the stats of the written paths"""
+        try:
+            return self.transfer_file(src, dst, mode=mode)
+        finally:
+            paths = [dst, src] if mode == "move" else [dst]
+            self.stat_cache.invalidate(paths)
+
+    def transfer_file(self, src, dst, mode="copy"):
+        """Transfer given source to destination
+
+        With "hardlink" or "move" mode the file is hardlinked or renamed to
+        its destination, which only changes metadata and is as such instant
+        regardless of the file size. When that is not possible, e.g. the
+        destination is on another filesystem, the file is copied instead.
+        The checksum is only computed for copied files, as hashing linked or
+        moved files would read all of their data again.
+
+        Arguments:
+            src (str): the source file which needs to be transferred
+            dst (str): the destination of the file
+            mode (str): "copy", "hardlink" or "move"
+        Returns:
+            tuple: The used transfer method and the checksum (if copied).
+        """
+
+        functions = {"hardlink": transfer.link_file,
+                     "move": transfer.move_file}
+        if mode in functions:
+            try:
+                functions[mode](src, dst)
+            except (OSError, AttributeError) as exc:
+                # AttributeError: os.link is unavailable on Windows in py2
+                self.log.debug("Unable to %s %s -> %s (%s), "
+                               "copying instead." % (mode, src, dst, exc))
+            else:
+                return mode, None
+
+        return "copy", self.copy_file(src, dst)
 
     def copy_file(self, src, dst):
         """Copy given source to destination
 
+        When the resource store is enabled, resources are linked to their
+        content in the store instead of copied.
+
+        The checksum of the copied data is computed and stored in
+        `self.checksums` to be registered with the representations.
+
         Arguments:
             src (str): the source file which needs to be copied
             dst (str): the destination of the file
         Returns:
-            None
+            str: The checksum of the copied data.
         """
 
-        dirname = os.path.dirname(dst)
-        try:
-            os.makedirs(dirname)
-        except OSError as e:
-            if e.errno == errno.EEXIST:
-                pass
-            else:
-                self.log.critical("An unexpected error occurred.")
-                raise
+        if self.resource_store and transfer.is_resource(dst):
+            checksum = self.resource_store.transfer(src, dst)
+        else:
+            checksum = transfer.copy_file_checksum(src, dst)
 
-        speedcopy.copyfile(src, dst)
+        self.checksums[src] = checksum
+        return checksum
 
     def get_or_create_subset(self, asset, instance):
 
         subset_name = instance.data["subset"]
-        subset = io.find_one({"type": "subset",
-                              "parent": asset["_id"],
-                              "name": subset_name})
+        subset = self.cache.find_one({"type": "subset",
+                                      "parent": asset["_id"],
+                                      "name": subset_name})
         if subset:
             return subset, False
 
@@ -560,54 +1073,68 @@ class Integrator(object):
         # Validate schema
         schema.validate(subset)
 
+        # Register the subset directly so concurrent publishes of the same
+        # subset allocate their version numbers from the same subset. The
+        # unique index on the subset names, see `scripts/ensure_indexes.py`,
+        # refuses the subset when another publish inserted it first, in
+        # which case this continues with that subset instead.
+        self.log.debug("Registering subset..")
+        try:
+            io.insert_one(subset)
+        except pymongo.errors.DuplicateKeyError:
+            self.log.debug("Subset '%s' was created by another publish, "
+                           "using that subset instead.." % subset_name)
+            subset = io.find_one({"type": "subset",
+                                  "parent": asset["_id"],
+                                  "name": subset_name})
+            return subset, False
+        finally:
+            self.cache.invalidate(["subset"])
+
+        self._created_subset = subset
         return subset, True
 
     def create_version(self,
                        instance,
                        subset,
                        is_new_subset,
-                       locations):
+                       locations,
+                       resume=None):
         """ Copy given source to destination
 
+        The version number is allocated atomically so concurrent publishes
+        of the same subset each get their own version, see `allocate_version`.
+        When the instance has resources, their destination was collected
+        for the assumed version so that exact version must be allocated.
+
         Args:
             instance: the current instance being published
             subset (dict): the registered subset of the asset
-            is_new_subset (bool): Whether the Subset will be newly created.
-                When True we can skip checking for existing versions.
+            is_new_subset (bool): Whether the Subset is newly created.
             locations (list): the currently registered locations
+            resume (callable, optional): Whether an allocated version that
+                was never registered may be reused, see `allocate_version`.
 
         Returns:
             dict: collection of data to create a version
         """
 
-        # Get next version
-        next_version = 1
-        if not is_new_subset:
-            latest_version = io.find_one({"type": "version",
-                                          "parent": subset["_id"]},
-                                         {"name": True},
-                                         sort=[("name", -1)])
-            if latest_version is not None:
-                next_version += latest_version["name"]
-
-        # If assumed template data was collected then verify it matches version
+        # If assumed template data was collected and resources were mapped
+        # to its destination the version must match the assumed version
+        required_version = None
         assumed_data = instance.data.get("assumedTemplateData")
-        if assumed_data:
+        if assumed_data and instance.data.get("resources"):
             self.log.debug("Verifying version from assumed destination..")
-            assumed_version = assumed_data["version"]
-            if assumed_version != next_version:
-                raise AttributeError("Assumed version 'v{0:03d}' does not "
-                                     "match next version in database "
-                                     "('v{1:03d}')".format(assumed_version,
-                                                           next_version))
-        self.log.debug("Next version: v{0:03d}".format(next_version))
+            required_version = assumed_data["version"]
 
+        # Collect the version data before allocating the version number so
+        # an incomplete instance fails without allocating a number
         version = {
             "_id": io.ObjectId(),
             "schema": "avalon-core:version-3.0",
             "type": "version",
             "parent": subset["_id"],
-            "name": next_version,
+            "name": None,
             "locations": locations,
             "data": self._get_version_data(instance)
         }
@@ -621,9 +1148,102 @@ class Integrator(object):
             version["schema"] = "avalon-core:version-2.0"
             version["data"]["families"] = self._get_families(instance)
 
+        next_version = self.allocate_version(subset,
+                                             version=required_version,
+                                             resume=resume)
+        if assumed_data and assumed_data["version"] != next_version:
+            self.log.info("Allocated version 'v{0:03d}' instead of assumed "
+                          "version 'v{1:03d}'".format(next_version,
+                                                      assumed_data["version"]))
+        self.log.debug("Next version: v{0:03d}".format(next_version))
+        version["name"] = next_version
+
         schema.validate(version)
         return version
 
+    def allocate_version(self, subset, version=None, resume=None):
+        """Reserve the next version number of the subset
+
+        The last allocated version number is stored on the subset as
+        `data.lastVersion` and only updated when it did not change since
+        it was read, otherwise this retries with the new value. As such
+        concurrent publishes never get the same version number.
+
+        Versions that are registered without allocating a number are taken
+        into account too, the next version is always higher than the latest
+        existing version.
+
+        When the last allocated version was never registered, e.g. because
+        its publish was killed while integrating the files, `resume` is called
+        with that version number. When it returns True the number is reused
+        so rerunning the publish continues from its partially integrated
+        version instead of allocating a new one.
+
+        Args:
+            subset (dict): The subset document.
+            version (int, optional): The exact version number to allocate.
+            resume (callable, optional): Return whether the unregistered
+                version number passed to it may be reused.
+
+        Raises:
+            AttributeError: When `version` is not the next version.
+            RuntimeError: When the subset does not exist (anymore).
+
+        Returns:
+            int: The allocated version number.
+
+        """
+
+        while True:
+            # Always query the database directly because the version may
+            # have been allocated by another publish in the meantime.
+            document = io.find_one({"_id": subset["_id"]},
+                                   projection={"data.lastVersion": True})
+            if document is None:
+                raise RuntimeError("Subset '%s' was removed while allocating "
+                                   "its version" % subset["name"])
+            last_version = document.get("data", {}).get("lastVersion")
+
+            latest = io.find_one({"type": "version",
+                                  "parent": subset["_id"]},
+                                 projection={"name": True},
+                                 sort=[("name", -1)])
+            latest_version = latest["name"] if latest else 0
+
+            if (resume is not None and
+                    last_version and last_version > latest_version and
+                    version in (None, last_version) and
+                    resume(last_version)):
+                self.log.info("Resuming unregistered version "
+                              "'v{0:03d}'".format(last_version))
+                return last_version
+
+            next_version = max(last_version or 0, latest_version) + 1
+            if version is not None and version != next_version:
+                raise AttributeError("Assumed version 'v{0:03d}' does not "
+                                     "match next version in database "
+                                     "('v{1:03d}')".format(version,
+                                                           next_version))
+
+            if last_version is None:
+                query = {"_id": subset["_id"],
+                         "data.lastVersion": {"$exists": False}}
+            else:
+                query = {"_id": subset["_id"],
+                         "data.lastVersion": last_version}
+
+            result = io.update_many(query, {"$set": {
+                "data.lastVersion": next_version
+            }})
+            if result.modified_count:
+                self._allocated_version = (subset["_id"],
+                                           next_version,
+                                           last_version)
+                return next_version
+
+            self.log.debug("Version 'v{0:03d}' was allocated by another "
+                           "publish, retrying..".format(next_version))
+
     def create_representations(self,
                                instance,
                                stagingdir,
@@ -635,16 +1255,15 @@ class Integrator(object):
         silo = asset.get("silo", None)
 
         # Define staging directory to publish transfers and its representations
-        root = avalon.api.registered_root()
-        template_data = {"root": root,
-                         "project": project["name"],
-                         "asset": asset["name"],
-                         "subset": subset["name"],
-                         "version": version["name"]}
-        if silo:
-            template_data["silo"] = silo
+        template_data = self._get_template_data(project,
+                                                asset,
+                                                subset,
+                                                version["name"])
 
         template_publish = project["config"]["template"]["publish"]
+        instance.data["versionDir"] = self.get_version_directory(
+            template_publish, template_data
+        )
 
         # Append transfers to any that are already on the Instance
         transfers = instance.data.get("transfers", list())
@@ -730,6 +1349,12 @@ class Integrator(object):
             if silo:
                 representation["context"]["silo"] = silo
 
+            # Describe sequences by their frame ranges instead of files
+            if isinstance(files, list):
+                description = sequence.describe(files)
+                if description:
+                    representation["data"]["sequence"] = description
+
             # Insert dependencies data when present and
             # containing at least some content
             inputs = instance.data.get("inputs", None)
@@ -750,6 +1375,93 @@ class Integrator(object):
 
         return representations
 
+    def can_resume_version(self,
+                           instance,
+                           stagingdir,
+                           project,
+                           asset,
+                           subset,
+                           number):
+        """Return whether the instance can continue an unregistered version
+
+        This is the case when the version's directory was partially
+        integrated by a previous run of this publish, which is detected from
+        its transfer journal: all journaled transfers must be of the files
+        of this instance. Without a journal the version can't be resumed.
+
+        Args:
+            instance: the current instance being published
+            stagingdir (str): The staging directory of the instance.
+            project (dict): The project document.
+            asset (dict): The asset document.
+            subset (dict): The subset document.
+            number (int): The allocated version number.
+
+        Returns:
+            bool: Whether to integrate into the version again.
+
+        """
+        template = project["config"]["template"]["publish"]
+        template_data = self._get_template_data(project, asset, subset, number)
+        directory = self.get_version_directory(template, template_data)
+        if not directory:
+            return False
+
+        # The journal is only removed after the version is registered
+        for path in [transfer.get_partial_directory(directory), directory]:
+            sources = transfer.TransferJournal(path).get_sources()
+            if sources:
+                break
+        else:
+            return False
+
+        expected = set()
+        for files in instance.data["files"]:
+            if not isinstance(files, list):
+                files = [files]
+            expected.update(os.path.normpath(os.path.join(stagingdir, fname))
+                            for fname in files)
+        expected.update(os.path.normpath(src)
+                        for src, _ in instance.data.get("transfers", []))
+
+        return all(os.path.normpath(src) in expected for src in sources)
+
+    def get_version_directory(self, template, template_data):
+        """Return the directory of the version in the publish template.
+
+        This is the deepest folder in the template that does not depend on
+        the representation. When that folder does not depend on the version
+        it is not unique to the version and None is returned.
+
+        Args:
+            template (str): The publish template.
+            template_data (dict): The data to format the template with.
+
+        Returns:
+            str or None: The version directory.
+
+        """
+        head = template.replace("\\", "/").split("{representation", 1)[0]
+        head = head.rsplit("/", 1)[0]
+        if "{version" not in head:
+            return None
+
+        return os.path.normpath(head.format(**template_data))
+
+    def _get_template_data(self, project, asset, subset, version):
+        """Return the data to format the publish template with"""
+        template_data = {"root": avalon.api.registered_root(),
+                         "project": project["name"],
+                         "asset": asset["name"],
+                         "subset": subset["name"],
+                         "version": version}
+
+        silo = asset.get("silo", None)
+        if silo:
+            template_data["silo"] = silo
+
+        return template_data
+
     def _get_version_data(self, instance):
         """Create the data for the version
 
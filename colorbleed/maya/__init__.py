@@ -13,7 +13,8 @@ from pyblish import api as pyblish
 
 from ..lib import (
     update_task_from_path,
-    any_outdated
+    any_outdated_async,
+    clear_session_cache
 )
 from . import menu
 from . import lib
@@ -157,40 +158,56 @@ def on_save(_):
 def on_open(_):
     """On scene open let's assume the containers have changed."""
 
-    from avalon.vendor.Qt import QtWidgets
-    from ..widgets import popup
-
     # Update current task for the current scene
-    update_task_from_path(cmds.file(query=True, sceneName=True))
+    scene = cmds.file(query=True, sceneName=True)
+    update_task_from_path(scene)
 
     # Validate FPS after update_task_from_path to
     # ensure it is using correct FPS for the asset
     lib.validate_fps()
 
-    if any_outdated():
+    # Check for outdated content without blocking the scene from being used
+    def _on_outdated_checked(outdated):
+        if not outdated:
+            return
+
+        if cmds.file(query=True, sceneName=True) != scene:
+            # Ignore results for a scene that is not open anymore
+            return
+
         log.warning("Scene has outdated content.")
+        _show_outdated_popup()
+
+    any_outdated_async(_on_outdated_checked, deferred=utils.executeDeferred)
 
-        # Find maya main window
-        top_level_widgets = {w.objectName(): w for w in
-                             QtWidgets.QApplication.topLevelWidgets()}
-        parent = top_level_widgets.get("MayaWindow", None)
 
-        if parent is None:
-            log.info("Skipping outdated content pop-up "
-                     "because Maya window can't be found.")
-        else:
+def _show_outdated_popup():
+    """Show a pop-up to inform the user about outdated content"""
 
-            # Show outdated pop-up
-            def _on_show_inventory():
-                import avalon.tools.cbsceneinventory as tool
-                tool.show(parent=parent)
+    from avalon.vendor.Qt import QtWidgets
+    from ..widgets import popup
 
-            dialog = popup.Popup(parent=parent)
-            dialog.setWindowTitle("Maya scene has outdated content")
-            dialog.setMessage("There are outdated containers in "
-                              "your Maya scene.")
-            dialog.on_clicked.connect(_on_show_inventory)
-            dialog.show()
+    # Find maya main window
+    top_level_widgets = {w.objectName(): w for w in
+                         QtWidgets.QApplication.topLevelWidgets()}
+    parent = top_level_widgets.get("MayaWindow", None)
+
+    if parent is None:
+        log.info("Skipping outdated content pop-up "
+                 "because Maya window can't be found.")
+        return
+
+    # Show outdated pop-up
+    def _on_show_inventory():
+        import avalon.tools.cbsceneinventory as tool
+        tool.show(parent=parent)
+
+    dialog = popup.Popup(parent=parent)
+    dialog.setWindowTitle("Maya scene has outdated content")
+    dialog.setMessage("There are outdated containers in "
+                      "your Maya scene.")
+    dialog.on_clicked.connect(_on_show_inventory)
+    dialog.show()
 
 
 def on_new(_):
@@ -203,6 +220,9 @@ def on_new(_):
 def on_task_changed(*args):
     """Wrapped function of app initialize and maya's on task changed"""
 
+    # Data of the previous asset or project may be cached
+    clear_session_cache()
+
     # Inputs (from the switched session and running app)
     session = avalon.Session.copy()
     app_name = os.environ["AVALON_APP_NAME"]
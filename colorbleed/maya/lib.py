@@ -1160,6 +1160,69 @@ def list_looks(asset_id):
     return look_subsets
 
 
+def get_latest_look_versions(asset_ids, subset="lookDefault"):
+    """Return the latest version and look representations per asset.
+
+    This resolves all assets with three queries in total instead of
+    querying the subset, version and representations per asset.
+
+    Args:
+        asset_ids (list): The asset database ids.
+        subset (str): Name of the look subset to find.
+
+    Returns:
+        dict: Per asset id a dict with the "subset" and latest "version"
+            documents and the "representations" of the version by name.
+            Assets without the subset or without versions are excluded.
+
+    """
+
+    asset_ids = list(set(asset_ids))
+    if not asset_ids:
+        return {}
+
+    subsets = dict((doc["_id"], doc) for doc in io.find(
+        {"type": "subset",
+         "name": subset,
+         "parent": {"$in": asset_ids}},
+        projection={"_id": True, "name": True, "parent": True}
+    ))
+    if not subsets:
+        return {}
+
+    # Get the latest version per subset
+    # todo: fix for new style families
+    versions = list(io.aggregate([
+        {"$match": {"type": "version",
+                    "parent": {"$in": list(subsets)}}},
+        {"$sort": {"name": -1}},
+        {"$group": {"_id": "$parent",
+                    "version": {"$first": "$_id"},
+                    "name": {"$first": "$name"}}}
+    ]))
+
+    result = dict()
+    for doc in versions:
+        subset_doc = subsets[doc["_id"]]
+        version = {"_id": doc["version"],
+                   "name": doc["name"],
+                   "parent": doc["_id"]}
+        result[subset_doc["parent"]] = {"subset": subset_doc,
+                                        "version": version,
+                                        "representations": {}}
+
+    # Get the representations of the shader file and relationships
+    versions_by_id = dict((data["version"]["_id"], data)
+                          for data in result.values())
+    for representation in io.find({"type": "representation",
+                                   "parent": {"$in": list(versions_by_id)},
+                                   "name": {"$in": ["ma", "json"]}}):
+        data = versions_by_id[representation["parent"]]
+        data["representations"][representation["name"]] = representation
+
+    return result
+
+
 def assign_look_by_version(nodes, version_id):
     """Assign nodes a specific published look version by id.
 
@@ -1182,10 +1245,32 @@ def assign_look_by_version(nodes, version_id):
                                        "parent": version_id,
                                        "name": "json"})
 
+    return _assign_look_representations(nodes,
+                                        look_representation,
+                                        json_representation)
+
+
+def _assign_look_representations(nodes,
+                                 look_representation,
+                                 json_representation,
+                                 containers=None):
+    """Assign nodes the look of the shader and relationships representation
+
+    Args:
+        nodes (list): nodes to assign look to
+        look_representation (dict): The shader file representation.
+        json_representation (dict): The relationships representation.
+        containers (list, optional): The loaded containers in the scene.
+            When not provided these are listed from the registered host.
+
+    """
+
     # See if representation is already loaded, if so reuse it.
-    host = api.registered_host()
+    if containers is None:
+        containers = api.registered_host().ls()
+
     representation_id = str(look_representation['_id'])
-    for container in host.ls():
+    for container in containers:
         if (container['loader'] == "LookLoader" and
                 container['representation'] == representation_id):
             log.info("Reusing loaded look ..")
@@ -1247,40 +1332,44 @@ def assign_look(nodes, subset="lookDefault"):
         parts = colorbleed_id.split(":", 1)
         grouped[parts[0]].append(node)
 
-    edits = []
-    for asset_id, asset_nodes in grouped.items():
+    asset_nodes = dict()
+    for asset_id, members in grouped.items():
         # create objectId for database
         try:
-            asset_id = bson.ObjectId(asset_id)
+            asset_nodes[bson.ObjectId(asset_id)] = members
         except bson.errors.InvalidId:
             log.warning("Asset ID is not compatible with bson")
-            continue
-        subset_data = io.find_one({"type": "subset",
-                                   "name": subset,
-                                   "parent": asset_id})
 
-        if not subset_data:
-            log.warning("No subset '{}' found for {}".format(subset, asset_id))
+    looks = get_latest_look_versions(asset_nodes.keys(), subset=subset)
+
+    # Each asset has its own look representation so the containers listed
+    # up front suffice to find the looks that are already loaded
+    containers = list(api.registered_host().ls())
+
+    edits = []
+    for asset_id, members in asset_nodes.items():
+        look = looks.get(asset_id)
+        if not look:
+            log.warning("No version of subset '{}' found "
+                        "for {}".format(subset, asset_id))
             continue
 
-        # get last version
-        # with backwards compatibility
-        version = io.find_one({"parent": subset_data['_id'],
-                               "type": "version",
-                               # todo: fix for new style families
-                               #"data.families":
-                               #    {"$in": ["colorbleed.look"]}
-                               },
-                              sort=[("name", -1)],
-                              projection={"_id": True, "name": True})
-        if not version:
-            log.warning("No version found for "
+        version = look["version"]
+        representations = look["representations"]
+        if "ma" not in representations or "json" not in representations:
+            log.warning("No look representations found for "
                         "subset '{}' for {}".format(subset, asset_id))
+            continue
 
         log.debug("Assigning look '{}' <v{:03d}>".format(subset,
                                                          version["name"]))
 
-        asset_edits = assign_look_by_version(asset_nodes, version['_id'])
+        asset_edits = _assign_look_representations(
+            members,
+            look_representation=representations["ma"],
+            json_representation=representations["json"],
+            containers=containers
+        )
         edits.extend(asset_edits)
 
     return edits
@@ -1,5 +1,7 @@
+import os
 import tempfile
 import pyblish.api
+import avalon.api
 
 ValidatePipelineOrder = pyblish.api.ValidatorOrder + 0.05
 ValidateContentsOrder = pyblish.api.ValidatorOrder + 0.1
@@ -7,30 +9,115 @@ ValidateSceneOrder = pyblish.api.ValidatorOrder + 0.2
 ValidateMeshOrder = pyblish.api.ValidatorOrder + 0.3
 
 
+def get_publish_root():
+    """Return the folder of the current project in the registered root"""
+    return os.path.join(avalon.api.registered_root(),
+                        avalon.api.Session["AVALON_PROJECT"])
+
+
+def _get_device(path):
+    """Return the device of the filesystem of the path, None if missing"""
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return None
+
+
+def get_publish_staging_root():
+    """Return the staging root on the filesystem of the publish root.
+
+    Files can only be hardlinked or renamed within a single filesystem. When
+    the system's temporary folder is on another filesystem than the
+    project's publish root this returns the ".staging" folder inside the
+    project, otherwise None to use the temporary folder.
+
+    Returns:
+        str or None: The staging root, None for the temporary folder.
+
+    """
+    publish_root = get_publish_root()
+    device = _get_device(publish_root)
+    if device is None or device == _get_device(tempfile.gettempdir()):
+        return None
+
+    return os.path.join(publish_root, ".staging")
+
+
+def get_staging_root(transfer_mode="copy"):
+    """Return the root folder to create staging directories in.
+
+    This can be set with the `CB_STAGING_ROOT` environment variable, which
+    is formatted with the Avalon session, e.g.:
+        {AVALON_PROJECTS}/{AVALON_PROJECT}/resources/staging
+
+    When not set, staging directories of which the files are hardlinked or
+    moved into the publish location are created on the filesystem of the
+    publish root, see `get_publish_staging_root()`. Other staging
+    directories are created in the system's temporary folder.
+
+    Args:
+        transfer_mode (str, optional): How the staged files are integrated:
+            "copy", "hardlink" or "move".
+
+    Returns:
+        str or None: The staging root, None for the temporary folder.
+
+    """
+    root = os.environ.get("CB_STAGING_ROOT")
+    if root:
+        root = os.path.normpath(root.format(**avalon.api.Session))
+    elif transfer_mode in {"hardlink", "move"}:
+        root = get_publish_staging_root()
+
+    if not root:
+        return None
+
+    if not os.path.isdir(root):
+        os.makedirs(root)
+    return root
+
+
 class Extractor(pyblish.api.InstancePlugin):
     """Extractor base class.
 
     The extractor base class implements a "staging_dir" function used to
     generate a temporary directory for an instance to extract to.
 
-    This temporary directory is generated through `tempfile.mkdtemp()`
+    This temporary directory is generated through `tempfile.mkdtemp()` inside
+    the staging root, see `get_staging_root()`.
+
+    The Integrator copies the staged files into the publish location. As
+    the staging directory is owned by the publish, extractors can set
+    `staging_transfer_mode` to "hardlink" to publish their files without
+    copying them, or to "move" to mark them as consumable when no other
+    plug-in reads them after integration. Only opt in when the staged files
+    are never written to again, since hardlinked files share their contents
+    with the published files. The staging directory is then created on the
+    filesystem of the publish root so the files can be linked or renamed.
 
     """
 
     order = 2.0
     targets = ["local"]  # Only extract when target is "local"
 
+    # How the Integrator transfers the files of the staging directory
+    staging_transfer_mode = "copy"
+
     def staging_dir(self, instance):
         """Provide a temporary directory in which to store extracted files
 
         Upon calling this method the staging directory is stored inside
-        the instance.data['stagingDir']
+        the instance.data['stagingDir'] and the transfer mode of the
+        extractor inside the instance.data['stagingTransferMode'].
         """
         staging_dir = instance.data.get('stagingDir', None)
 
         if not staging_dir:
-            staging_dir = tempfile.mkdtemp(prefix="pyblish_tmp_")
+            mode = self.staging_transfer_mode
+            staging_dir = tempfile.mkdtemp(prefix="pyblish_tmp_",
+                                           dir=get_staging_root(mode))
             instance.data['stagingDir'] = staging_dir
+            instance.data.setdefault('stagingTransferMode', mode)
 
         return staging_dir
 
@@ -4,6 +4,8 @@ import contextlib
 from avalon import api
 import avalon.io as io
 
+from colorbleed import sequence
+
 
 @contextlib.contextmanager
 def preserve_inputs(tool, inputs):
@@ -134,7 +136,7 @@ class FusionLoadSequence(api.Loader):
             namespace = context['asset']['name']
 
         # Use the first file for now
-        path = self._get_first_image(self.fname)
+        path = self._get_first_image(self.fname, context["representation"])
 
         # Create the Loader with the filename path set
         comp = get_current_comp()
@@ -207,7 +209,7 @@ class FusionLoadSequence(api.Loader):
         comp = tool.Comp()
 
         root = api.get_representation_path(representation)
-        path = self._get_first_image(root)
+        path = self._get_first_image(root, representation)
 
         # Get start frame from version data
         version = io.find_one({"type": "version",
@@ -253,7 +255,11 @@ class FusionLoadSequence(api.Loader):
         with comp_lock_and_undo_chunk(comp, "Remove Loader"):
             tool.Delete()
 
-    def _get_first_image(self, root):
+    def _get_first_image(self, root, representation):
         """Get first file in representation root"""
+        description = representation["data"].get("sequence")
+        if description:
+            return os.path.join(root, sequence.get_first_filename(description))
+
         files = sorted(os.listdir(root))
         return os.path.join(root, files[0])
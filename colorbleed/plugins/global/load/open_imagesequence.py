@@ -4,6 +4,8 @@ import subprocess
 
 from avalon import api
 
+from colorbleed import sequence
+
 
 def open(filepath):
     """Open file with system default executable"""
@@ -29,19 +31,17 @@ class PlayImageSequence(api.Loader):
     def load(self, context, name, namespace, data):
 
         directory = self.fname
-        from avalon.vendor import clique
 
-        pattern = clique.PATTERNS["frames"]
-        files = os.listdir(directory)
-        collections, remainder = clique.assemble(files,
-                                                 patterns=[pattern],
-                                                 minimum_items=1)
+        description = context["representation"]["data"].get("sequence")
+        if not description:
+            sequences, remainder = sequence.scan(directory)
+
+            assert not remainder, ("There shouldn't have been a remainder "
+                                   "for '%s': %s" % (directory, remainder))
 
-        assert not remainder, ("There shouldn't have been a remainder for "
-                               "'%s': %s" % (directory, remainder))
+            description = sequences[0]
 
-        seqeunce = collections[0]
-        first_image = list(seqeunce)[0]
+        first_image = sequence.get_first_filename(description)
         filepath = os.path.normpath(os.path.join(directory, first_image))
 
         self.log.info("Opening : {}".format(filepath))
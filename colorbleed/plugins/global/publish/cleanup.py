@@ -1,13 +1,21 @@
 import os
-import shutil
+import tempfile
+
 import pyblish.api
 
+from colorbleed.plugin import get_staging_root, get_publish_staging_root
+from colorbleed import transfer
+
 
 class CleanUp(pyblish.api.InstancePlugin):
     """Cleans up the staging directory after a successful publish.
 
     The removal will only happen for staging directories which are inside the
-    temporary folder, otherwise the folder is ignored.
+    temporary folder or the staging roots (see `CB_STAGING_ROOT` and
+    `get_publish_staging_root`), otherwise the folder is ignored.
+
+    The folder is removed in a background thread so the publish does not
+    have to wait for it, see `colorbleed.transfer.BackgroundCleaner`.
 
     """
 
@@ -16,18 +24,20 @@ class CleanUp(pyblish.api.InstancePlugin):
 
     def process(self, instance):
 
-        import tempfile
-
         staging_dir = instance.data.get("stagingDir", None)
         if not staging_dir or not os.path.exists(staging_dir):
             self.log.info("No staging directory found: %s" % staging_dir)
             return
 
-        temp_root = tempfile.gettempdir()
-        if not os.path.normpath(staging_dir).startswith(temp_root):
+        roots = [tempfile.gettempdir(),
+                 get_staging_root(),
+                 get_publish_staging_root()]
+        if not any(root and transfer.is_inside(staging_dir, root)
+                   for root in roots):
             self.log.info("Skipping cleanup. Staging directory is not in the "
-                          "temp folder: %s" % staging_dir)
+                          "temp folder or staging root: %s" % staging_dir)
             return
 
-        self.log.info("Removing temporary folder ...")
-        shutil.rmtree(staging_dir)
+        self.log.info("Removing temporary folder in background: "
+                      "%s" % staging_dir)
+        transfer.cleaner.remove(staging_dir, roots=roots)
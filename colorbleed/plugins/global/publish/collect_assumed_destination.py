@@ -1,7 +1,8 @@
 import pyblish.api
 import os
 
-from avalon import io, api
+from avalon import api
+from colorbleed import dbcache, transfer
 
 
 class CollectAssumedDestination(pyblish.api.InstancePlugin):
@@ -54,6 +55,10 @@ class CollectAssumedDestination(pyblish.api.InstancePlugin):
         instance.data["resources"] = resources
         instance.data["transfers"] = transfers
 
+        # Stat the resources in parallel for the validators and integrator
+        stat_cache = transfer.get_stat_cache(instance.context)
+        stat_cache.prefetch(src for src, _ in transfers)
+
     def create_destination_template(self, instance):
         """Create a filepath based on the current data available
 
@@ -72,15 +77,16 @@ class CollectAssumedDestination(pyblish.api.InstancePlugin):
         asset_name = instance.data["asset"]
         project_name = api.Session["AVALON_PROJECT"]
 
-        project = io.find_one({"type": "project",
-                               "name": project_name},
-                              projection={"config": True})
+        cache = dbcache.get_document_cache(instance.context)
+        project = cache.find_one({"type": "project",
+                                  "name": project_name},
+                                 projection={"config": True})
 
         template = project["config"]["template"]["publish"]
 
-        asset = io.find_one({"type": "asset",
-                             "name": asset_name,
-                             "parent": project["_id"]})
+        asset = cache.find_one({"type": "asset",
+                                "name": asset_name,
+                                "parent": project["_id"]})
 
         assert asset, ("No asset found by the name '{}' "
                        "in project '{}'".format(asset_name, project_name))
@@ -91,22 +97,29 @@ class CollectAssumedDestination(pyblish.api.InstancePlugin):
                            "in template: %s" % template)
             raise RuntimeError("Missing silo data for publish template.")
 
-        subset = io.find_one({"type": "subset",
-                              "name": subset_name,
-                              "parent": asset["_id"]})
+        subset = cache.find_one({"type": "subset",
+                                 "name": subset_name,
+                                 "parent": asset["_id"]})
 
         # assume there is no version yet, we start at `1`
         version = None
         version_number = 1
         if subset is not None:
-            version = io.find_one({"type": "version",
-                                   "parent": subset["_id"]},
-                                  sort=[("name", -1)])
+            version = cache.find_one({"type": "version",
+                                      "parent": subset["_id"]},
+                                     projection={"name": True},
+                                     sort=[("name", -1)])
 
         # if there is a subset there ought to be version
         if version is not None:
             version_number += version["name"]
 
+        # Versions that are being published may already have been allocated
+        if subset is not None:
+            last_version = subset.get("data", {}).get("lastVersion")
+            if last_version is not None:
+                version_number = max(version_number, last_version + 1)
+
         template_data = {"root": api.Session["AVALON_PROJECTS"],
                          "project": project_name,
                          "silo": silo,
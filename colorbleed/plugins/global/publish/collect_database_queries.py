@@ -0,0 +1,25 @@
+import pyblish.api
+
+from colorbleed.dbprofile import profiler
+
+
+class CollectDatabaseQueries(pyblish.api.ContextPlugin):
+    """Start recording the database queries of this publish.
+
+    The queries are reported once the publish finished, see
+    `colorbleed.dbprofile.report`.
+
+    This only applies when the query profiler is enabled with the
+    `CB_DB_PROFILE` environment variable, see `colorbleed.dbprofile`.
+
+    """
+
+    label = "Collect Database Queries"
+    order = pyblish.api.CollectorOrder - 0.5
+
+    def process(self, context):
+        if not profiler.installed:
+            return
+
+        self.log.info("Recording database queries..")
+        profiler.reset()
@@ -1,5 +1,4 @@
 import os
-import re
 import copy
 import json
 import pprint
@@ -7,61 +6,34 @@ import pprint
 import pyblish.api
 from avalon import api
 
+from colorbleed import dbcache, sequence
+
 
 def collect(root,
             regex=None,
             exclude_regex=None,
             startFrame=None,
             endFrame=None):
-    """Collect sequence collections in root"""
-
-    from avalon.vendor import clique
-
-    files = list()
-    for filename in os.listdir(root):
-
-        # Must have extension
-        ext = os.path.splitext(filename)[1]
-        if not ext:
-            continue
-
-        # Only files
-        if not os.path.isfile(os.path.join(root, filename)):
-            continue
+    """Collect sequences in root
 
-        # Include and exclude regex
-        if regex and not re.search(regex, filename):
-            continue
-        if exclude_regex and re.search(exclude_regex, filename):
-            continue
+    Returns:
+        list: The sequence descriptions, see `colorbleed.sequence`.
 
-        files.append(filename)
+    """
 
-    # Match collections
-    # Support filenames like: projectX_shot01_0010.tiff with this regex
-    pattern = r"(?P<index>(?P<padding>0*)\d+)\.\D+\d?$"
-    collections, remainder = clique.assemble(files,
-                                             patterns=[pattern],
-                                             minimum_items=1)
+    sequences, remainder = sequence.scan(root,
+                                         include=regex,
+                                         exclude=exclude_regex)
 
     # Ignore any remainders
     if remainder:
         print("Skipping remainder {}".format(remainder))
 
-    # Exclude any frames outside start and end frame.
-    for collection in collections:
-        for index in list(collection.indexes):
-            if startFrame is not None and index < startFrame:
-                collection.indexes.discard(index)
-                continue
-            if endFrame is not None and index > endFrame:
-                collection.indexes.discard(index)
-                continue
-
-    # Keep only collections that have at least a single frame
-    collections = [c for c in collections if c.indexes]
-
-    return collections
+    # Exclude any frames outside start and end frame and keep only
+    # sequences that have at least a single frame
+    sequences = [sequence.clip(seq, start=startFrame, end=endFrame)
+                 for seq in sequences]
+    return [seq for seq in sequences if seq]
 
 
 class CollectFileSequences(pyblish.api.ContextPlugin):
@@ -82,6 +54,8 @@ class CollectFileSequences(pyblish.api.ContextPlugin):
         regex (str): A regex for the sequence filename
         exclude_regex (str): A regex for filename to exclude from collection
         metadata (dict): Custom metadata for instance.data["metadata"]
+        documents (list): Snapshot of database documents to use for the
+            database queries during the publish, see `colorbleed.dbcache`
 
     """
 
@@ -111,6 +85,10 @@ class CollectFileSequences(pyblish.api.ContextPlugin):
                                        "{} - Exception: {}".format(path, exc))
                         raise
 
+                documents = data.pop("documents", None)
+                if documents:
+                    dbcache.add_document_snapshot(context, documents)
+
                 cwd = os.path.dirname(path)
                 root_override = data.get("root")
                 if root_override:
@@ -128,18 +106,19 @@ class CollectFileSequences(pyblish.api.ContextPlugin):
 
             self.log.info("Collecting: {}".format(root))
 
-            collections = collect(root=root,
-                                  regex=data.get("regex"),
-                                  exclude_regex=data.get("exclude_regex"),
-                                  startFrame=data.get("startFrame"),
-                                  endFrame=data.get("endFrame"))
+            sequences = collect(root=root,
+                                regex=data.get("regex"),
+                                exclude_regex=data.get("exclude_regex"),
+                                startFrame=data.get("startFrame"),
+                                endFrame=data.get("endFrame"))
 
-            self.log.info("Found collections: {}".format(collections))
+            self.log.info("Found sequences: {}".format(
+                [sequence.format_sequence(seq) for seq in sequences]))
 
             if data.get("subset"):
                 # If subset is provided for this json then it must be a single
                 # collection.
-                if len(collections) > 1:
+                if len(sequences) > 1:
                     self.log.error("Forced subset can only work with a single "
                                    "found sequence")
                     raise RuntimeError("Invalid sequence")
@@ -149,29 +128,30 @@ class CollectFileSequences(pyblish.api.ContextPlugin):
             assert isinstance(families, (list, tuple)), "Must be iterable"
             assert families, "Must have at least a single family"
 
-            for collection in collections:
-                instance = context.create_instance(str(collection))
-                self.log.info("Collection: %s" % list(collection))
+            for seq in sequences:
+                name = sequence.format_sequence(seq)
+                files = list(sequence.iter_filenames(seq))
+                instance = context.create_instance(name)
+                self.log.info("Collection: %s" % files)
 
                 # Ensure each instance gets a unique reference to the data
                 data = copy.deepcopy(data)
 
-                # If no subset provided, get it from collection's head
-                subset = data.get("subset", collection.head.rstrip("_. "))
+                # If no subset provided, get it from sequence's head
+                subset = data.get("subset", seq["head"].rstrip("_. "))
 
-                # If no start or end frame provided, get it from collection
-                indices = list(collection.indexes)
-                start = data.get("startFrame", indices[0])
-                end = data.get("endFrame", indices[-1])
+                # If no start or end frame provided, get it from sequence
+                start = data.get("startFrame", seq["ranges"][0][0])
+                end = data.get("endFrame", seq["ranges"][-1][1])
 
                 instance.data.update({
-                    "name": str(collection),
+                    "name": name,
                     "family": families[0],  # backwards compatibility / pyblish
                     "families": list(families),
                     "subset": subset,
                     "asset": data.get("asset", api.Session["AVALON_ASSET"]),
                     "stagingDir": root,
-                    "files": [list(collection)],
+                    "files": [files],
                     "startFrame": start,
                     "endFrame": end,
 
@@ -189,7 +169,7 @@ class CollectFileSequences(pyblish.api.ContextPlugin):
                 if frames_explicit:
                     instance.data["frames"] = frames_explicit
 
-                instance.append(collection)
+                instance.append(seq)
 
                 self.log.debug("Collected instance:\n"
                                "{}".format(pprint.pformat(instance.data)))
@@ -3,7 +3,7 @@ import json
 import pprint
 
 import pyblish.api
-from colorbleed import schema
+from colorbleed import schema, dbcache
 
 
 class CollectStandalonePublish(pyblish.api.ContextPlugin):
@@ -15,6 +15,9 @@ class CollectStandalonePublish(pyblish.api.ContextPlugin):
     It reads the file from the STANDALONEPUBLISH environment variable which
     will need to be set to a .json filepath.
 
+    When the file contains a snapshot of "documents" these are used for the
+    database queries during the publish, see `colorbleed.dbcache`.
+
     Requires:
         os.environ  -> STANDALONEPUBLISH
 
@@ -48,6 +51,11 @@ class CollectStandalonePublish(pyblish.api.ContextPlugin):
             self.log.error("Failed to validate schema: %s" % exc)
             raise exc
 
+        documents = payload.get("documents")
+        if documents:
+            self.log.info("Using snapshot of %i documents" % len(documents))
+            dbcache.add_document_snapshot(context, documents)
+
         # Set up publish context and instances
         context.data.update(payload["context"])
 
@@ -3,14 +3,15 @@ import os
 import pyblish.api
 import colorbleed.api
 import colorbleed.usdlib as usdlib
+from colorbleed import dbcache
 
-from avalon import api, io
+from avalon import api
 
 
-def _get_project_publish_template():
+def _get_project_publish_template(cache):
     """Return publish template from database for current project"""
-    project = io.find_one({"type": "project"},
-                          projection={"config.template.publish": True})
+    project = cache.find_one({"type": "project"},
+                             projection={"config.template.publish": True})
     return project["config"]["template"]["publish"]
 
 
@@ -34,6 +35,7 @@ class ExtractBootstrapUSD(colorbleed.api.Extractor):
         filepath = os.path.join(staging_dir, filename)
         self.log.info("Bootstrap USD '%s' to '%s'" % (filename, staging_dir))
 
+        cache = dbcache.get_document_cache(instance.context)
         subset = instance.data["subset"]
         if subset == "usdAsset":
             # Asset
@@ -54,13 +56,15 @@ class ExtractBootstrapUSD(colorbleed.api.Extractor):
             variant_subsets = instance.data["variantSubsets"]
             usdlib.create_model(filepath,
                                 asset=instance.data["asset"],
-                                variant_subsets=variant_subsets)
+                                variant_subsets=variant_subsets,
+                                cache=cache)
 
         elif subset == "usdShade":
             variant_subsets = instance.data["variantSubsets"]
             usdlib.create_shade(filepath,
                                 asset=instance.data["asset"],
-                                variant_subsets=variant_subsets)
+                                variant_subsets=variant_subsets,
+                                cache=cache)
 
         elif subset in usdlib.PIPELINE["asset"]:
             # Asset layer
@@ -85,13 +89,15 @@ class ExtractBootstrapUSD(colorbleed.api.Extractor):
 
         asset = instance.data["asset"]
 
-        template = _get_project_publish_template()
+        cache = dbcache.get_document_cache(instance.context)
+        template = _get_project_publish_template(cache)
         layer_paths = []
         for layer in subsets:
             layer_path = self._get_usd_master_path(
                 subset=layer,
                 asset=asset,
-                template=template
+                template=template,
+                cache=cache
             )
             layer_paths.append(layer_path)
             self.log.info("Asset references: %s" % layer_path)
@@ -99,9 +105,10 @@ class ExtractBootstrapUSD(colorbleed.api.Extractor):
         return layer_paths
 
     def _get_usd_master_path(self,
-                            subset,
-                            asset,
-                            template):
+                             subset,
+                             asset,
+                             template,
+                             cache):
         """Get the filepath for a .usd file of a subset.
 
         This will return the path to an unversioned master file generated by
@@ -110,8 +117,8 @@ class ExtractBootstrapUSD(colorbleed.api.Extractor):
         """
 
         PROJECT = api.Session["AVALON_PROJECT"]
-        asset_doc = io.find_one({"name": asset,
-                                 "type": "asset"})
+        asset_doc = cache.find_one({"name": asset,
+                                    "type": "asset"})
 
         root = api.registered_root()
         path = template.format(**{
@@ -1,9 +1,10 @@
 import os
 import re
-import shutil
 
 import pyblish.api
 
+from colorbleed import transfer
+
 
 class IntegrateUSDMasterFile(pyblish.api.InstancePlugin):
     """Create an unversioned master file that gets overwritten.
@@ -14,6 +15,12 @@ class IntegrateUSDMasterFile(pyblish.api.InstancePlugin):
 
     This plug-in generates that master file.
 
+    The master file is replaced atomically so USD sessions and renders that
+    read it never see a partially written file. By default it is a copy of
+    the published file. The `CB_USD_MASTER_MODE` environment variable can
+    be set to "hardlink" or "symlink" (relative) to update the master file
+    without copying any data.
+
     """
 
     order = pyblish.api.IntegratorOrder + 0.4
@@ -78,9 +85,7 @@ class IntegrateUSDMasterFile(pyblish.api.InstancePlugin):
             master_dest = os.path.join(master_folder,
                                        "{0}.{1}".format(subset, ext))
 
+            mode = os.environ.get("CB_USD_MASTER_MODE", "copy")
             self.log.info("Creating master file: %s" % master_dest)
-
-            if not os.path.exists(master_folder):
-                os.makedirs(master_folder)
-
-            shutil.copy(dest, master_dest)
+            mode = transfer.replace_file(dest, master_dest, mode=mode)
+            self.log.debug("Created master file using mode: %s" % mode)
@@ -5,10 +5,10 @@ import re
 from collections import defaultdict
 
 from avalon import api, io
-from avalon.vendor import requests, clique
+from avalon.vendor import requests
 
 from colorbleed.vendor import speedcopy
-from colorbleed import schema
+from colorbleed import schema, dbcache, sequence
 
 import pyblish.api
 
@@ -84,8 +84,12 @@ def get_latest_version(asset_name, subset_name, family):
 
 
 def get_resources(version, extension=None):
-    """
-    Get the files from the specific version
+    """Get the file sequence of the specific version
+
+    Returns:
+        tuple: The directory and the sequence description of the files,
+            see `colorbleed.sequence`.
+
     """
     query = {"type": "representation", "parent": version["_id"]}
     if extension:
@@ -95,25 +99,33 @@ def get_resources(version, extension=None):
     assert representation, "This is a bug"
 
     directory = api.get_representation_path(representation)
-    resources = sorted([os.path.normpath(os.path.join(directory, fname))
-                        for fname in os.listdir(directory)])
+    sequences, _ = sequence.scan(directory)
+    assert len(sequences) == 1, "Multiple collections found"
+
+    return directory, sequences[0]
+
 
-    return resources
+def get_resource_files(directory, description, frame_range, override=True):
+    """Return the paths of the sequence's files to copy
 
+    Args:
+        directory (str): The directory of the sequence.
+        description (dict): The sequence description.
+        frame_range (FrameRanges): The frames that will be rendered.
+        override (bool): When True the frames that will be rendered
+            are excluded.
 
-def get_resource_files(resources, frame_range, override=True):
-    res_collections, _ = clique.assemble(resources)
-    assert len(res_collections) == 1, "Multiple collections found"
-    res_collection = res_collections[0]
+    Returns:
+        list: The file paths.
 
-    # Remove any frames
+    """
+    frames = sequence.FrameRanges.from_sequence(description)
     if override:
-        for frame in frame_range:
-            if frame not in res_collection.indexes:
-                continue
-            res_collection.indexes.remove(frame)
+        frames -= frame_range
 
-    return list(res_collection)
+    return [os.path.normpath(os.path.join(
+        directory, sequence.format_filename(description, frame)
+    )) for frame in frames]
 
 
 def compute_publish_from_instance(instance):
@@ -143,12 +155,13 @@ def compute_publish_from_instance(instance):
 
         if "frames" in instance.data:
             # Explicit frames
-            frames = instance.data["frames"]
+            frames = sequence.FrameRanges(instance.data["frames"])
         else:
             # Start/end frame range
-            start = int(instance.data["startFrame"])
-            end = int(instance.data["endFrame"])
-            frames = range(start, end+1)
+            frames = sequence.FrameRanges.from_range(
+                instance.data["startFrame"],
+                instance.data["endFrame"]
+            )
 
         def replace_frame_padding(match):
             """Replace #### padding with {0:04d}"""
@@ -165,7 +178,9 @@ def compute_publish_from_instance(instance):
             # Add the sequence of files into a list to ensure full sequence is
             # seen as a single representation when the publish integrates it
             "files": [files],
-            "stagingDir": os.path.dirname(path).replace("\\", "/")
+            "stagingDir": os.path.dirname(path).replace("\\", "/"),
+            # Link the rendered frames into the publish instead of copying
+            "stagingTransferMode": "hardlink"
         }
 
         # Transfer key/values from instance
@@ -271,6 +286,13 @@ class SubmitDependentImageSequenceJobDeadline(pyblish.api.InstancePlugin):
 
         # Generate publish metadata file for the standalone publish job
         publish_metadata = compute_publish_from_instance(instance)
+
+        # Include the documents the publish job will query so the farm does
+        # not need to query the database for them.
+        publish_metadata["documents"] = dbcache.create_snapshot(
+            asset_name=instance.data["asset"]
+        )
+
         metadata_filename = "{}_metadata.json".format(subset)
         metadata_path = os.path.join(output_dir, metadata_filename)
         with open(metadata_path, "w") as f:
@@ -329,12 +351,18 @@ class SubmitDependentImageSequenceJobDeadline(pyblish.api.InstancePlugin):
         if copy_resources:
             self.log.info("Preparing to copy for extend frames..")
             dest_path = data["outputDir"]
-            for source in copy_resources:
-                src_file = os.path.basename(source)
-                dest = os.path.join(dest_path, src_file)
-                speedcopy.copyfile(source, dest)
+            pairs = [(src, os.path.join(dest_path, os.path.basename(src)))
+                     for src in copy_resources]
+            results = speedcopy.copyfiles(pairs)
+
+            errors = [(src, error) for src, _, error in results if error]
+            for src, error in errors:
+                self.log.error("Failed to copy %s: %s" % (src, error))
+            if errors:
+                raise RuntimeError("Failed to copy %i files for extend "
+                                   "frames." % len(errors))
 
-            self.log.info("Finished copying %i files" % len(resources))
+            self.log.info("Finished copying %i files" % len(copy_resources))
 
     def extend_frames(self, instance):
 
@@ -342,6 +370,7 @@ class SubmitDependentImageSequenceJobDeadline(pyblish.api.InstancePlugin):
         family = "colorbleed.imagesequence"
         override = data["overrideExistingFrame"]
 
+        job = data["deadlineSubmissionJob"]
         out_file = job.get("OutFile")
         if not out_file:
             raise RuntimeError("OutFile not found in render job!")
@@ -355,7 +384,8 @@ class SubmitDependentImageSequenceJobDeadline(pyblish.api.InstancePlugin):
         # Frame comparison
         prev_start = None
         prev_end = None
-        resource_range = range(int(start), int(end) + 1)
+        resource_range = sequence.FrameRanges.from_range(start, end)
+        resources = []
 
         # Gather all the subset files
         for subset_name in instance.data["renderSubsets"].keys():
@@ -368,8 +398,9 @@ class SubmitDependentImageSequenceJobDeadline(pyblish.api.InstancePlugin):
                 prev_start = version["data"]["startFrame"]
                 prev_end = version["data"]["endFrame"]
 
-            subset_resources = get_resources(version, _ext)
-            resource_files = get_resource_files(subset_resources,
+            directory, description = get_resources(version, _ext)
+            resource_files = get_resource_files(directory,
+                                                description,
                                                 resource_range,
                                                 override)
 
@@ -1,8 +1,44 @@
+import os
+
 import pyblish.api
 
+from colorbleed import transfer
+
+
+def get_truncated_files(sizes, ratio):
+    """Return the files that are much smaller than the other files
+
+    Frames of a sequence are usually about the same size, so a frame that
+    is only a fraction of the median size was likely not fully written.
+
+    Args:
+        sizes (dict): The size in bytes per file.
+        ratio (float): The fraction of the median size below which a file
+            is considered truncated.
+
+    Returns:
+        list: The truncated files.
+
+    """
+    values = sorted(size for size in sizes.values() if size)
+    if len(values) < 3:
+        return []
+
+    minimum = values[len(values) // 2] * ratio
+    return sorted(path for path, size in sizes.items()
+                  if size and size < minimum)
+
 
 class ValidateFilesExist(pyblish.api.InstancePlugin):
-    """Ensure files exist on disk.
+    """Ensure files exist on disk and are not empty.
+
+    Frames of a sequence that are much smaller than the other frames are
+    reported as possibly truncated, but don't fail the validation since
+    e.g. frames of an empty or black part of a render compress very well.
+    Incomplete image files are detected by the Image Headers validator.
+
+    The folders of the files are listed once instead of checking each file
+    separately, which is much faster for long sequences on network storage.
 
     Requires:
         instance    -> files
@@ -15,11 +51,14 @@ class ValidateFilesExist(pyblish.api.InstancePlugin):
     families = ["colorbleed.imagesequence"]
     hosts = ["shell"]
 
+    # Frames smaller than this fraction of the median size are reported
+    truncated_ratio = 0.1
+
     def process(self, instance):
 
         stagingdir = instance.data["stagingDir"]
 
-        invalid = False
+        representations = list()
         for representation in instance.data["files"]:
 
             # If representation is a single file treat
@@ -28,14 +67,31 @@ class ValidateFilesExist(pyblish.api.InstancePlugin):
             if not isinstance(representation, (list, tuple)):
                 representation = [representation]
 
-            for path in representation:
+            representations.append([os.path.join(stagingdir, path)
+                                    for path in representation])
 
-                if not os.path.isabs(path):
-                    path = os.path.join(stagingdir, path)
+        sizes = transfer.get_file_sizes(
+            (path for paths in representations for path in paths),
+            cache=transfer.get_stat_cache(instance.context)
+        )
 
-                if not os.path.exists(path):
+        invalid = False
+        for paths in representations:
+            for path in paths:
+                if sizes[path] is None:
                     self.log.error("File does not exist: %s" % path)
                     invalid = True
+                elif sizes[path] == 0:
+                    self.log.error("File is empty: %s" % path)
+                    invalid = True
+
+            truncated = get_truncated_files(
+                dict((path, sizes[path]) for path in paths),
+                self.truncated_ratio
+            )
+            for path in truncated:
+                self.log.warning("File may be truncated: %s (%i bytes)"
+                                 % (path, sizes[path]))
 
         if invalid:
-            raise RuntimeError("Missing files.")
+            raise RuntimeError("Missing or empty files.")
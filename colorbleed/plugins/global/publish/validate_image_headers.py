@@ -0,0 +1,61 @@
+import os
+
+import pyblish.api
+
+from colorbleed import imageheader, transfer
+
+
+class ValidateImageHeaders(pyblish.api.InstancePlugin):
+    """Ensure the image files are complete and not corrupt.
+
+    Only the headers of the EXR, PNG, JPEG and TIFF files are read to
+    detect e.g. frames that were only partially written because the render
+    task was killed. The files are checked in parallel.
+
+    Files that don't exist are reported by the Files Exist validator.
+
+    Requires:
+        instance    -> files
+        instance    -> stagingDir
+
+    """
+
+    order = pyblish.api.ValidatorOrder + 0.1
+    label = "Image Headers"
+    families = ["colorbleed.imagesequence"]
+    hosts = ["shell"]
+
+    def process(self, instance):
+
+        stagingdir = instance.data["stagingDir"]
+
+        paths = list()
+        for representation in instance.data["files"]:
+            if not isinstance(representation, (list, tuple)):
+                representation = [representation]
+
+            paths.extend(os.path.join(stagingdir, path)
+                         for path in representation
+                         if imageheader.is_supported(path))
+
+        if not paths:
+            return
+
+        sizes = transfer.get_file_sizes(
+            paths,
+            cache=transfer.get_stat_cache(instance.context)
+        )
+        paths = [path for path in paths if sizes[path]]
+
+        def check(path):
+            return imageheader.check_image(path, size=sizes[path])
+
+        self.log.debug("Checking headers of %i images.." % len(paths))
+        invalid = False
+        for path, error in zip(paths, transfer.map_parallel(check, paths)):
+            if error:
+                self.log.error("Invalid image: %s (%s)" % (path, error))
+                invalid = True
+
+        if invalid:
+            raise RuntimeError("Incomplete or corrupt image files.")
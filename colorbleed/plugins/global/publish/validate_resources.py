@@ -1,7 +1,6 @@
 import pyblish.api
 import colorbleed.api
-
-import os
+from colorbleed import transfer
 
 
 class ValidateResources(pyblish.api.InstancePlugin):
@@ -12,7 +11,7 @@ class ValidateResources(pyblish.api.InstancePlugin):
     media.
 
     This validates:
-        - The resources are existing files.
+        - The resources are existing files that are not empty.
         - The resources["files"] must only contain (existing) files
         - The resources have correctly collected the data.
 
@@ -23,7 +22,15 @@ class ValidateResources(pyblish.api.InstancePlugin):
 
     def process(self, instance):
 
-        for resource in instance.data.get('resources', []):
+        resources = instance.data.get('resources', [])
+
+        # Check all files at once so each folder is only listed once
+        sizes = transfer.get_file_sizes(
+            (f for resource in resources for f in resource.get("files", [])),
+            cache=transfer.get_stat_cache(instance.context)
+        )
+
+        for resource in resources:
 
             # Ensure required "source" in resource
             assert "source" in resource, (
@@ -36,9 +43,15 @@ class ValidateResources(pyblish.api.InstancePlugin):
             )
 
             # Detect paths that are not a file or don't exist
-            not_files = [f for f in resource["files"] if not os.path.isfile(f)]
+            not_files = [f for f in resource["files"] if sizes[f] is None]
             assert not not_files, (
                 "Found non-files or non-existing files: %s (resource: %s)" % (
                     not_files, resource
                 )
             )
+
+            # Detect empty files, e.g. from failed or interrupted writes
+            empty = [f for f in resource["files"] if sizes[f] == 0]
+            assert not empty, (
+                "Found empty files: %s (resource: %s)" % (empty, resource)
+            )
@@ -1,17 +1,6 @@
 import pyblish.api
 
-from avalon.vendor import clique
-
-
-def get_collections(files):
-    """Return the file collection and its remainder"""
-
-    # Support filenames like: projectX_shot01_0010.tiff with this regex
-    pattern = r"(?P<index>(?P<padding>0*)\d+)\.\D+\d?$"
-    collections, remainder = clique.assemble(files,
-                                             patterns=[pattern],
-                                             minimum_items=1)
-    return collections, remainder
+from colorbleed import sequence
 
 
 class ValidateSequenceFrames(pyblish.api.InstancePlugin):
@@ -33,20 +22,18 @@ class ValidateSequenceFrames(pyblish.api.InstancePlugin):
         assert isinstance(filenames[0], (list, tuple))
         assert len(filenames) == 1, \
             "Image Sequence instance should have one collection"
-        collections, remainder = get_collections(filenames[0])
 
-        assert len(collections) == 1, \
-            "Did not find a single collection: {0}".format(collections)
-        assert not remainder, "Found remaining files: {0}".format(remainder)
+        description = sequence.describe(filenames[0])
+        assert description, \
+            "Did not find a single sequence: {0}".format(filenames[0])
+        self.log.info(sequence.format_sequence(description))
 
-        collection = collections[0]
-        self.log.info(collection)
+        frames = sequence.FrameRanges.from_sequence(description)
 
         frames_explicit = instance.data.get("frames", None)
         if frames_explicit is None:
             # Validate start-end with no holes
-            frames = list(collection.indexes)
-            current_range = (frames[0], frames[-1])
+            current_range = (frames.first, frames.last)
             required_range = (instance.data["startFrame"],
                               instance.data["endFrame"])
 
@@ -55,11 +42,10 @@ class ValidateSequenceFrames(pyblish.api.InstancePlugin):
                                  "expected: {1}".format(current_range,
                                                         required_range))
 
-            missing = collection.holes().indexes
-            assert not missing, "Missing frames: %s" % (missing,)
+            missing = sequence.FrameRanges.from_range(*current_range) - frames
+            assert not missing, "Missing frames: %s" % missing
 
         else:
             # Explicit frames (custom frames list)
-            missing = set(frames_explicit) - collection.indexes
-            assert not missing, "Missing frames: %s" % (sorted(missing),)
-
+            missing = sequence.FrameRanges(frames_explicit) - frames
+            assert not missing, "Missing frames: %s" % missing
@@ -25,6 +25,9 @@ class ExtractAlembic(colorbleed.api.Extractor):
                 "colorbleed.animation.abc",
                 "colorbleed.model"]
 
+    # The cache is only read again from its published location
+    staging_transfer_mode = "move"
+
     def process(self, instance):
 
         if ("outMembers" in instance.data and
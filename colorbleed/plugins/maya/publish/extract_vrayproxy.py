@@ -18,6 +18,9 @@ class ExtractVRayProxy(colorbleed.api.Extractor):
     hosts = ["maya"]
     families = ["colorbleed.vrayproxy"]
 
+    # The proxy is only read again from its published location
+    staging_transfer_mode = "move"
+
     def process(self, instance):
 
         staging_dir = self.staging_dir(instance)
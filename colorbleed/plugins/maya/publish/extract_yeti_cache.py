@@ -18,6 +18,9 @@ class ExtractYetiCache(colorbleed.api.Extractor):
     hosts = ["maya"]
     families = ["colorbleed.yetiRig", "colorbleed.yeticache"]
 
+    # The cache is only read again from its published location
+    staging_transfer_mode = "move"
+
     def process(self, instance):
 
         yeti_nodes = cmds.ls(instance, type="pgYetiMaya")
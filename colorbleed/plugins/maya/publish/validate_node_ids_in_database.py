@@ -1,10 +1,9 @@
 import pyblish.api
 
-import avalon.io as io
-
 import colorbleed.api
 import colorbleed.maya.action
 from colorbleed.maya import lib
+from colorbleed import dbcache
 
 
 class ValidateNodeIdsInDatabase(pyblish.api.InstancePlugin):
@@ -42,11 +41,8 @@ class ValidateNodeIdsInDatabase(pyblish.api.InstancePlugin):
         id_required_nodes = lib.get_id_required_nodes(referenced_nodes=True,
                                                       nodes=instance[:])
 
-        # check ids against database ids
-        db_asset_ids = io.find({"type": "asset"}).distinct("_id")
-        db_asset_ids = set(str(i) for i in db_asset_ids)
-
-        # Get all asset IDs
+        # Get the asset ids of the nodes
+        node_asset_ids = dict()
         for node in id_required_nodes:
             cb_id = lib.get_id(node)
 
@@ -54,7 +50,15 @@ class ValidateNodeIdsInDatabase(pyblish.api.InstancePlugin):
             if not cb_id:
                 continue
 
-            asset_id = cb_id.split(":", 1)[0]
+            node_asset_ids[node] = cb_id.split(":", 1)[0]
+
+        # Check only the ids in use against the database, the results are
+        # shared by all instances of the publish.
+        cache = dbcache.get_document_cache(instance.context)
+        db_asset_ids = cache.get_existing_ids(set(node_asset_ids.values()),
+                                              document_type="asset")
+
+        for node, asset_id in node_asset_ids.items():
             if asset_id not in db_asset_ids:
                 cls.log.error("`%s` has unassociated asset ID" % node)
                 invalid.append(node)
@@ -1,8 +1,8 @@
 import pyblish.api
 import colorbleed.api
 
-import avalon.io as io
 import colorbleed.maya.action
+from colorbleed import dbcache
 
 from colorbleed.maya import lib
 
@@ -38,9 +38,10 @@ class ValidateNodeIDsRelated(pyblish.api.InstancePlugin):
         invalid = list()
 
         asset = instance.data['asset']
-        asset_data = io.find_one({"name": asset,
-                                  "type": "asset"},
-                                 projection={"_id": True})
+        cache = dbcache.get_document_cache(instance.context)
+        asset_data = cache.find_one({"name": asset,
+                                     "type": "asset"},
+                                    projection={"_id": True})
         asset_id = str(asset_data['_id'])
 
         # We do want to check the referenced nodes as we it might be
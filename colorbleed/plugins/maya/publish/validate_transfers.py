@@ -1,8 +1,7 @@
 import pyblish.api
 import colorbleed.api
-import os
 
-from collections import defaultdict
+from colorbleed.transfer import TransferPlan
 
 
 class ValidateTransfers(pyblish.api.InstancePlugin):
@@ -11,6 +10,9 @@ class ValidateTransfers(pyblish.api.InstancePlugin):
     This validates:
         - The resources all transfer to a unique destination.
 
+    The destinations are compared case insensitive so that the transfers
+    are also unique on case insensitive filesystems.
+
     """
 
     order = colorbleed.api.ValidateContentsOrder
@@ -22,24 +24,10 @@ class ValidateTransfers(pyblish.api.InstancePlugin):
         if not transfers:
             return
 
-        # Collect all destination with its sources
-        collected = defaultdict(set)
-        for source, destination in transfers:
-
-            # Use normalized paths in comparison and ignore case sensitivity
-            source = os.path.normpath(source).lower()
-            destination = os.path.normpath(destination).lower()
-
-            collected[destination].add(source)
-
-        invalid_destinations = list()
-        for destination, sources in collected.items():
-            if len(sources) > 1:
-                invalid_destinations.append(destination)
-
-                self.log.error("Non-unique file transfer for resources: "
-                               "{0} (sources: {1})".format(destination,
-                                                           list(sources)))
+        plan = TransferPlan(transfers)
+        for destination, sources in sorted(plan.case_collisions.items()):
+            self.log.error("Non-unique file transfer for resources: "
+                           "{0} (sources: {1})".format(destination, sources))
 
-        if invalid_destinations:
+        if plan.case_collisions:
             raise RuntimeError("Invalid transfers in queue.")
@@ -0,0 +1,91 @@
+"""Create the database indexes the publishing of colorbleed relies on.
+
+This is a one-off setup script to run once per project, e.g. after creating
+the project, and is safe to run again:
+
+    python -m colorbleed.scripts.ensure_indexes --project <project>
+
+Without `--project` the indexes are created for all projects of the
+database. The database is taken from the `AVALON_MONGO` and `AVALON_DB`
+environment variables like `avalon.io` does.
+
+"""
+
+import os
+import sys
+import logging
+
+import pymongo
+import pymongo.errors
+
+handler = logging.basicConfig()
+log = logging.getLogger("Ensure Indexes")
+log.setLevel(logging.INFO)
+
+
+def ensure_unique_subset_names(collection):
+    """Create a unique index on the name of the subsets per asset.
+
+    The Integrator relies on this index to detect that a concurrent publish
+    created the same subset, see `colorbleed.lib.Integrator`.
+
+    Raises:
+        pymongo.errors.PyMongoError: When the index can't be created, e.g.
+            because the project already contains duplicate subsets.
+
+    """
+    collection.create_index([("parent", 1), ("name", 1)],
+                            name="unique_subset_name",
+                            unique=True,
+                            partialFilterExpression={"type": "subset"})
+
+
+def ensure_indexes(database, projects=None):
+    """Create the indexes for the projects in the database
+
+    Args:
+        database (pymongo.database.Database): The Avalon database.
+        projects (list, optional): The names of the projects. Defaults to
+            all projects in the database.
+
+    Returns:
+        list: The names of the projects the indexes could not be created for.
+
+    """
+
+    if projects is None:
+        projects = [name for name in database.list_collection_names()
+                    if database[name].find_one({"type": "project"},
+                                               projection={"_id": True})]
+
+    failed = list()
+    for project in projects:
+        log.info("Ensuring indexes of %s.." % project)
+        try:
+            ensure_unique_subset_names(database[project])
+        except pymongo.errors.PyMongoError as exc:
+            log.error("Unable to create indexes of %s: %s" % (project, exc))
+            failed.append(project)
+
+    return failed
+
+
+def __main__():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--project",
+                        action="append",
+                        help="The project to create the indexes for, "
+                             "defaults to all projects.")
+
+    kwargs, args = parser.parse_known_args()
+
+    client = pymongo.MongoClient(os.environ.get("AVALON_MONGO",
+                                                "mongodb://localhost:27017"))
+    database = client[os.environ.get("AVALON_DB", "avalon")]
+    if ensure_indexes(database, projects=kwargs.project):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    __main__()
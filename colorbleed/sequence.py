@@ -0,0 +1,590 @@
+"""Compact descriptions of file sequences.
+
+A file sequence is described by the filename's head, the frame number's
+padding, the filename's tail and the frame ranges as a list of inclusive
+[start, end] pairs. This avoids having to store every filename of long
+sequences, e.g. in the representation documents:
+
+    >>> describe(["beauty.1001.exr", "beauty.1002.exr", "beauty.1005.exr"])
+    {'head': 'beauty.', 'padding': 4, 'tail': '.exr',
+     'ranges': [[1001, 1002], [1005, 1005]]}
+
+Use `scan` to find the sequences in a directory with a single listing and
+`FrameRanges` to work with sets of frames without expanding them.
+
+"""
+
+import re
+import bisect
+
+from . import transfer
+
+# Frame number directly followed by the file extension(s), for example
+# "name.1001.exr" or "name_1001.bgeo.sc"
+FRAME_PATTERN = re.compile(
+    r"^(?P<head>.*?)(?P<frame>\d+)(?P<tail>(?:\.[^\W\d]\w*)+)$"
+)
+
+
+def get_ranges(frames):
+    """Return the frames as sorted inclusive [start, end] ranges
+
+    Args:
+        frames (iterable): The frame numbers.
+
+    Returns:
+        list: The [start, end] pairs of consecutive frames.
+
+    """
+    ranges = []
+    for frame in sorted(set(frames)):
+        if ranges and frame == ranges[-1][1] + 1:
+            ranges[-1][1] = frame
+        else:
+            ranges.append([frame, frame])
+    return ranges
+
+
+def _describe_frames(head, tail, frames):
+    """Return the sequence descriptions for the frame number strings
+
+    Frames with different padding are split into separate sequences.
+
+    """
+    numbers = set()
+    padding = min(len(frame) for frame in frames)
+    for frame in frames:
+        number = int(frame)
+        if number in numbers or "%0*d" % (padding, number) != frame:
+            break
+        numbers.add(number)
+    else:
+        return [{"head": head,
+                 "padding": padding,
+                 "tail": tail,
+                 "ranges": get_ranges(numbers)}]
+
+    # Split explicitly padded frame numbers by their padding
+    groups = dict()
+    for frame in frames:
+        key = len(frame) if frame.startswith("0") and len(frame) > 1 else 0
+        groups.setdefault(key, []).append(frame)
+    if len(groups) == 1:
+        return []
+
+    descriptions = []
+    for key in sorted(groups):
+        descriptions.extend(_describe_frames(head, tail, groups[key]))
+    return descriptions
+
+
+def describe(filenames):
+    """Return the compact sequence description of the filenames
+
+    Args:
+        filenames (list): The filenames of a single sequence.
+
+    Returns:
+        dict or None: The description with "head", "padding", "tail" and
+            "ranges" keys. None when the filenames are not a sequence that
+            can be reproduced exactly from the description.
+
+    """
+    head = tail = None
+    frames = list()
+    for filename in filenames:
+        match = FRAME_PATTERN.match(filename)
+        if not match:
+            return None
+
+        if head is None:
+            head, tail = match.group("head"), match.group("tail")
+        elif (match.group("head"), match.group("tail")) != (head, tail):
+            return None
+
+        frames.append(match.group("frame"))
+
+    if not frames:
+        return None
+
+    descriptions = _describe_frames(head, tail, frames)
+    if len(descriptions) != 1:
+        return None
+    return descriptions[0]
+
+
+def scan(directory, include=None, exclude=None, pattern=FRAME_PATTERN):
+    """Return the sequences of the files in the directory
+
+    The directory is listed once and the files are grouped into sequences
+    in a single pass without statting the individual files.
+
+    Args:
+        directory (str): The directory to scan.
+        include (str, optional): Regex the filenames must match.
+        exclude (str, optional): Regex for the filenames to exclude.
+        pattern (re.Pattern, optional): Compiled regex with "head", "frame"
+            and "tail" groups to match the filenames of frames.
+            Defaults to `FRAME_PATTERN`.
+
+    Returns:
+        tuple: The sequence descriptions and the remaining filenames that
+            are not part of a sequence.
+
+    """
+    include = re.compile(include) if include else None
+    exclude = re.compile(exclude) if exclude else None
+
+    groups = dict()
+    remainder = list()
+    for filename in transfer.list_files(directory):
+        if include and not include.search(filename):
+            continue
+        if exclude and exclude.search(filename):
+            continue
+
+        match = pattern.match(filename)
+        if not match:
+            remainder.append(filename)
+            continue
+
+        key = (match.group("head"), match.group("tail"))
+        groups.setdefault(key, []).append(match.group("frame"))
+
+    sequences = list()
+    for (head, tail), frames in sorted(groups.items()):
+        sequences.extend(_describe_frames(head, tail, frames))
+
+    return sequences, sorted(remainder)
+
+
+def clip(sequence, start=None, end=None):
+    """Return the sequence with only the frames between start and end
+
+    Returns:
+        dict or None: The clipped sequence, None when no frames remain.
+
+    """
+    ranges = list()
+    for first, last in sequence["ranges"]:
+        if start is not None:
+            first = max(first, start)
+        if end is not None:
+            last = min(last, end)
+        if first <= last:
+            ranges.append([first, last])
+
+    if not ranges:
+        return None
+
+    clipped = dict(sequence)
+    clipped["ranges"] = ranges
+    return clipped
+
+
+def get_holes(sequence):
+    """Return the [start, end] ranges of missing frames in the sequence"""
+    ranges = sequence["ranges"]
+    return [[previous[1] + 1, current[0] - 1]
+            for previous, current in zip(ranges, ranges[1:])]
+
+
+def format_sequence(sequence):
+    """Return a readable label like "beauty.%04d.exr [1001-1010, 1012]"."""
+    ranges = ", ".join(str(start) if start == end else
+                       "{0}-{1}".format(start, end)
+                       for start, end in sequence["ranges"])
+    padding = "%0{0}d".format(sequence["padding"])
+    return "{0}{1}{2} [{3}]".format(sequence["head"],
+                                    padding,
+                                    sequence["tail"],
+                                    ranges)
+
+
+def format_filename(sequence, frame):
+    """Return the filename of a frame of the sequence"""
+    return "{0}{1:0{2}d}{3}".format(sequence["head"],
+                                    frame,
+                                    sequence["padding"],
+                                    sequence["tail"])
+
+
+def iter_frames(sequence):
+    """Yield the frame numbers of the sequence"""
+    for start, end in sequence["ranges"]:
+        for frame in range(start, end + 1):
+            yield frame
+
+
+def iter_filenames(sequence):
+    """Yield the filenames of the sequence"""
+    for frame in iter_frames(sequence):
+        yield format_filename(sequence, frame)
+
+
+def get_first_filename(sequence):
+    """Return the filename of the first frame of the sequence"""
+    return format_filename(sequence, sequence["ranges"][0][0])
+
+
+def get_frame_count(sequence):
+    """Return the amount of frames in the sequence"""
+    return sum(end - start + 1 for start, end in sequence["ranges"])
+
+
+def has_frame(sequence, frame):
+    """Return whether the sequence contains the frame
+
+    This does not expand the sequence's ranges.
+
+    """
+    ranges = sequence["ranges"]
+    index = bisect.bisect_right(ranges, [frame, float("inf")]) - 1
+    return index >= 0 and frame <= ranges[index][1]
+
+
+try:
+    _range = xrange  # Python 2
+except NameError:
+    _range = range
+
+# A single range in a frame ranges string, e.g. "15", "1-10" or "1-10x2"
+_RANGE_PATTERN = re.compile(r"^(-?\d+)(?:-(-?\d+)(?:x(\d+))?)?$")
+
+
+class _RunBuilder(object):
+    """Build the canonical (start, end, step) runs of sorted unique frames
+
+    Frames are added greedily to the current run as long as the step
+    between them stays the same. A run of only two frames is not kept with
+    a step larger than one, its last frame starts a new run instead so
+    e.g. 1, 5, 6, 7 becomes "1,5-7" instead of "1-5x4,6-7".
+
+    """
+
+    def __init__(self):
+        self.runs = []
+        self.start = None
+        self.end = None
+        self.step = None
+
+    def add(self, frame):
+        if self.start is None:
+            self.start = self.end = frame
+        elif self.step is None:
+            self.step = frame - self.end
+            self.end = frame
+        elif frame - self.end == self.step:
+            self.end = frame
+        elif self.step != 1 and self.end - self.start == self.step:
+            # Continue from the last frame of a two frame run
+            self.runs.append((self.start, self.start, 1))
+            self.start = self.end
+            self.step = frame - self.end
+            self.end = frame
+        else:
+            self._flush()
+            self.start = self.end = frame
+
+    def extend(self, start, end, step):
+        """Add the frames from start to end (inclusive) by step"""
+        end = start + (end - start) // step * step
+        frame = start
+        while frame <= end:
+            self.add(frame)
+            if self.step == step and self.end == frame:
+                # The remaining frames continue the current run
+                self.end = end
+                return
+            frame += step
+
+    def _flush(self):
+        if self.start is None:
+            return
+        if self.step is None:
+            self.runs.append((self.start, self.start, 1))
+        elif self.step != 1 and self.end - self.start == self.step:
+            self.runs.append((self.start, self.start, 1))
+            self.runs.append((self.end, self.end, 1))
+        else:
+            self.runs.append((self.start, self.end, self.step))
+        self.start = self.end = self.step = None
+
+    def build(self):
+        self._flush()
+        return tuple(self.runs)
+
+
+def _merge(first, second, keep):
+    """Yield the sorted frames of two iterators of sorted unique frames
+
+    Args:
+        first (iterator): Frames of the first set.
+        second (iterator): Frames of the second set.
+        keep (function): Return whether to keep a frame given whether it is
+            in the first and in the second set.
+
+    """
+    sentinel = object()
+    a = next(first, sentinel)
+    b = next(second, sentinel)
+    while a is not sentinel or b is not sentinel:
+        if b is sentinel or (a is not sentinel and a < b):
+            if keep(True, False):
+                yield a
+            a = next(first, sentinel)
+        elif a is sentinel or b < a:
+            if keep(False, True):
+                yield b
+            b = next(second, sentinel)
+        else:
+            if keep(True, True):
+                yield a
+            a = next(first, sentinel)
+            b = next(second, sentinel)
+
+
+def _merge_intervals(first, second, keep):
+    """Return the intervals of two lists of sorted disjoint intervals
+
+    This is the equivalent of `_merge` for runs with a step of one which
+    only has to visit the boundaries of the intervals.
+
+    """
+    bounds = sorted(set([start for start, _ in first] +
+                        [end + 1 for _, end in first] +
+                        [start for start, _ in second] +
+                        [end + 1 for _, end in second]))
+
+    def _walk(intervals):
+        # Yield per boundary whether the frame at it is in the intervals
+        index = 0
+        for bound in bounds:
+            while index < len(intervals) and intervals[index][1] < bound:
+                index += 1
+            yield (index < len(intervals) and
+                   intervals[index][0] <= bound)
+
+    intervals = []
+    states = zip(bounds, _walk(first), _walk(second))
+    for (bound, in_first, in_second), next_bound in zip(states,
+                                                        bounds[1:]):
+        if not keep(in_first, in_second):
+            continue
+        if intervals and intervals[-1][1] == bound - 1:
+            intervals[-1][1] = next_bound - 1
+        else:
+            intervals.append([bound, next_bound - 1])
+
+    return intervals
+
+
+class FrameRanges(object):
+    """Immutable set of frame numbers stored as run-length encoded ranges
+
+    The frames are stored as sorted (start, end, step) runs so a regular
+    frame range takes the same amount of memory regardless of its length.
+    Iterating the frames generates them lazily.
+
+        >>> frames = FrameRanges.parse("1-10x2,15")
+        >>> list(frames)
+        [1, 3, 5, 7, 9, 15]
+        >>> 7 in frames, 8 in frames
+        (True, False)
+        >>> str(frames | FrameRanges.from_range(2, 4))
+        '1-5,7,9,15'
+        >>> str(FrameRanges.from_range(1001, 1100) - frames)
+        '1001-1100'
+
+    Args:
+        frames (iterable, optional): The frame numbers, in any order.
+
+    """
+
+    __slots__ = ("_runs", "_starts")
+
+    def __init__(self, frames=()):
+        if isinstance(frames, FrameRanges):
+            runs = frames._runs
+        else:
+            builder = _RunBuilder()
+            for frame in sorted(set(int(frame) for frame in frames)):
+                builder.add(frame)
+            runs = builder.build()
+
+        self._set_runs(runs)
+
+    def _set_runs(self, runs):
+        self._runs = runs
+        self._starts = [start for start, _, _ in runs]
+
+    @classmethod
+    def _from_runs(cls, runs):
+        """Return the frame ranges of sorted disjoint (start, end, step)"""
+        builder = _RunBuilder()
+        for start, end, step in runs:
+            builder.extend(start, end, step)
+
+        result = cls.__new__(cls)
+        result._set_runs(builder.build())
+        return result
+
+    @classmethod
+    def from_range(cls, start, end, step=1):
+        """Return the frames from start to end (inclusive) by step"""
+        start, end, step = int(start), int(end), int(step)
+        if step < 1:
+            raise ValueError("Step must be positive: {0}".format(step))
+        if end < start:
+            return cls()
+        return cls._from_runs([(start, end, step)])
+
+    @classmethod
+    def from_sequence(cls, sequence):
+        """Return the frames of a sequence description"""
+        return cls._from_runs([(start, end, 1)
+                               for start, end in sequence["ranges"]])
+
+    @classmethod
+    def parse(cls, text):
+        """Return the frames of a string like "1-10x2,15"
+
+        The comma separated ranges are single frames, "start-end" ranges
+        or "start-endxstep" ranges with a step. The ranges may overlap.
+
+        Raises:
+            ValueError: When the string is not a valid frame ranges string.
+
+        """
+        result = cls()
+        for part in text.split(","):
+            part = part.strip()
+            if not part:
+                continue
+
+            match = _RANGE_PATTERN.match(part)
+            if not match:
+                raise ValueError("Invalid frame range: {0}".format(part))
+
+            start, end, step = match.groups()
+            start = int(start)
+            end = start if end is None else int(end)
+            if end < start:
+                raise ValueError("Invalid frame range: {0}".format(part))
+
+            result |= cls.from_range(start, end, step or 1)
+
+        return result
+
+    @property
+    def ranges(self):
+        """Return the (start, end, step) runs of the frames"""
+        return list(self._runs)
+
+    @property
+    def first(self):
+        """Return the first frame, None when empty"""
+        return self._runs[0][0] if self._runs else None
+
+    @property
+    def last(self):
+        """Return the last frame, None when empty"""
+        return self._runs[-1][1] if self._runs else None
+
+    def is_continuous(self):
+        """Return whether the frames have no holes between first and last"""
+        return len(self._runs) <= 1 and all(step == 1 for _, _, step
+                                            in self._runs)
+
+    def step(self, step):
+        """Return the frames that are a multiple of step from the first"""
+        step = int(step)
+        if step < 1:
+            raise ValueError("Step must be positive: {0}".format(step))
+        if not self._runs:
+            return FrameRanges()
+        return self & FrameRanges.from_range(self.first, self.last, step)
+
+    def _combine(self, other, keep):
+        if not isinstance(other, FrameRanges):
+            other = FrameRanges(other)
+
+        if all(step == 1 for _, _, step in self._runs + other._runs):
+            intervals = _merge_intervals(
+                [(start, end) for start, end, _ in self._runs],
+                [(start, end) for start, end, _ in other._runs],
+                keep
+            )
+            return self._from_runs([(start, end, 1)
+                                    for start, end in intervals])
+
+        builder = _RunBuilder()
+        for frame in _merge(iter(self), iter(other), keep):
+            builder.add(frame)
+
+        result = FrameRanges.__new__(FrameRanges)
+        result._set_runs(builder.build())
+        return result
+
+    def union(self, other):
+        """Return the frames that are in either of the frame ranges"""
+        return self._combine(other, lambda a, b: a or b)
+
+    def intersection(self, other):
+        """Return the frames that are in both frame ranges"""
+        return self._combine(other, lambda a, b: a and b)
+
+    def difference(self, other):
+        """Return the frames that are not in the other frame ranges"""
+        return self._combine(other, lambda a, b: a and not b)
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+
+    def __contains__(self, frame):
+        index = bisect.bisect_right(self._starts, frame) - 1
+        if index < 0:
+            return False
+        start, end, step = self._runs[index]
+        return frame <= end and (frame - start) % step == 0
+
+    def __iter__(self):
+        for start, end, step in self._runs:
+            for frame in _range(start, end + 1, step):
+                yield frame
+
+    def __len__(self):
+        return sum((end - start) // step + 1
+                   for start, end, step in self._runs)
+
+    def __bool__(self):
+        return bool(self._runs)
+
+    __nonzero__ = __bool__
+
+    def __eq__(self, other):
+        if not isinstance(other, FrameRanges):
+            return NotImplemented
+        return self._runs == other._runs
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __hash__(self):
+        return hash(self._runs)
+
+    def __str__(self):
+        parts = []
+        for start, end, step in self._runs:
+            if start == end:
+                parts.append(str(start))
+            elif step == 1:
+                parts.append("{0}-{1}".format(start, end))
+            else:
+                parts.append("{0}-{1}x{2}".format(start, end, step))
+        return ",".join(parts)
+
+    def __repr__(self):
+        return "FrameRanges({0!r})".format(str(self))
@@ -0,0 +1,1191 @@
+"""Library for transferring files from a staging area to a publish location.
+
+The Integrator hands its list of `[source, destination]` transfers to a
+`TransferExecutor` which copies them with a bounded pool of worker threads.
+Network storage (NFS, SMB) is mostly latency bound for many smaller files so
+copying multiple files in parallel greatly improves the throughput.
+
+"""
+import os
+import sys
+import json
+import ctypes
+import stat
+import errno
+import hashlib
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+
+from .vendor import speedcopy
+
+log = logging.getLogger(__name__)
+
+
+def _replace_windows(src, dst):
+    """Rename `src` to `dst`, overwriting `dst` if it exists (Windows)"""
+    flags = 0x1 | 0x8  # MOVEFILE_REPLACE_EXISTING | MOVEFILE_WRITE_THROUGH
+    encoding = sys.getfilesystemencoding()
+    if isinstance(src, bytes):
+        src = src.decode(encoding)
+    if isinstance(dst, bytes):
+        dst = dst.decode(encoding)
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    if not kernel32.MoveFileExW(src, dst, flags):
+        raise ctypes.WinError(ctypes.get_last_error())
+
+
+# os.replace overwrites existing files on Windows too (Python 3.3+). On
+# Python 2 os.rename fails on Windows when the destination exists.
+if hasattr(os, "replace"):
+    _replace = os.replace
+elif sys.platform.startswith("win32"):
+    _replace = _replace_windows
+else:
+    _replace = os.rename
+
+try:
+    _scandir = os.scandir
+except AttributeError:
+    try:
+        from scandir import scandir as _scandir  # Python 2 backport
+    except ImportError:
+        _scandir = None
+
+# Default maximum amount of files copied in parallel
+DEFAULT_MAX_WORKERS = 8
+
+# Hash algorithm for the checksums of published files
+CHECKSUM_ALGORITHM = "sha1"
+
+
+def get_max_workers():
+    """Return the maximum amount of parallel transfers.
+
+    This can be overridden with the `CB_TRANSFER_WORKERS` environment
+    variable. A value of 1 disables parallel transfers.
+
+    Returns:
+        int: The maximum amount of parallel transfers.
+
+    """
+    value = os.environ.get("CB_TRANSFER_WORKERS")
+    if not value:
+        return DEFAULT_MAX_WORKERS
+
+    try:
+        return max(1, int(value))
+    except ValueError:
+        log.warning("Invalid CB_TRANSFER_WORKERS value: %s", value)
+        return DEFAULT_MAX_WORKERS
+
+
+def get_filesystem_limits():
+    """Return the maximum amount of parallel transfers per filesystem.
+
+    This is set with the `CB_TRANSFER_LIMITS` environment variable as
+    `root=count` entries separated by `os.pathsep`, for example:
+        /mnt/projects=4:/mnt/renders=2
+
+    Returns:
+        dict: The maximum amount of parallel transfers per root path.
+
+    """
+    value = os.environ.get("CB_TRANSFER_LIMITS")
+    if not value:
+        return dict()
+
+    limits = dict()
+    for entry in value.split(os.pathsep):
+        if not entry.strip():
+            continue
+
+        root, _, count = entry.rpartition("=")
+        root = root.strip()
+        try:
+            count = int(count)
+        except ValueError:
+            root = None
+
+        if not root:
+            log.warning("Invalid CB_TRANSFER_LIMITS entry: %s", entry)
+            continue
+
+        limits[root] = max(1, count)
+
+    return limits
+
+
+def ensure_directory(path):
+    """Create the directory (and its parents) when it doesn't exist yet.
+
+    This is safe to be called in parallel for the same directory.
+
+    """
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+def get_device(path):
+    """Return the device id for the filesystem that `path` will be on.
+
+    The path itself does not need to exist yet, the nearest existing parent
+    directory is used instead.
+
+    """
+    path = os.path.abspath(path)
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+
+
+def copy_file(src, dst):
+    """Copy `src` to `dst` creating the destination folder if needed"""
+    ensure_directory(os.path.dirname(dst))
+    speedcopy.copyfile(src, dst)
+
+
+def copy_file_checksum(src, dst):
+    """Copy `src` to `dst` and return the checksum of the copied data"""
+    ensure_directory(os.path.dirname(dst))
+    return speedcopy.copyfile_hash(src, dst, algorithm=CHECKSUM_ALGORITHM)
+
+
+def _is_same_file(src, dst):
+    """Return whether both paths exist and refer to the same file"""
+    try:
+        return os.path.samefile(src, dst)
+    except (OSError, AttributeError):
+        # AttributeError: os.path.samefile is unavailable on Windows in py2
+        return os.path.normcase(os.path.abspath(src)) == \
+            os.path.normcase(os.path.abspath(dst))
+
+
+class TransferError(RuntimeError):
+    """Raised when one or more transfers failed.
+
+    Attributes:
+        errors (list): List of (index, source, destination, exception) in
+            the order the transfers were provided.
+
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+
+        lines = ["{0} -> {1}: {2}".format(src, dst, exc)
+                 for _, src, dst, exc in errors]
+        message = "{0} transfer(s) failed:\n{1}".format(len(errors),
+                                                        "\n".join(lines))
+        super(TransferError, self).__init__(message)
+
+
+class TransferPlan(object):
+    """Source to destination transfers grouped by destination folder.
+
+    The transfers are analyzed in a single pass:
+        - Identical transfers (after normalizing the paths) are only
+          included once.
+        - Destinations that would be written from multiple sources are
+          collected in `collisions` (using the platform's case sensitivity)
+          and in `case_collisions` (case insensitive, as on Windows).
+
+    Args:
+        transfers (list): The source to destination paths.
+
+    """
+
+    def __init__(self, transfers):
+        self.transfers = list()
+        self.directories = OrderedDict()
+        self.collisions = dict()
+        self.case_collisions = dict()
+        self._size = None
+
+        seen = set()
+        sources = dict()
+        case_sources = dict()
+        for src, dst in transfers:
+            norm_src = os.path.normpath(src)
+            norm_dst = os.path.normpath(dst)
+            if (norm_src, norm_dst) in seen:
+                continue
+            seen.add((norm_src, norm_dst))
+
+            index = len(self.transfers)
+            self.transfers.append((src, dst))
+            self.directories.setdefault(os.path.dirname(norm_dst), []).append(
+                (index, src, dst)
+            )
+
+            key = os.path.normcase(norm_dst)
+            sources.setdefault(key, set()).add(os.path.normcase(norm_src))
+            if len(sources[key]) > 1:
+                self.collisions[key] = sorted(sources[key])
+
+            key = norm_dst.lower()
+            case_sources.setdefault(key, set()).add(norm_src.lower())
+            if len(case_sources[key]) > 1:
+                self.case_collisions[key] = sorted(case_sources[key])
+
+    def __len__(self):
+        return len(self.transfers)
+
+    def __iter__(self):
+        return iter(self.transfers)
+
+    @property
+    def size(self):
+        """Return the total size in bytes of all sources"""
+        if self._size is None:
+            self._size = sum(os.path.getsize(src) for src, _ in self)
+        return self._size
+
+    def create_directories(self):
+        """Create all destination folders"""
+        for dirname in self.directories:
+            ensure_directory(dirname)
+
+    def validate(self):
+        """Raise a RuntimeError when any destination has multiple sources"""
+        if self.collisions:
+            lines = ["{0} (sources: {1})".format(dst, sources)
+                     for dst, sources in sorted(self.collisions.items())]
+            raise RuntimeError("Non-unique file transfers:\n"
+                               "{0}".format("\n".join(lines)))
+
+
+class TransferExecutor(object):
+    """Transfer files with a bounded pool of worker threads.
+
+    The amount of parallel transfers to a single destination filesystem can
+    be limited separately from the total amount of workers, e.g. to avoid
+    overloading a single file server whilst still using all workers when
+    writing to multiple servers.
+
+    The transfers are all-or-nothing: whenever a single transfer fails no new
+    transfers are started, the running transfers are finished and all files
+    created by this executor are removed again (unless `rollback` is
+    disabled). Destinations that existed before are never removed. A
+    `TransferError` is then raised that lists the errors in the order of
+    the input transfers.
+
+    Args:
+        max_workers (int, optional): Maximum amount of parallel transfers.
+            Defaults to `get_max_workers()`.
+        filesystem_limits (dict, optional): Mapping of a root path to the
+            maximum amount of parallel transfers to the filesystem that root
+            is on, e.g. {"/mnt/projects": 4}. See `get_filesystem_limits()`.
+        copy_function (callable, optional): The function to copy a single
+            source to its destination. Defaults to `copy_file`.
+        rollback (bool, optional): Whether to remove the written files when
+            any transfer failed. Disable this when the written files are
+            kept to resume from, e.g. with a `TransferJournal`.
+
+    """
+
+    def __init__(self,
+                 max_workers=None,
+                 filesystem_limits=None,
+                 copy_function=None,
+                 rollback=True):
+
+        if max_workers is None:
+            max_workers = get_max_workers()
+
+        self.max_workers = max(1, max_workers)
+        self.copy_function = copy_function or copy_file
+        self.rollback_on_error = rollback
+        self.log = log
+
+        # Resolve the limits per filesystem device
+        self._device_limits = dict()
+        for root, limit in (filesystem_limits or {}).items():
+            device = get_device(root)
+            if device is not None:
+                self._device_limits[device] = max(1, int(limit))
+
+        self._semaphores = dict()
+        self._lock = threading.Lock()
+
+    def _get_semaphore(self, device):
+        """Return the semaphore limiting transfers for the device"""
+        with self._lock:
+            semaphore = self._semaphores.get(device)
+            if semaphore is None:
+                limit = self._device_limits.get(device, self.max_workers)
+                semaphore = threading.BoundedSemaphore(limit)
+                self._semaphores[device] = semaphore
+            return semaphore
+
+    def execute(self, transfers):
+        """Transfer all source and destination pairs.
+
+        Args:
+            transfers (list or TransferPlan): The source to destination paths
+                to transfer.
+
+        Raises:
+            RuntimeError: When a destination has multiple sources.
+            TransferError: When any of the transfers failed.
+
+        """
+        if isinstance(transfers, TransferPlan):
+            plan = transfers
+        else:
+            plan = TransferPlan(transfers)
+
+        if not plan:
+            return
+
+        plan.validate()
+        plan.create_directories()
+        self.log.debug("Transferring %i files into %i folders",
+                       len(plan), len(plan.directories))
+
+        # Copy grouped by destination folder, its device is resolved once.
+        queue = list()
+        for dirname, items in plan.directories.items():
+            device = get_device(dirname)
+            queue.extend((index, src, dst, device)
+                         for index, src, dst in items)
+
+        # Reverse so we can pop from the end in that order.
+        queue.reverse()
+
+        errors = list()
+        created = list()
+        state = {"failed": False}
+
+        def worker():
+            while True:
+                with self._lock:
+                    if state["failed"] or not queue:
+                        return
+                    index, src, dst, device = queue.pop()
+
+                with self._get_semaphore(device):
+                    with self._lock:
+                        if state["failed"]:
+                            return
+
+                    self.log.info("Copying file {} -> {}".format(src, dst))
+                    existed = os.path.lexists(dst)
+                    try:
+                        self.copy_function(src, dst)
+                    except Exception as exc:
+                        with self._lock:
+                            state["failed"] = True
+                            errors.append((index, src, dst, exc))
+                            if not existed:
+                                created.append(dst)
+                        return
+
+                    if not existed:
+                        with self._lock:
+                            created.append(dst)
+
+        amount = min(self.max_workers, len(plan))
+        if amount == 1:
+            # Avoid the overhead of a thread when running serially
+            worker()
+        else:
+            threads = [threading.Thread(target=worker) for _ in range(amount)]
+            for thread in threads:
+                thread.daemon = True
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        if errors:
+            errors.sort(key=lambda error: error[0])
+
+            # Also remove partially written files of the failed transfers
+            if self.rollback_on_error:
+                self.rollback(created)
+            raise TransferError(errors)
+
+    def rollback(self, paths):
+        """Remove the files created by a failed execution"""
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    self.log.warning("Unable to remove %s: %s", path, e)
+
+
+def hash_file(path,
+              algorithm=CHECKSUM_ALGORITHM,
+              chunk_size=speedcopy.COPY_BUFSIZE):
+    """Return the hex digest of the contents of the file at `path`"""
+    hasher = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def is_resource(path):
+    """Return whether the destination path is a published resource.
+
+    Resources are published into a "resources" folder inside the version
+    folder, see CollectAssumedDestination.
+
+    """
+    return os.path.basename(os.path.dirname(path)) == "resources"
+
+
+def link_file(src, dst):
+    """Hardlink `src` to `dst`, replacing `dst` if it already exists"""
+    ensure_directory(os.path.dirname(dst))
+    try:
+        os.link(src, dst)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+        if _is_same_file(src, dst):
+            return
+        os.remove(dst)
+        os.link(src, dst)
+
+
+def move_file(src, dst):
+    """Move `src` to `dst`, replacing `dst` if it already exists.
+
+    This only renames the file, as such it fails with an OSError when
+    `src` and `dst` are not on the same filesystem.
+
+    """
+    ensure_directory(os.path.dirname(dst))
+    _replace(src, dst)
+
+
+def replace_file(src, dst, mode="copy"):
+    """Atomically replace `dst` with (a copy of) `src`.
+
+    The new file is first created next to `dst` and then renamed over it so
+    readers of `dst` never see a partially written file. With "hardlink" or
+    "symlink" mode this does not copy any data. The symlink is relative so
+    it remains valid when the folders are moved together. When linking fails
+    the file is copied instead.
+
+    Args:
+        src (str): The source file.
+        dst (str): The destination file to replace.
+        mode (str): "copy", "hardlink" or "symlink"
+
+    Returns:
+        str: The mode that was used.
+
+    """
+    dirname = os.path.dirname(dst)
+    ensure_directory(dirname)
+
+    tmp = os.path.join(dirname, ".{0}.{1}.{2}.tmp".format(
+        os.path.basename(dst),
+        os.getpid(),
+        threading.current_thread().ident
+    ))
+
+    try:
+        if mode in {"hardlink", "symlink"}:
+            try:
+                if mode == "hardlink":
+                    os.link(src, tmp)
+                else:
+                    os.symlink(os.path.relpath(src, dirname), tmp)
+            except (OSError, AttributeError, NotImplementedError,
+                    ValueError) as exc:
+                # ValueError: no relative path between drives on Windows
+                log.debug("Unable to %s %s -> %s (%s), copying "
+                          "instead.", mode, src, dst, exc)
+                mode = "copy"
+
+        if mode == "copy":
+            speedcopy.copyfile(src, tmp)
+
+        _replace(tmp, dst)
+    except Exception:
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        raise
+
+    return mode
+
+
+class ResourceStore(object):
+    """Content-addressed store of published resource files.
+
+    Each unique file content is stored once as a "blob" named after its hash.
+    Published resources are hardlinks to those blobs so republishing e.g. a
+    look with unchanged textures does not copy any of the texture data again.
+    The published paths remain exactly the same as with regular copies.
+
+    The blobs are stored as `{root}/{digest[:2]}/{digest}{ext}`
+
+    Note:
+        Hardlinks share their data so published files must never be modified
+        in place, which they shouldn't be anyway. Whenever the store is on a
+        different filesystem than the destination (or hardlinks are not
+        supported) the file is copied instead.
+
+    Args:
+        root (str): The root folder of the store.
+        algorithm (str): The hashlib algorithm to identify contents with.
+
+    """
+
+    def __init__(self, root, algorithm=CHECKSUM_ALGORITHM):
+        self.root = root
+        self.algorithm = algorithm
+        self.log = log
+
+    def get_blob_path(self, digest, ext=""):
+        return os.path.join(self.root, digest[:2], digest + ext)
+
+    def add(self, src):
+        """Add the file to the store when its contents are not stored yet.
+
+        Args:
+            src (str): The file to store.
+
+        Returns:
+            tuple: The blob path and whether it was newly added.
+
+        """
+        digest = hash_file(src, algorithm=self.algorithm)
+        ext = os.path.splitext(src)[1].lower()
+        blob = self.get_blob_path(digest, ext)
+        if os.path.isfile(blob):
+            return blob, False
+
+        # Copy into a temporary file first so that a blob is never seen
+        # partially written by other publishes
+        tmp = "{0}.{1}.{2}.tmp".format(blob,
+                                       os.getpid(),
+                                       threading.current_thread().ident)
+        copy_file(src, tmp)
+        try:
+            os.rename(tmp, blob)
+        except OSError:
+            # On Windows renaming onto an existing blob (added in the mean
+            # time by another publish) fails, keep the existing blob.
+            os.remove(tmp)
+            if not os.path.isfile(blob):
+                raise
+            return blob, False
+
+        return blob, True
+
+    def transfer(self, src, dst):
+        """Transfer `src` to `dst` through the store.
+
+        Returns:
+            str: The hex digest of the file content.
+
+        """
+        blob, is_new = self.add(src)
+        digest = os.path.splitext(os.path.basename(blob))[0]
+        try:
+            link_file(blob, dst)
+        except OSError as e:
+            self.log.debug("Unable to link %s -> %s (%s), "
+                           "copying instead.", blob, dst, e)
+            copy_file(blob, dst)
+            return digest
+
+        if not is_new:
+            self.log.debug("Linked existing resource: %s -> %s", src, dst)
+        return digest
+
+
+def get_partial_directory(directory):
+    """Return the temporary sibling directory to integrate `directory` in.
+
+    Example:
+        >>> get_partial_directory("/publish/modelMain/v003")
+        '/publish/modelMain/.v003.partial'
+
+    """
+    head, tail = os.path.split(os.path.normpath(directory))
+    return os.path.join(head, ".{0}.partial".format(tail))
+
+
+class TransferJournal(object):
+    """Journal of completed transfers to resume an interrupted integration.
+
+    Each completed transfer is appended as a single line of JSON with the
+    source's size and modification time and the checksum of the copied data,
+    if any.
+    The destinations are stored relative to the journal's directory so the
+    journal remains valid when that directory is renamed.
+
+    A transfer is considered complete on resume when the source has not
+    changed and the destination's size and checksum match the journal. For
+    moved files the source must be gone and the destination unchanged.
+
+    Args:
+        directory (str): The directory the transfers are written into.
+        algorithm (str): The hashlib algorithm of the checksums.
+        stat_cache (StatCache, optional): The cache to get the stats of the
+            sources from.
+
+    """
+
+    filename = ".transfers.journal"
+
+    def __init__(self,
+                 directory,
+                 algorithm=CHECKSUM_ALGORITHM,
+                 stat_cache=None):
+        self.directory = directory
+        self.algorithm = algorithm
+        self.path = os.path.join(directory, self.filename)
+        self.stat_cache = stat_cache
+        self.log = log
+
+        self._entries = None
+        self._lock = threading.Lock()
+        self._file = None
+
+    def _load(self):
+        entries = dict()
+        if not os.path.isfile(self.path):
+            return entries
+
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Last line may be incomplete when the process died
+                    continue
+                entries[entry["dst"]] = entry
+        return entries
+
+    def _relative(self, dst):
+        return os.path.relpath(dst, self.directory).replace("\\", "/")
+
+    def _stat_source(self, src):
+        """Return the stat result of the source, None when it is missing"""
+        if self.stat_cache is not None:
+            return self.stat_cache.stat(src)
+
+        try:
+            return os.stat(src)
+        except OSError:
+            return None
+
+    def get_sources(self):
+        """Return the source paths of all journaled transfers"""
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+
+        return set(entry["src"] for entry in self._entries.values())
+
+    def get_completed(self, src, dst):
+        """Return the journal entry when the transfer was completed previously.
+
+        Returns:
+            dict or None: The entry of the completed transfer.
+
+        """
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+
+        entry = self._entries.get(self._relative(dst))
+        if not entry or entry["src"] != src:
+            return None
+
+        try:
+            dst_stat = os.stat(dst)
+        except OSError:
+            return None
+
+        if entry.get("moved"):
+            # The source was renamed to the destination
+            if self._stat_source(src) is not None:
+                return None
+            if (entry["size"] != dst_stat.st_size or
+                    entry["mtime"] != dst_stat.st_mtime):
+                return None
+            return entry
+
+        src_stat = self._stat_source(src)
+        if src_stat is None:
+            return None
+
+        if (entry["size"] != src_stat.st_size or
+                entry["mtime"] != src_stat.st_mtime or
+                dst_stat.st_size != src_stat.st_size):
+            return None
+
+        checksum = entry.get("checksum")
+        if checksum and hash_file(dst, algorithm=self.algorithm) != checksum:
+            return None
+
+        return entry
+
+    def record(self, src, dst, checksum=None, moved=False):
+        """Append a completed transfer to the journal
+
+        Args:
+            src (str): The source path.
+            dst (str): The destination path.
+            checksum (str, optional): The checksum of the transferred data.
+            moved (bool, optional): Whether the source was renamed to the
+                destination, as such the source no longer exists.
+
+        """
+        if moved or self.stat_cache is None:
+            file_stat = os.stat(dst if moved else src)
+        else:
+            file_stat = self.stat_cache.stat(src) or os.stat(src)
+        entry = {"src": src,
+                 "dst": self._relative(dst),
+                 "size": file_stat.st_size,
+                 "mtime": file_stat.st_mtime,
+                 "checksum": checksum,
+                 "moved": moved}
+
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            if self._file is None:
+                ensure_directory(self.directory)
+                self._file = open(self.path, "a")
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def remove(self):
+        """Close and delete the journal file"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+
+def list_files(path):
+    """Return the names of the files in the directory.
+
+    When available this uses the file type information of `os.scandir` so
+    that on most filesystems the files don't need to be statted.
+
+    """
+    if _scandir is not None:
+        names = list()
+        for entry in _scandir(path):
+            try:
+                if entry.is_file():
+                    names.append(entry.name)
+            except OSError:
+                # The file was removed while listing
+                continue
+        return names
+
+    return [name for name in os.listdir(path)
+            if os.path.isfile(os.path.join(path, name))]
+
+
+def map_parallel(function, items, max_workers=None):
+    """Return the results of calling the function for each item.
+
+    The calls are done in a bounded pool of threads, which is useful for
+    latency bound filesystem operations like statting files on a network
+    share. The first exception raised by any call is re-raised.
+
+    Args:
+        function (callable): The function to call with each item.
+        items (iterable): The items.
+        max_workers (int, optional): The maximum amount of threads.
+            Defaults to `get_max_workers()`.
+
+    Returns:
+        list: The results in the order of the items.
+
+    """
+    items = list(items)
+    if max_workers is None:
+        max_workers = get_max_workers()
+
+    amount = min(max_workers, len(items))
+    if amount <= 1:
+        return [function(item) for item in items]
+
+    results = [None] * len(items)
+    indices = deque(range(len(items)))
+    errors = list()
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if errors or not indices:
+                    return
+                index = indices.popleft()
+
+            try:
+                results[index] = function(items[index])
+            except Exception as exc:
+                with lock:
+                    errors.append(exc)
+                return
+
+    threads = [threading.Thread(target=worker) for _ in range(amount)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+    return results
+
+
+def _list_file_entries(path):
+    """Return the files in the directory by their normalized case name.
+
+    The values are the `os.scandir` entries. When scandir is not available
+    all names in the directory are returned with None as value instead, to
+    avoid statting each entry to check whether it is a file.
+
+    """
+    if _scandir is not None:
+        entries = dict()
+        for entry in _scandir(path):
+            try:
+                if entry.is_file():
+                    entries[os.path.normcase(entry.name)] = entry
+            except OSError:
+                # The file was removed while listing
+                continue
+        return entries
+
+    return dict((os.path.normcase(name), None) for name in os.listdir(path))
+
+
+class StatCache(object):
+    """Cache of the stats of files, populated from directory listings.
+
+    Instead of checking each file separately the parent directory of a file
+    is listed once to find which files exist. Only the existing files are
+    statted, which is free from the listing on Windows. Each file is only
+    statted once until its cache entry is invalidated, so the plug-ins of a
+    publish can share the stats, see `get_stat_cache`.
+
+    Invalidate the paths that are written, moved or removed to ensure they
+    are statted again.
+
+    Args:
+        max_workers (int, optional): The maximum amount of threads used by
+            `prefetch`. Defaults to `get_max_workers()`.
+
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+
+        # The stat results (or None) per normalized path
+        self._stats = dict()
+
+        # The listed files per normalized directory, None when the directory
+        # can't be listed so its files are statted separately.
+        self._listings = dict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def _list(self, directory):
+        with self._lock:
+            if directory in self._listings:
+                return self._listings[directory]
+
+        try:
+            listing = _list_file_entries(directory)
+        except OSError as exc:
+            if exc.errno in (errno.ENOENT, errno.ENOTDIR):
+                listing = dict()
+            else:
+                listing = None
+
+        with self._lock:
+            self._listings[directory] = listing
+        return listing
+
+    def stat(self, path):
+        """Return the stat result of the file
+
+        Returns:
+            os.stat_result or None: None when it is not an existing file.
+
+        """
+        key = self._key(path)
+        with self._lock:
+            if key in self._stats:
+                return self._stats[key]
+
+        directory, name = os.path.split(key)
+        listing = self._list(directory)
+        if listing is not None and name not in listing:
+            result = None
+        else:
+            entry = listing[name] if listing else None
+            try:
+                result = os.stat(key) if entry is None else entry.stat()
+            except OSError:
+                result = None
+            if result is not None and not stat.S_ISREG(result.st_mode):
+                result = None
+
+        with self._lock:
+            self._stats[key] = result
+        return result
+
+    def exists(self, path):
+        """Return whether the path is an existing file"""
+        return self.stat(path) is not None
+
+    def get_size(self, path):
+        """Return the size of the file in bytes, None when it doesn't exist"""
+        result = self.stat(path)
+        return None if result is None else result.st_size
+
+    def get_mtime(self, path):
+        """Return the modification time of the file, None if it is missing"""
+        result = self.stat(path)
+        return None if result is None else result.st_mtime
+
+    def prefetch(self, paths):
+        """Stat the files in parallel, listing each directory once"""
+        keys = set(self._key(path) for path in paths)
+        with self._lock:
+            keys.difference_update(self._stats)
+
+        directories = set(os.path.dirname(key) for key in keys)
+        map_parallel(self._list, directories, self.max_workers)
+        map_parallel(self.stat, keys, self.max_workers)
+
+    def invalidate(self, paths=None):
+        """Remove the cached stats of the files
+
+        The listing of their parent directories is removed too, so files
+        created since the listing are found.
+
+        Args:
+            paths (list, optional): The file paths. When not provided the
+                full cache is cleared.
+
+        """
+        with self._lock:
+            if paths is None:
+                self._stats.clear()
+                self._listings.clear()
+                return
+
+            for path in paths:
+                key = self._key(path)
+                self._stats.pop(key, None)
+                self._listings.pop(os.path.dirname(key), None)
+
+    def invalidate_tree(self, directory):
+        """Remove the cached stats of all files inside the directory"""
+        key = self._key(directory)
+        prefix = os.path.join(key, "")
+        with self._lock:
+            for cache in (self._stats, self._listings):
+                for path in list(cache):
+                    if path == key or path.startswith(prefix):
+                        cache.pop(path)
+            self._listings.pop(os.path.dirname(key), None)
+
+
+def get_stat_cache(context):
+    """Return the stat cache shared by the plug-ins of a publish
+
+    The cache is stored in the context's data as "statCache".
+
+    Args:
+        context (pyblish.api.Context): The publish context.
+
+    Returns:
+        StatCache: The stat cache of the context.
+
+    """
+    cache = context.data.get("statCache")
+    if cache is None:
+        cache = StatCache()
+        context.data["statCache"] = cache
+    return cache
+
+
+def get_file_sizes(paths, max_workers=None, cache=None):
+    """Return the size of each file, or None when it is not an existing file.
+
+    The files are statted in parallel and each parent directory is only
+    listed once, see `StatCache`.
+
+    Args:
+        paths (iterable): The file paths.
+        max_workers (int, optional): The maximum amount of threads.
+            Defaults to `get_max_workers()`.
+        cache (StatCache, optional): The cache to get the stats from.
+
+    Returns:
+        dict: The size in bytes (or None) per path.
+
+    """
+    if cache is None:
+        cache = StatCache(max_workers=max_workers)
+
+    paths = list(paths)
+    cache.prefetch(paths)
+    return dict((path, cache.get_size(path)) for path in paths)
+
+
+def _list_entries(path):
+    """Return (path, is_dir) for the entries in the directory.
+
+    Symlinks to directories are not considered directories so they are
+    never followed.
+
+    """
+    if _scandir is not None:
+        return [(entry.path, entry.is_dir(follow_symlinks=False))
+                for entry in _scandir(path)]
+
+    entries = list()
+    for name in os.listdir(path):
+        entry = os.path.join(path, name)
+        entries.append((entry,
+                        os.path.isdir(entry) and not os.path.islink(entry)))
+    return entries
+
+
+def remove_tree(path):
+    """Remove the directory and all its contents.
+
+    This is similar to `shutil.rmtree` but uses `os.scandir` so that the
+    type of each entry is known from the directory listing itself instead of
+    a separate stat call per entry, which is much faster on network storage.
+
+    """
+    for entry, is_dir in _list_entries(path):
+        if is_dir:
+            remove_tree(entry)
+            continue
+
+        try:
+            os.remove(entry)
+        except OSError:
+            # Read-only files can't be removed on Windows
+            os.chmod(entry, stat.S_IWRITE)
+            os.remove(entry)
+
+    os.rmdir(path)
+
+
+def is_inside(path, root, resolve=True):
+    """Return whether `path` is inside the `root` folder (not the root)
+
+    Args:
+        path (str): The path to check.
+        root (str): The folder.
+        resolve (bool, optional): Whether to resolve symlinks first. When
+            disabled the paths are only compared by their normalized names,
+            which does not access the filesystem.
+
+    """
+    normalize = os.path.realpath if resolve else os.path.abspath
+    path = os.path.normcase(normalize(path))
+    root = os.path.normcase(normalize(root))
+    return path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+class BackgroundCleaner(object):
+    """Remove directories in a background thread.
+
+    The directories are removed one by one in a single worker thread which
+    exits once all queued directories are removed. It is not a daemon thread
+    so the interpreter waits for the removals to finish on exit.
+
+    """
+
+    def __init__(self):
+        self.log = log
+        self._paths = deque()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def remove(self, path, roots):
+        """Queue the directory for removal.
+
+        Args:
+            path (str): The directory to remove.
+            roots (list): The folders `path` is allowed to be in. This
+                guards against removing anything else by accident.
+
+        Raises:
+            ValueError: When `path` is not inside any of the roots.
+
+        """
+        if not any(root and is_inside(path, root) for root in roots):
+            raise ValueError("Refusing to remove directory outside of "
+                             "{0}: {1}".format(roots, path))
+
+        with self._lock:
+            self._paths.append(path)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name="BackgroundCleaner")
+                self._thread.start()
+
+    def wait(self, timeout=None):
+        """Wait for all queued directories to be removed"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._paths:
+                    self._thread = None
+                    return
+                path = self._paths.popleft()
+
+            start = time.time()
+            try:
+                remove_tree(path)
+            except Exception as exc:
+                self.log.warning("Failed to remove %s: %s", path, exc)
+            else:
+                self.log.info("Removed %s in %.2f seconds",
+                              path, time.time() - start)
+
+
+# The shared cleaner for e.g. staging directories
+cleaner = BackgroundCleaner()
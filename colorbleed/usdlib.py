@@ -117,7 +117,7 @@ def create_shot(filepath, layers, create_layers=False):
     return filepath
 
 
-def create_model(filename, asset, variant_subsets):
+def create_model(filename, asset, variant_subsets, cache=None):
     """Create a USD Model file.
 
     For each of the variation paths it will payload the path and set its
@@ -125,7 +125,8 @@ def create_model(filename, asset, variant_subsets):
 
     """
 
-    asset_doc = io.find_one({"name": asset, "type": "asset"})
+    database = cache or io
+    asset_doc = database.find_one({"name": asset, "type": "asset"})
     assert asset_doc, "Asset not found: %s" % asset
 
     variants = []
@@ -140,7 +141,8 @@ def create_model(filename, asset, variant_subsets):
 
         path = get_usd_master_path(asset=asset_doc,
                                    subset=subset,
-                                   representation="usd")
+                                   representation="usd",
+                                   cache=cache)
         variants.append((variant, path))
 
     stage = _create_variants_file(filename,
@@ -164,7 +166,7 @@ def create_model(filename, asset, variant_subsets):
     stage.GetRootLayer().Save()
 
 
-def create_shade(filename, asset, variant_subsets):
+def create_shade(filename, asset, variant_subsets, cache=None):
     """Create a master USD shade file for an asset.
 
     For each available model variation this should generate a reference
@@ -172,7 +174,8 @@ def create_shade(filename, asset, variant_subsets):
 
     """
 
-    asset_doc = io.find_one({"name": asset, "type": "asset"})
+    database = cache or io
+    asset_doc = database.find_one({"name": asset, "type": "asset"})
     assert asset_doc, "Asset not found: %s" % asset
 
     variants = []
@@ -189,7 +192,8 @@ def create_shade(filename, asset, variant_subsets):
         shade_subset = re.sub("^usdModel", "usdShade", subset)
         path = get_usd_master_path(asset=asset_doc,
                                    subset=shade_subset,
-                                   representation="usd")
+                                   representation="usd",
+                                   cache=cache)
         variants.append((variant, path))
 
     stage = _create_variants_file(filename,
@@ -203,14 +207,16 @@ def create_shade(filename, asset, variant_subsets):
 def create_shade_variation(filename,
                            asset,
                            model_variant,
-                           shade_variants):
+                           shade_variants,
+                           cache=None):
     """Create the master Shade file for a specific model variant.
 
     This should reference all shade variants for the specific model variant.
 
     """
 
-    asset_doc = io.find_one({"name": asset, "type": "asset"})
+    database = cache or io
+    asset_doc = database.find_one({"name": asset, "type": "asset"})
     assert asset_doc, "Asset not found: %s" % asset
 
     variants = []
@@ -219,7 +225,8 @@ def create_shade_variation(filename,
                                                    shade=variant)
         path = get_usd_master_path(asset=asset_doc,
                                    subset=subset,
-                                   representation="usd")
+                                   representation="usd",
+                                   cache=cache)
         variants.append((variant, path))
 
     stage = _create_variants_file(filename,
@@ -301,24 +308,33 @@ def _create_variants_file(filename,
 
 def get_usd_master_path(asset,
                         subset,
-                        representation):
+                        representation,
+                        cache=None):
     """Get the filepath for a .usd file of a subset.
 
     This will return the path to an unversioned master file generated by
     `usd_master_file.py`.
 
+    Args:
+        asset (str or dict): The asset name or asset document.
+        subset (str): The subset name.
+        representation (str): The representation name.
+        cache (colorbleed.dbcache.DocumentCache, optional): The document
+            cache to query instead of the database directly.
+
     """
 
-    project = io.find_one({"type": "project"},
-                          projection={"config.template.publish": True})
+    database = cache or io
+    project = database.find_one({"type": "project"},
+                                projection={"config.template.publish": True})
     template = project["config"]["template"]["publish"]
 
     if isinstance(asset, dict) and "silo" in asset and "name" in asset:
         # Allow explicitly passing asset document
         asset_doc = asset
     else:
-        asset_doc = io.find_one({"name": asset,
-                                "type": "asset"})
+        asset_doc = database.find_one({"name": asset,
+                                      "type": "asset"})
 
     path = template.format(**{
         "root": api.registered_root(),
@@ -0,0 +1,61 @@
+import os
+import time
+
+import pytest
+
+# The durations measured by the benchmarks of this session
+_durations = list()
+
+
+def pytest_addoption(parser):
+    parser.addoption("--benchmark",
+                     action="store_true",
+                     default=False,
+                     help="Run the benchmarks, also enabled by setting "
+                          "the CB_BENCHMARK environment variable.")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers",
+                            "benchmark: slow benchmark, only runs with "
+                            "--benchmark")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark") or os.environ.get("CB_BENCHMARK"):
+        return
+
+    skip = pytest.mark.skip(reason="Benchmarks only run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _durations:
+        return
+
+    terminalreporter.section("benchmarks")
+    for test, label, duration in _durations:
+        terminalreporter.write_line("{0} [{1}]: {2:.3f}s".format(test,
+                                                                 label,
+                                                                 duration))
+
+
+@pytest.fixture
+def timer(request):
+    """Return a function that calls a function and reports its duration
+
+    Usage:
+        >>> result = timer("label", function, *args, **kwargs)
+
+    """
+
+    def timer(label, function, *args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        duration = time.perf_counter() - start
+        _durations.append((request.node.name, label, duration))
+        return result
+
+    return timer
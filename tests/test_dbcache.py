@@ -0,0 +1,295 @@
+import pytest
+
+pytest.importorskip("avalon.api")
+pytest.importorskip("pyblish.api")
+
+from colorbleed import dbcache  # noqa: E402
+
+
+class Database(object):
+    """Stand-in for `avalon.io` that records the queries"""
+
+    def __init__(self, documents=None):
+        self.documents = list(documents or [])
+        self.queries = list()
+
+    def find_one(self, filter, projection=None, sort=None):
+        self.queries.append(filter)
+        for document in self.documents:
+            if dbcache._matches(document, filter):
+                return document
+        return None
+
+    def find(self, filter, projection=None, sort=None):
+        self.queries.append(filter)
+        return iter([document for document in self.documents
+                     if dbcache._matches(document, filter)])
+
+    def distinct(self, key, filter):
+        self.queries.append(filter)
+        return sorted(set(document[key] for document in self.documents
+                          if dbcache._matches(document, filter)))
+
+
+class Context(object):
+    def __init__(self):
+        self.data = dict()
+
+
+PROJECT = {"_id": dbcache.io.ObjectId(), "type": "project", "name": "film"}
+ASSET = {"_id": dbcache.io.ObjectId(), "type": "asset", "name": "hero",
+         "parent": PROJECT["_id"]}
+SUBSET = {"_id": dbcache.io.ObjectId(), "type": "subset",
+          "name": "renderMain", "parent": ASSET["_id"],
+          "data": {"lastVersion": 1}}
+
+
+def test_snapshot_serves_project_and_asset():
+    data = dbcache.serialize_documents([PROJECT, ASSET])
+    database = Database()
+    snapshot = dbcache.DocumentSnapshot(
+        documents=dbcache.deserialize_documents(data),
+        database=database
+    )
+
+    assert snapshot.find_one({"type": "project", "name": "film"}) == PROJECT
+    assert snapshot.find_one({"type": "asset",
+                              "name": {"$in": ["hero", "villain"]},
+                              "parent": PROJECT["_id"]}) == ASSET
+    assert snapshot.find_one({"_id": ASSET["_id"],
+                              "type": "asset"}) == ASSET
+    assert not database.queries
+    assert snapshot.misses == 0
+
+    assert snapshot.find_one({"type": "asset", "name": "villain"}) is None
+    assert len(database.queries) == 1
+
+
+def test_snapshot_queries_changing_documents_from_database():
+    # The subset was updated by another publish after the submission
+    current = dict(SUBSET, data={"lastVersion": 4})
+    database = Database([PROJECT, ASSET, current])
+    snapshot = dbcache.DocumentSnapshot(documents=[PROJECT, ASSET, SUBSET],
+                                        database=database)
+    assert all(document["type"] != "subset"
+               for document in snapshot.documents)
+
+    subset = snapshot.find_one({"type": "subset", "name": "renderMain",
+                                "parent": ASSET["_id"]})
+    assert subset["data"]["lastVersion"] == 4
+
+    # Queries without type or with a sort are never served from the snapshot
+    snapshot.find_one({"_id": ASSET["_id"]})
+    snapshot.find_one({"type": "asset"}, sort=[("name", 1)])
+    assert snapshot.find({"type": "asset"})
+    assert snapshot.distinct("name", {"type": "asset"}) == ["hero"]
+    assert len(database.queries) == 5
+    assert snapshot.misses == 3
+
+
+def test_add_document_snapshot():
+    context = Context()
+    database = Database([PROJECT, ASSET, SUBSET])
+    dbcache.get_document_cache(context).database = database
+
+    dbcache.add_document_snapshot(
+        context, dbcache.serialize_documents([PROJECT, ASSET])
+    )
+    cache = dbcache.get_document_cache(context)
+    assert isinstance(cache.database, dbcache.DocumentSnapshot)
+
+    assert cache.find_one({"type": "project", "name": "film"}) == PROJECT
+    assert cache.find_one({"type": "asset", "name": "hero"}) == ASSET
+    assert not database.queries
+
+    assert cache.find_one({"type": "subset",
+                           "parent": ASSET["_id"]}) == SUBSET
+    assert len(database.queries) == 1
+
+
+def test_document_cache_hits_and_misses():
+    database = Database([PROJECT, ASSET, SUBSET])
+    cache = dbcache.DocumentCache(database=database)
+
+    for _ in range(3):
+        assert cache.find_one({"type": "project", "name": "film"}) == PROJECT
+        assert cache.find({"type": "asset"}) == [ASSET]
+        assert cache.distinct("name", {"type": "subset"}) == ["renderMain"]
+    assert (cache.hits, cache.misses) == (6, 3)
+    assert len(database.queries) == 3
+
+    # A different projection or sort is another query
+    cache.find_one({"type": "project", "name": "film"},
+                   projection={"name": True})
+    assert cache.misses == 4
+
+
+def test_document_cache_returns_copies():
+    cache = dbcache.DocumentCache(database=Database([SUBSET]))
+    subset = cache.find_one({"type": "subset"})
+    subset["data"]["lastVersion"] = 10
+    assert cache.find_one({"type": "subset"})["data"]["lastVersion"] == 1
+
+
+def test_document_cache_invalidate():
+    database = Database([PROJECT, ASSET, SUBSET])
+    cache = dbcache.DocumentCache(database=database)
+    cache.find_one({"type": "project"})
+    cache.find_one({"type": {"$in": ["subset", "version"]}})
+    cache.find_one({"_id": ASSET["_id"]})
+
+    # Queries of other types and queries without a type are removed
+    cache.invalidate(["subset"])
+    cache.find_one({"type": "project"})
+    assert cache.misses == 3
+    cache.find_one({"type": {"$in": ["subset", "version"]}})
+    cache.find_one({"_id": ASSET["_id"]})
+    assert cache.misses == 5
+
+    cache.invalidate()
+    cache.find_one({"type": "project"})
+    assert cache.misses == 6
+
+
+def test_document_cache_existing_ids():
+    database = Database([PROJECT, ASSET])
+    cache = dbcache.DocumentCache(database=database)
+    cache.find_one({"type": "asset", "name": "hero"})
+
+    missing = dbcache.io.ObjectId()
+    ids = [ASSET["_id"], str(ASSET["_id"]), missing, "invalid"]
+    assert cache.get_existing_ids(ids, "asset") == {str(ASSET["_id"])}
+    assert len(database.queries) == 2
+    assert database.queries[-1]["_id"]["$in"] == [missing]
+
+    # All ids are known now
+    assert cache.get_existing_ids(ids, "asset") == {str(ASSET["_id"])}
+    assert len(database.queries) == 2
+
+
+def test_document_cache_publish_queries():
+    mongomock = pytest.importorskip("mongomock")
+    collection = mongomock.MongoClient().avalon.film
+    collection.insert_many([PROJECT, ASSET, SUBSET])
+
+    class CountingDatabase(object):
+        queries = 0
+
+        def find_one(self, *args, **kwargs):
+            self.queries += 1
+            return collection.find_one(*args, **kwargs)
+
+    # The queries of the plug-ins for a publish of 50 instances
+    database = CountingDatabase()
+    cache = dbcache.DocumentCache(database=database)
+    for _ in range(50):
+        project = cache.find_one({"type": "project", "name": "film"},
+                                 projection={"name": True})
+        asset = cache.find_one({"type": "asset",
+                                "name": "hero",
+                                "parent": project["_id"]})
+        cache.find_one({"type": "subset",
+                        "name": "renderMain",
+                        "parent": asset["_id"]})
+        cache.find_one({"_id": asset["_id"], "type": "asset"})
+
+    assert database.queries == 4
+    assert cache.hits == 4 * 49
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expires(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(dbcache.time, "time", clock)
+    calls = list()
+
+    def factory():
+        calls.append(clock.now)
+        return {"fps": 25}
+
+    cache = dbcache.TTLCache(ttl=60)
+    for _ in range(3):
+        assert cache.get("project", factory) == {"fps": 25}
+    clock.now += 59
+    cache.get("project", factory)
+    assert len(calls) == 1
+
+    clock.now += 1
+    cache.get("project", factory)
+    assert len(calls) == 2
+
+    # Copies are returned so the cached value can't be edited
+    cache.get("project", factory)["fps"] = 30
+    assert cache.get("project", factory) == {"fps": 25}
+
+    cache.invalidate("project")
+    cache.get("project", factory)
+    cache.get("asset", factory)
+    cache.invalidate()
+    cache.get("asset", factory)
+    assert len(calls) == 5
+
+
+def test_ttl_cache_disabled():
+    calls = list()
+    cache = dbcache.TTLCache(ttl=0)
+    cache.get("project", lambda: calls.append(1))
+    cache.get("project", lambda: calls.append(1))
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, dbcache.DEFAULT_SESSION_CACHE_TTL),
+    ("", dbcache.DEFAULT_SESSION_CACHE_TTL),
+    ("invalid", dbcache.DEFAULT_SESSION_CACHE_TTL),
+    ("5.5", 5.5),
+    ("-1", 0.0),
+])
+def test_get_session_cache_ttl(monkeypatch, value, expected):
+    if value is None:
+        monkeypatch.delenv("CB_SESSION_CACHE_TTL", raising=False)
+    else:
+        monkeypatch.setenv("CB_SESSION_CACHE_TTL", value)
+    assert dbcache.get_session_cache_ttl() == expected
+
+
+def test_existing_asset_ids_shared_by_instances():
+    villain = {"_id": dbcache.io.ObjectId(), "type": "asset",
+               "name": "villain", "parent": PROJECT["_id"]}
+    others = [{"_id": dbcache.io.ObjectId(), "type": "asset",
+               "name": "extra%i" % index, "parent": PROJECT["_id"]}
+              for index in range(100)]
+    database = Database([PROJECT, ASSET, villain] + others)
+
+    context = Context()
+    cache = dbcache.get_document_cache(context)
+    cache.database = database
+
+    # ValidateNodeIdsRelated finds the asset of the instances
+    cache.find_one({"name": "hero", "type": "asset"},
+                   projection={"_id": True})
+
+    # The node ids of 30 instances of which some are of the villain asset
+    # and some of an asset of another project
+    foreign = dbcache.io.ObjectId()
+    for index in range(30):
+        cbids = ["%s:%i" % (ASSET["_id"], index),
+                 "%s:%i" % (villain["_id"], index),
+                 "%s:%i" % (foreign, index)]
+        ids = set(cbid.split(":", 1)[0] for cbid in cbids)
+
+        cache = dbcache.get_document_cache(context)
+        existing = cache.get_existing_ids(ids, document_type="asset")
+        assert existing == {str(ASSET["_id"]), str(villain["_id"])}
+
+    # Only the unknown ids used in the scene were queried, once
+    assert len(database.queries) == 2
+    assert sorted(database.queries[1]["_id"]["$in"]) == sorted(
+        [villain["_id"], foreign])
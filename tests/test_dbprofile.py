@@ -0,0 +1,129 @@
+import os
+import json
+import importlib.util
+
+import pytest
+
+pytest.importorskip("avalon.api")
+pytest.importorskip("pyblish.api")
+
+import pyblish.api  # noqa: E402
+import pyblish.util  # noqa: E402
+
+from colorbleed import dbprofile  # noqa: E402
+
+PLUGINS = os.path.join(os.path.dirname(__file__), "..", "colorbleed",
+                       "plugins", "global", "publish")
+
+
+def _load_plugin(name):
+    """Return the publish plug-in module, the folder is not a package"""
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(PLUGINS, name + ".py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class CollectAsset(pyblish.api.ContextPlugin):
+    order = pyblish.api.CollectorOrder
+
+    def process(self, context):
+        io = dbprofile.io
+        project = io.find_one({"type": "project"})
+        context.data["asset"] = io.find_one({"type": "asset",
+                                             "parent": project["_id"]})
+
+
+class ValidateSubsets(pyblish.api.ContextPlugin):
+    order = pyblish.api.ValidatorOrder
+    fail = False
+
+    def process(self, context):
+        subsets = dbprofile.io.find({"type": "subset",
+                                     "parent": context.data["asset"]["_id"]})
+        assert len(list(subsets)) == 2
+        assert not self.fail, "Failed validation"
+
+
+class IntegrateSubset(pyblish.api.ContextPlugin):
+    order = pyblish.api.IntegratorOrder
+
+    def process(self, context):
+        dbprofile.io.insert_one({"type": "subset",
+                                 "name": "modelMain",
+                                 "parent": context.data["asset"]["_id"]})
+
+
+@pytest.fixture
+def profiler(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    collection = mongomock.MongoClient().avalon.film
+    project = collection.insert_one({"type": "project"}).inserted_id
+    asset = collection.insert_one({"type": "asset",
+                                   "parent": project}).inserted_id
+    collection.insert_many([{"type": "subset", "parent": asset}
+                            for _ in range(2)])
+    for name in ["find", "find_one", "insert_one"]:
+        monkeypatch.setattr(dbprofile.io, name, getattr(collection, name))
+
+    monkeypatch.setenv("CB_DB_PROFILE", "1")
+    pyblish.api.register_host("shell")
+    dbprofile.install()
+    try:
+        yield dbprofile.profiler
+    finally:
+        dbprofile.uninstall()
+        pyblish.api.deregister_host("shell")
+
+
+def _publish():
+    collect = _load_plugin("collect_database_queries")
+    return pyblish.util.publish(plugins=[collect.CollectDatabaseQueries,
+                                         CollectAsset,
+                                         ValidateSubsets,
+                                         IntegrateSubset])
+
+
+def test_report(profiler, monkeypatch, tmpdir):
+    monkeypatch.setenv("CB_DB_PROFILE_DIR", str(tmpdir))
+
+    # Queries from before the publish are not reported
+    dbprofile.io.find_one({"type": "project"})
+
+    context = _publish()
+    summary = context.data["databaseQueries"]
+    assert summary["total"]["count"] == 4
+    counts = dict((plugin, dict((method, method_stats["count"])
+                                for method, method_stats
+                                in stats["methods"].items()))
+                  for plugin, stats in summary["plugins"].items())
+    assert counts == {"CollectAsset": {"find_one": 2},
+                      "ValidateSubsets": {"find": 1},
+                      "IntegrateSubset": {"insert_one": 1}}
+    assert summary["functions"]["%s.process" % __name__]["count"] == 4
+
+    reports = tmpdir.listdir()
+    assert len(reports) == 1
+    with open(str(reports[0])) as f:
+        assert json.load(f) == summary
+
+
+def test_report_failed_publish(profiler, monkeypatch):
+    monkeypatch.setattr(ValidateSubsets, "fail", True)
+    context = _publish()
+
+    assert not all(result["success"] for result in context.data["results"])
+    summary = context.data["databaseQueries"]
+    assert summary["total"]["count"] == 3
+    assert "IntegrateSubset" not in summary["plugins"]
+
+
+def test_report_disabled(monkeypatch):
+    monkeypatch.delenv("CB_DB_PROFILE", raising=False)
+    dbprofile.install()
+    assert not dbprofile.profiler.installed
+
+    context = pyblish.util.publish(plugins=[])
+    assert "databaseQueries" not in context.data
@@ -0,0 +1,144 @@
+import struct
+import zlib
+
+import pytest
+
+pytest.importorskip("avalon.api")
+pytest.importorskip("pyblish.api")
+
+from colorbleed import imageheader  # noqa: E402
+
+
+def _exr_attribute(name, kind, value):
+    return (name.encode("ascii") + b"\x00" + kind.encode("ascii") + b"\x00" +
+            struct.pack("<i", len(value)) + value)
+
+
+def _exr(width=64, height=40, compression=3, chunk_count=None,
+         missing=None):
+    """Return a scanline OpenEXR file with one half float channel"""
+    window = struct.pack("<4i", 0, 0, width - 1, height - 1)
+    header = b"".join([
+        _exr_attribute("channels", "chlist",
+                       b"R\x00" + struct.pack("<i4Bii", 1, 0, 0, 0, 0, 1, 1) +
+                       b"\x00"),
+        _exr_attribute("compression", "compression",
+                       struct.pack("B", compression)),
+        _exr_attribute("dataWindow", "box2i", window),
+        _exr_attribute("displayWindow", "box2i", window),
+        _exr_attribute("lineOrder", "lineOrder", b"\x00"),
+    ])
+    if chunk_count is not None:
+        header += _exr_attribute("chunkCount", "int",
+                                 struct.pack("<i", chunk_count))
+    header += b"\x00"
+
+    lines = imageheader._EXR_LINES_PER_CHUNK[compression]
+    count = (height + lines - 1) // lines
+    if chunk_count is not None:
+        count = chunk_count
+
+    position = 8 + len(header) + 8 * count
+    offsets = list()
+    chunks = list()
+    for index in range(count):
+        data = b"\x11" * (width * 2 * lines)
+        chunk = struct.pack("<ii", index * lines, len(data)) + data
+        offsets.append(position)
+        chunks.append(chunk)
+        position += len(chunk)
+
+    if missing is not None:
+        offsets[missing] = 0
+
+    return (imageheader._EXR_MAGIC + struct.pack("<I", 2) + header +
+            struct.pack("<{0}Q".format(count), *offsets) + b"".join(chunks))
+
+
+def _png():
+    def chunk(kind, data):
+        crc = zlib.crc32(kind + data) & 0xffffffff
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I",
+                                                                        crc)
+
+    return (imageheader._PNG_MAGIC +
+            chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 0, 0, 0, 0)) +
+            chunk(b"IDAT", zlib.compress(b"\x00\x00")) +
+            chunk(b"IEND", b""))
+
+
+def _jpeg():
+    return imageheader._JPEG_MAGIC + b"\xe0" + b"x" * 100 + b"\xff\xd9"
+
+
+def _tiff(strips=1, count=100):
+    """Return a little endian TIFF with 100 bytes of data per strip
+
+    The byte count of the strips is written as `count`.
+
+    """
+    data = b"\x22" * 100 * strips
+    ifd_offset = 8 + len(data)
+    values = ifd_offset + 2 + 2 * 12 + 4
+    if strips == 1:
+        offsets = struct.pack("<I", 8)
+        counts = struct.pack("<I", count)
+        extra = b""
+    else:
+        offsets = struct.pack("<I", values)
+        counts = struct.pack("<I", values + 4 * strips)
+        extra = (struct.pack("<{0}I".format(strips),
+                             *[8 + 100 * i for i in range(strips)]) +
+                 struct.pack("<{0}I".format(strips), *[count] * strips))
+
+    ifd = (struct.pack("<H", 2) +
+           struct.pack("<HHI4s", 273, 4, strips, offsets) +
+           struct.pack("<HHI4s", 279, 4, strips, counts) +
+           b"\x00\x00\x00\x00")
+    return b"II*\x00" + struct.pack("<I", ifd_offset) + data + ifd + extra
+
+
+def _check(tmpdir, name, data):
+    path = tmpdir.join(name)
+    path.write_binary(data)
+    return imageheader.check_image(str(path))
+
+
+@pytest.mark.parametrize("name, data", [
+    ("beauty.1001.exr", _exr()),
+    ("beauty.1001.exr", _exr(compression=0)),
+    ("beauty.1001.exr", _exr(chunk_count=3)),
+    ("beauty.1001.png", _png()),
+    ("beauty.1001.jpg", _jpeg()),
+    ("beauty.1001.tif", _tiff()),
+    ("beauty.1001.tif", _tiff(strips=3)),
+])
+def test_check_valid_image(tmpdir, name, data):
+    assert _check(tmpdir, name, data) is None
+
+
+@pytest.mark.parametrize("name, data, reason", [
+    ("beauty.exr", _exr()[:-10], "Last chunk is truncated"),
+    ("beauty.exr", _exr()[:200], "Offset table is truncated"),
+    ("beauty.exr", _exr()[:30], "Unexpected end of file at byte 30"),
+    ("beauty.exr", _exr(missing=1), "Missing chunk 2 of 3 in offset table"),
+    ("beauty.exr", _exr(chunk_count=0), "Empty offset table"),
+    ("beauty.png", _png()[:-5], "Missing IEND chunk"),
+    ("beauty.jpg", _jpeg()[:-2], "Missing end of image marker"),
+    ("beauty.tif", _tiff()[:50], "Invalid offset of first IFD: 108"),
+    ("beauty.tif", _tiff(strips=3)[:-4], "TIFF tag 279 is truncated"),
+    ("beauty.tif", _tiff(count=1000), "Image data is truncated"),
+    ("beauty.exr", _png(), "File content does not match its extension"),
+    ("beauty.png", b"", "Unknown image format"),
+])
+def test_check_invalid_image(tmpdir, name, data, reason):
+    assert _check(tmpdir, name, data) == reason
+
+
+def test_check_tiff_without_strips(tmpdir):
+    data = _tiff()
+    data = data.replace(struct.pack("<HHI", 273, 4, 1),
+                        struct.pack("<HHI", 273, 4, 0))
+    data = data.replace(struct.pack("<HHI", 279, 4, 1),
+                        struct.pack("<HHI", 279, 4, 0))
+    assert _check(tmpdir, "beauty.tif", data) == "Invalid TIFF tag 273"
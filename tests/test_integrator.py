@@ -0,0 +1,551 @@
+import os
+import time
+import threading
+
+import pytest
+
+pytest.importorskip("avalon.api")
+pytest.importorskip("pyblish.api")
+
+import pymongo.errors  # noqa: E402
+
+from colorbleed import lib, transfer  # noqa: E402
+from colorbleed.scripts import ensure_indexes  # noqa: E402
+
+TEMPLATE = ("{root}/{project}/{asset}/publish/{subset}/v{version:0>3}/"
+            "{asset}_{subset}_v{version:0>3}.{representation}")
+
+
+def _get(document, key):
+    for part in key.split("."):
+        if not isinstance(document, dict) or part not in document:
+            return None, False
+        document = document[part]
+    return document, True
+
+
+def _matches(document, query):
+    for key, expected in query.items():
+        value, exists = _get(document, key)
+        if isinstance(expected, dict) and "$exists" in expected:
+            if exists != expected["$exists"]:
+                return False
+        elif not exists or value != expected:
+            return False
+    return True
+
+
+class Result(object):
+    def __init__(self, count):
+        self.modified_count = count
+        self.deleted_count = count
+
+
+class Collection(object):
+    """Minimal in-memory stand-in for the queries of the Integrator"""
+
+    name = "film"
+
+    def __init__(self, documents):
+        self.documents = list(documents)
+        self.updates = 0
+
+    def find_one(self, filter, projection=None, sort=None):
+        documents = [d for d in self.documents if _matches(d, filter)]
+        for key, direction in reversed(sort or []):
+            documents.sort(key=lambda d: _get(d, key)[0],
+                           reverse=direction < 0)
+        return documents[0] if documents else None
+
+    def update_many(self, filter, update):
+        count = 0
+        for document in self.documents:
+            if not _matches(document, filter):
+                continue
+            for key, value in update.get("$set", {}).items():
+                parts = key.split(".")
+                target = document
+                for part in parts[:-1]:
+                    target = target.setdefault(part, dict())
+                target[parts[-1]] = value
+            for key in update.get("$unset", {}):
+                parts = key.split(".")
+                target, _ = _get(document, ".".join(parts[:-1]))
+                target.pop(parts[-1], None)
+            count += 1
+        self.updates += count
+        return Result(count)
+
+    def insert_one(self, document):
+        # Unique index on the subset names per asset
+        if document["type"] == "subset" and self.find_one({
+                "type": "subset",
+                "parent": document["parent"],
+                "name": document["name"]}):
+            raise pymongo.errors.DuplicateKeyError("Duplicate subset")
+        self.documents.append(document)
+
+    def delete_many(self, filter):
+        documents = [d for d in self.documents if _matches(d, filter)]
+        for document in documents:
+            self.documents.remove(document)
+        return Result(len(documents))
+
+
+class Instance(object):
+    def __init__(self, data):
+        self.data = data
+
+
+def _patch_io(monkeypatch, collection):
+    for name in ["find_one", "insert_one", "update_many", "delete_many"]:
+        monkeypatch.setattr(lib.io, name, getattr(collection, name))
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = Collection([{"_id": 1,
+                              "type": "subset",
+                              "name": "modelMain",
+                              "data": {}}])
+    _patch_io(monkeypatch, collection)
+    return collection
+
+
+@pytest.fixture
+def integrator(tmpdir, monkeypatch):
+    monkeypatch.setattr(lib.avalon.api, "registered_root",
+                        lambda: str(tmpdir.join("projects")))
+    return lib.Integrator()
+
+
+def _add_versions(collection, *numbers):
+    for number in numbers:
+        collection.documents.append({"_id": "v%i" % number,
+                                     "type": "version",
+                                     "parent": 1,
+                                     "name": number})
+
+
+def _resume_version(integrator, stagingdir, files):
+    project = {"name": "film",
+               "config": {"template": {"publish": TEMPLATE}}}
+    instance = Instance({"files": files})
+
+    def resume(number):
+        return integrator.can_resume_version(instance=instance,
+                                             stagingdir=stagingdir,
+                                             project=project,
+                                             asset={"name": "hero"},
+                                             subset={"name": "modelMain"},
+                                             number=number)
+    return resume
+
+
+def _journal_version(integrator, number, sources):
+    template_data = {"root": lib.avalon.api.registered_root(),
+                     "project": "film",
+                     "asset": "hero",
+                     "subset": "modelMain",
+                     "version": number}
+    directory = integrator.get_version_directory(TEMPLATE, template_data)
+    partial = transfer.get_partial_directory(directory)
+    os.makedirs(partial)
+    journal = transfer.TransferJournal(partial)
+    for src in sources:
+        dst = os.path.join(partial, os.path.basename(src))
+        with open(dst, "wb") as f:
+            f.write(b"data")
+        journal.record(src, dst, moved=True)
+    journal.close()
+
+
+def test_allocate_version_resumes_journaled_version(tmpdir, collection,
+                                                    integrator):
+    stagingdir = str(tmpdir.join("staging"))
+    _add_versions(collection, 1)
+    collection.documents[0]["data"]["lastVersion"] = 2
+    _journal_version(integrator, 2, [os.path.join(stagingdir, "a.ma")])
+
+    resume = _resume_version(integrator, stagingdir, ["a.ma", "b.abc"])
+    assert integrator.allocate_version({"_id": 1}, resume=resume) == 2
+    assert collection.updates == 0
+
+
+def test_allocate_version_skips_version_of_other_publish(tmpdir, collection,
+                                                         integrator):
+    _add_versions(collection, 1)
+    collection.documents[0]["data"]["lastVersion"] = 2
+    _journal_version(integrator, 2, [str(tmpdir.join("other", "a.ma"))])
+
+    resume = _resume_version(integrator, str(tmpdir.join("staging")),
+                             ["a.ma"])
+    assert integrator.allocate_version({"_id": 1}, resume=resume) == 3
+    assert collection.documents[0]["data"]["lastVersion"] == 3
+
+
+def test_allocate_version_skips_version_without_journal(tmpdir, collection,
+                                                        integrator):
+    collection.documents[0]["data"]["lastVersion"] = 1
+
+    resume = _resume_version(integrator, str(tmpdir.join("staging")),
+                             ["a.ma"])
+    assert integrator.allocate_version({"_id": 1}, resume=resume) == 2
+
+
+def test_get_or_create_subset(collection, integrator):
+    instance = Instance({"subset": "modelMain", "family": "colorbleed.model"})
+
+    subset, is_new = integrator.get_or_create_subset({"_id": 1}, instance)
+    assert is_new
+    assert subset["data"]["families"] == ["colorbleed.model"]
+    assert collection.find_one({"type": "subset", "parent": 1}) == subset
+
+    # A concurrent publish continues with the registered subset
+    integrator = lib.Integrator()
+    integrator.cache.find_one = lambda *args, **kwargs: None
+    existing, is_new = integrator.get_or_create_subset({"_id": 1}, instance)
+    assert not is_new
+    assert existing["_id"] == subset["_id"]
+    assert len(collection.documents) == 2
+
+
+def test_rollback_removes_new_subset(collection, integrator):
+    instance = Instance({"subset": "modelMain", "family": "colorbleed.model"})
+    subset, _ = integrator.get_or_create_subset({"_id": 1}, instance)
+    assert integrator.allocate_version(subset) == 1
+
+    integrator.rollback()
+    assert collection.documents == [collection.documents[0]]
+
+    # Nothing is rolled back twice
+    integrator.rollback()
+    assert len(collection.documents) == 1
+
+
+def test_rollback_releases_version(collection, integrator):
+    _add_versions(collection, 1)
+    collection.documents[0]["data"]["lastVersion"] = 1
+    assert integrator.allocate_version({"_id": 1}) == 2
+
+    integrator.rollback()
+    assert collection.documents[0]["data"]["lastVersion"] == 1
+    assert integrator.allocate_version({"_id": 1}) == 2
+
+
+def test_rollback_keeps_version_allocated_by_other_publish(collection,
+                                                           integrator):
+    instance = Instance({"subset": "modelMain", "family": "colorbleed.model"})
+    subset, _ = integrator.get_or_create_subset({"_id": 1}, instance)
+    assert integrator.allocate_version(subset) == 1
+    assert lib.Integrator().allocate_version(subset) == 2
+
+    # The number is skipped as the subset is in use by the other publish
+    integrator.rollback()
+    document = collection.find_one({"_id": subset["_id"]})
+    assert document["data"]["lastVersion"] == 2
+
+
+def test_process_rolls_back_failed_publish(tmpdir, collection, integrator,
+                                           monkeypatch):
+    monkeypatch.setitem(lib.avalon.api.Session, "AVALON_PROJECT", "film")
+    monkeypatch.setitem(lib.avalon.api.Session, "AVALON_LOCATION", "local")
+    collection.documents.extend([
+        {"_id": "film", "type": "project", "name": "film",
+         "config": {"template": {"publish": TEMPLATE}}},
+        {"_id": "hero", "type": "asset", "name": "hero", "parent": "film"}
+    ])
+    documents = list(collection.documents)
+
+    class Context(object):
+        data = {"results": [], "time": "20260101T000000Z", "user": "artist"}
+
+    staging = tmpdir.join("staging")
+    staging.join("modelMain.ma").write("", ensure=True)
+    instance = Instance({"subset": "modelMain",
+                         "family": "colorbleed.model",
+                         "asset": "hero",
+                         "stagingDir": str(staging),
+                         "files": ["modelMain.ma"]})
+    instance.context = Context()
+
+    # The current file is missing so the version data is incomplete
+    with pytest.raises(KeyError):
+        integrator.process(instance)
+    assert collection.documents == documents
+
+    def fail(*args, **kwargs):
+        raise transfer.TransferError([])
+
+    Context.data["currentFile"] = "scene.ma"
+    monkeypatch.setattr(integrator, "integrate", fail)
+    with pytest.raises(transfer.TransferError):
+        integrator.process(instance)
+    assert collection.documents == documents
+
+
+def test_integrate_resumes_interrupted_version(tmpdir, monkeypatch):
+    staging = tmpdir.join("staging")
+    directory = str(tmpdir.join("publish", "v001"))
+    transfers = list()
+    for index in range(5):
+        name = "cache.%04d.abc" % index
+        if index != 3:
+            staging.join(name).write_binary(b"data", ensure=True)
+        transfers.append([str(staging.join(name)),
+                          os.path.join(directory, name)])
+
+    with pytest.raises(transfer.TransferError):
+        lib.Integrator().integrate(transfers,
+                                   directory=directory,
+                                   stagingdir=str(staging))
+    assert not os.path.exists(directory)
+    partial = transfer.get_partial_directory(directory)
+    completed = transfer.TransferJournal(partial).get_sources()
+    assert completed
+
+    copied = list()
+    original = transfer.copy_file_checksum
+
+    def copy_file_checksum(src, dst):
+        copied.append(src)
+        return original(src, dst)
+
+    staging.join("cache.0003.abc").write_binary(b"data")
+    monkeypatch.setattr(transfer, "copy_file_checksum", copy_file_checksum)
+    integrator = lib.Integrator()
+    integrator.integrate(transfers, directory=directory,
+                         stagingdir=str(staging))
+
+    assert sorted(copied) == sorted(src for src, _ in transfers
+                                    if src not in completed)
+    assert len(integrator.checksums) == 5
+
+    # The journal is kept until the version is registered
+    assert transfer.TransferJournal(directory).get_sources()
+    integrator.remove_journal(directory)
+    assert sorted(os.listdir(directory)) == sorted(
+        os.path.basename(dst) for _, dst in transfers
+    )
+
+
+def _transfers(staging, directory, names):
+    transfers = list()
+    for name in names:
+        staging.join(name).write_binary(b"data", ensure=True)
+        transfers.append([str(staging.join(name)),
+                          os.path.join(directory, name)])
+    return transfers
+
+
+def test_integrate_resumes_renamed_directory(tmpdir, monkeypatch):
+    staging = tmpdir.join("staging")
+    directory = str(tmpdir.join("publish", "v001"))
+    transfers = _transfers(staging, directory, ["a.abc", "b.abc"])
+    lib.Integrator().integrate(transfers, directory=directory)
+
+    # The documents failed to register, rerunning continues from the files
+    def copy_file_checksum(src, dst):
+        raise AssertionError("Completed file was copied again")
+
+    monkeypatch.setattr(transfer, "copy_file_checksum", copy_file_checksum)
+    lib.Integrator().integrate(transfers, directory=directory)
+    assert os.path.isfile(os.path.join(directory, "a.abc"))
+
+
+@pytest.mark.parametrize("journaled", [False, True])
+def test_integrate_refuses_existing_directory(tmpdir, journaled):
+    staging = tmpdir.join("staging")
+    directory = str(tmpdir.join("publish", "v001"))
+    if journaled:
+        # Written by the publish of another instance
+        other = _transfers(tmpdir.join("other"), directory, ["a.abc"])
+        lib.Integrator().integrate(other, directory=directory)
+    else:
+        tmpdir.join("publish", "v001", "a.abc").write("", ensure=True)
+    before = sorted(os.listdir(directory))
+
+    transfers = _transfers(staging, directory, ["a.abc", "b.abc"])
+    with pytest.raises(RuntimeError):
+        lib.Integrator().integrate(transfers, directory=directory)
+    assert sorted(os.listdir(directory)) == before
+    assert not os.path.exists(transfer.get_partial_directory(directory))
+
+
+@pytest.mark.parametrize("journaled", [False, True])
+def test_integrate_removes_orphaned_partial_directory(tmpdir, journaled):
+    directory = str(tmpdir.join("publish", "v001"))
+    partial = tmpdir.join("publish", ".v001.partial")
+    partial.join("stale.abc").write("", ensure=True)
+    if journaled:
+        journal = transfer.TransferJournal(str(partial))
+        journal.record(str(partial.join("stale.abc")),
+                       str(partial.join("stale.abc")))
+        journal.close()
+
+    transfers = _transfers(tmpdir.join("staging"), directory, ["a.abc"])
+    integrator = lib.Integrator()
+    integrator.integrate(transfers, directory=directory)
+    integrator.remove_journal(directory)
+    assert os.listdir(directory) == ["a.abc"]
+    assert not partial.check()
+
+
+def test_allocate_version(collection, integrator):
+    assert integrator.allocate_version({"_id": 1}) == 1
+    assert integrator.allocate_version({"_id": 1}) == 2
+    assert collection.documents[0]["data"]["lastVersion"] == 2
+
+    # Versions registered without allocating a number are skipped
+    _add_versions(collection, 5)
+    assert integrator.allocate_version({"_id": 1}) == 6
+
+
+def test_allocate_version_retries_concurrent_allocation(collection,
+                                                        integrator,
+                                                        monkeypatch):
+    collection.documents[0]["data"]["lastVersion"] = 3
+    update_many = collection.update_many
+    attempts = list()
+
+    def concurrent_update_many(filter, update):
+        # Another publish allocates a version between the read and update
+        attempts.append(filter["data.lastVersion"])
+        if len(attempts) == 1:
+            update_many({"_id": 1}, {"$set": {"data.lastVersion": 4}})
+        return update_many(filter, update)
+
+    monkeypatch.setattr(lib.io, "update_many", concurrent_update_many)
+    assert integrator.allocate_version({"_id": 1}) == 5
+    assert attempts == [3, 4]
+    assert collection.documents[0]["data"]["lastVersion"] == 5
+
+
+def test_allocate_version_required_version(collection, integrator):
+    _add_versions(collection, 1)
+    assert integrator.allocate_version({"_id": 1}, version=2) == 2
+
+    with pytest.raises(AttributeError):
+        integrator.allocate_version({"_id": 1}, version=2)
+    assert collection.documents[0]["data"]["lastVersion"] == 2
+
+
+@pytest.mark.parametrize("mode", ["hardlink", "move"])
+def test_integrate_without_copying_data(tmpdir, monkeypatch, mode):
+    if mode == "hardlink" and not hasattr(os, "link"):
+        pytest.skip("Hardlinks are unsupported")
+
+    # Sparse file so the test does not need 10 GB of disk space
+    staging = tmpdir.join("staging")
+    src = str(staging.join("cache.abc"))
+    staging.ensure(dir=True)
+    with open(src, "wb") as f:
+        f.truncate(10 * 1024 ** 3)
+    inode = os.stat(src).st_ino
+
+    def read_data(*args, **kwargs):
+        raise AssertionError("File data was read")
+
+    monkeypatch.setattr(transfer, "copy_file_checksum", read_data)
+    monkeypatch.setattr(transfer, "hash_file", read_data)
+    monkeypatch.setattr(transfer.speedcopy, "copyfile", read_data)
+
+    directory = str(tmpdir.join("publish", "v001"))
+    dst = os.path.join(directory, "cache.abc")
+    integrator = lib.Integrator()
+    integrator.integrate([[src, dst]],
+                         directory=directory,
+                         stagingdir=str(staging),
+                         mode=mode)
+
+    assert os.stat(dst).st_ino == inode
+    assert os.path.getsize(dst) == 10 * 1024 ** 3
+    assert os.path.exists(src) == (mode == "hardlink")
+    assert not integrator.checksums
+
+
+def test_allocate_version_concurrently():
+    mongomock = pytest.importorskip("mongomock")
+    collection = mongomock.MongoClient().avalon.film
+    ensure_indexes.ensure_unique_subset_names(collection)
+
+    instance = Instance({"subset": "modelMain", "family": "colorbleed.model"})
+    barrier = threading.Barrier(8)
+    versions = list()
+    errors = list()
+
+    def publish():
+        integrator = lib.Integrator()
+        integrator.log.disabled = True
+        try:
+            barrier.wait()
+            subset, _ = integrator.get_or_create_subset({"_id": 1}, instance)
+            for _ in range(10):
+                versions.append(integrator.allocate_version(subset))
+        except Exception as exc:
+            errors.append(exc)
+
+    def find_one(*args, **kwargs):
+        # Let the other publishes run in between the queries and updates
+        # like the latency of a database server would
+        document = collection.find_one(*args, **kwargs)
+        time.sleep(0.001)
+        return document
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        _patch_io(monkeypatch, collection)
+        monkeypatch.setattr(lib.io, "find_one", find_one)
+        threads = [threading.Thread(target=publish) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert not errors
+    assert collection.count_documents({"type": "subset"}) == 1
+    assert sorted(versions) == list(range(1, 81))
+
+
+def test_integrate_identical_resources_without_copying(tmpdir, integrator,
+                                                       monkeypatch):
+    monkeypatch.setitem(lib.avalon.api.Session, "AVALON_PROJECT", "film")
+    monkeypatch.setenv("CB_RESOURCE_STORE", "1")
+
+    staging = tmpdir.join("staging")
+    for index in range(3):
+        staging.join("diffuse.%i.tx" % index).write_binary(
+            b"texture %i" % index, ensure=True)
+
+    copied = list()
+    copy_file = transfer.copy_file
+
+    def counting_copy_file(src, dst):
+        copied.append(src)
+        return copy_file(src, dst)
+
+    def copy_file_checksum(src, dst):
+        raise AssertionError("Resource was not transferred by the store")
+
+    monkeypatch.setattr(transfer, "copy_file", counting_copy_file)
+    monkeypatch.setattr(transfer, "copy_file_checksum", copy_file_checksum)
+
+    def publish(version):
+        directory = str(tmpdir.join("publish", version))
+        transfers = [[str(path),
+                      os.path.join(directory, "resources", path.basename)]
+                     for path in staging.listdir()]
+        lib.Integrator().integrate(transfers, directory=directory)
+        return directory
+
+    publish("v001")
+    assert len(copied) == 3
+
+    # Republishing the same resources only links the stored content
+    del copied[:]
+    directory = publish("v002")
+    assert not copied
+    for name in ["diffuse.0.tx", "diffuse.1.tx", "diffuse.2.tx"]:
+        v001 = tmpdir.join("publish", "v001", "resources", name)
+        v002 = os.path.join(directory, "resources", name)
+        assert os.path.samefile(str(v001), v002)
+        assert staging.join(name).read_binary() == v001.read_binary()
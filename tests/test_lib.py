@@ -0,0 +1,162 @@
+import threading
+
+import pytest
+
+pytest.importorskip("avalon.api")
+pytest.importorskip("pyblish.api")
+
+from colorbleed import lib  # noqa: E402
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    collection = mongomock.MongoClient().avalon.film
+    for name in ["find", "find_one", "aggregate"]:
+        # Older versions of avalon.io lack `aggregate`
+        monkeypatch.setattr(lib.io, name, getattr(collection, name),
+                            raising=False)
+    return collection
+
+
+def _publish(collection, subset, versions):
+    """Insert the versions of the subset with one representation each
+
+    Returns:
+        list: The representation ids per version.
+
+    """
+    representations = list()
+    for name in versions:
+        version = collection.insert_one({"type": "version",
+                                         "parent": subset,
+                                         "name": name}).inserted_id
+        representation = collection.insert_one({"type": "representation",
+                                                "parent": version,
+                                                "name": "ma"}).inserted_id
+        representations.append(representation)
+    return representations
+
+
+class Host(object):
+    """Fake host with the containers of a scene"""
+
+    def __init__(self, representations):
+        self.containers = [{"objectName": "container%i" % index,
+                            "representation": str(representation)}
+                           for index, representation in
+                           enumerate(representations)]
+        self.threads = list()
+
+    def ls(self):
+        self.threads.append(threading.current_thread())
+        return iter(self.containers)
+
+
+def test_get_outdated_representations(collection):
+    model = _publish(collection, "model", [1, 2, 3])
+    rig = _publish(collection, "rig", [1])
+    missing = lib.io.ObjectId()
+
+    outdated = lib.get_outdated_representations(model + rig + [missing])
+    assert outdated == {str(model[0]): True,
+                        str(model[1]): True,
+                        str(model[2]): False,
+                        str(rig[0]): False}
+    assert lib.get_outdated_representations([]) == {}
+
+
+def test_get_outdated_containers(collection):
+    model = _publish(collection, "model", [1, 2])
+    missing = lib.io.ObjectId()
+    host = Host([model[0], model[1], missing])
+
+    result = lib.get_outdated_containers(host.ls())
+    assert [outdated for _, outdated in result] == [True, False, None]
+
+
+@pytest.mark.parametrize("version, expected", [(0, True), (1, False)])
+def test_any_outdated_async(collection, version, expected):
+    model = _publish(collection, "model", [1, 2])
+    host = Host([model[version], lib.io.ObjectId()])
+
+    results = list()
+    deferred = list()
+
+    def defer(function, *args):
+        deferred.append(threading.current_thread())
+        function(*args)
+
+    thread = lib.any_outdated_async(results.append, host=host, deferred=defer)
+    thread.join(5)
+
+    assert results == [expected]
+
+    # The host is only accessed from the calling thread
+    assert host.threads == [threading.current_thread()]
+    assert deferred == [thread]
+
+
+def test_any_outdated_async_error(collection, monkeypatch):
+    def fail(representation_ids):
+        raise RuntimeError("Database unavailable")
+
+    monkeypatch.setattr(lib, "get_outdated_representations", fail)
+    results = list()
+    thread = lib.any_outdated_async(results.append, host=Host([]))
+    thread.join(5)
+    assert not results
+
+
+def test_session_cache(collection, monkeypatch):
+    collection.insert_many([
+        {"type": "project", "name": "film", "data": {"fps": 24}},
+        {"type": "asset", "name": "hero", "data": {}},
+        {"type": "asset", "name": "villain", "data": {"fps": 48}},
+    ])
+    queries = list()
+
+    def find_one(filter, *args, **kwargs):
+        queries.append(filter)
+        return collection.find_one(filter, *args, **kwargs)
+
+    monkeypatch.setattr(lib.io, "find_one", find_one)
+    monkeypatch.setattr(lib.io, "active_project", lambda: "film")
+    monkeypatch.setitem(lib.avalon.api.Session, "AVALON_PROJECT", "film")
+    monkeypatch.setitem(lib.avalon.api.Session, "AVALON_ASSET", "hero")
+    monkeypatch.setattr(lib, "session_cache", lib.dbcache.TTLCache(ttl=60))
+
+    # Repeated calls within the time to live don't query the database
+    for _ in range(10):
+        assert lib.get_asset_fps() == 24
+        assert lib.get_asset_data("villain") == {"fps": 48}
+    assert len(queries) == 3
+
+    # Changing the task clears the cache
+    lib.clear_session_cache()
+    assert lib.get_asset_fps() == 24
+    assert len(queries) == 5
+
+
+@pytest.mark.benchmark
+def test_benchmark_outdated_containers(collection, timer):
+    # 2000 containers of 500 subsets with three versions each
+    representations = list()
+    for index in range(500):
+        representations.extend(_publish(collection, "subset%i" % index,
+                                        [1, 2, 3]))
+    containers = Host(representations[:2000]).containers
+
+    def check_each(containers):
+        outdated = list()
+        for container in containers:
+            representation = lib.io.find_one({
+                "_id": lib.io.ObjectId(container["representation"])
+            })
+            outdated.append(not lib.is_latest(representation))
+        return outdated
+
+    expected = timer("is_latest", check_each, containers)
+    result = timer("bulk", lib.get_outdated_containers, containers)
+
+    assert [outdated for _, outdated in result] == expected
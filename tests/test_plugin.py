@@ -0,0 +1,80 @@
+import os
+import tempfile
+
+import pytest
+
+pytest.importorskip("avalon.api")
+pytest.importorskip("pyblish.api")
+
+from colorbleed import plugin  # noqa: E402
+
+
+class Instance(object):
+    def __init__(self):
+        self.data = dict()
+
+
+@pytest.fixture
+def publish_root(tmpdir, monkeypatch):
+    monkeypatch.delenv("CB_STAGING_ROOT", raising=False)
+    monkeypatch.setattr(plugin.avalon.api, "registered_root",
+                        lambda: str(tmpdir))
+    monkeypatch.setitem(plugin.avalon.api.Session, "AVALON_PROJECT", "film")
+    tmpdir.join("film").ensure(dir=True)
+    return str(tmpdir.join("film"))
+
+
+def _set_devices(monkeypatch, publish_root, same):
+    devices = {publish_root: 1, tempfile.gettempdir(): 1 if same else 2}
+    monkeypatch.setattr(plugin, "_get_device", devices.get)
+
+
+def test_staging_root_on_publish_filesystem(publish_root, monkeypatch):
+    _set_devices(monkeypatch, publish_root, same=False)
+
+    staging = os.path.join(publish_root, ".staging")
+    assert plugin.get_publish_staging_root() == staging
+    assert plugin.get_staging_root("move") == staging
+    assert plugin.get_staging_root("hardlink") == staging
+    assert os.path.isdir(staging)
+
+    # Copied files are staged in the temporary folder
+    assert plugin.get_staging_root() is None
+
+
+def test_staging_root_in_temp_on_same_filesystem(publish_root, monkeypatch):
+    _set_devices(monkeypatch, publish_root, same=True)
+
+    assert plugin.get_publish_staging_root() is None
+    assert plugin.get_staging_root("move") is None
+
+
+def test_staging_root_from_environment(publish_root, tmpdir, monkeypatch):
+    monkeypatch.setenv("CB_STAGING_ROOT", str(tmpdir.join("{AVALON_PROJECT}",
+                                                          "staging")))
+    expected = str(tmpdir.join("film", "staging"))
+    assert plugin.get_staging_root() == expected
+    assert plugin.get_staging_root("move") == expected
+
+
+def test_extractor_staging_dir(publish_root, monkeypatch):
+    _set_devices(monkeypatch, publish_root, same=False)
+
+    class ExtractCache(plugin.Extractor):
+        staging_transfer_mode = "move"
+
+    instance = Instance()
+    staging_dir = ExtractCache().staging_dir(instance)
+    assert os.path.dirname(staging_dir) == os.path.join(publish_root,
+                                                        ".staging")
+    assert instance.data["stagingTransferMode"] == "move"
+
+    # Later extractors of the instance extract into the same directory
+    assert plugin.Extractor().staging_dir(instance) == staging_dir
+    assert instance.data["stagingTransferMode"] == "move"
+
+    instance = Instance()
+    staging_dir = plugin.Extractor().staging_dir(instance)
+    assert not staging_dir.startswith(publish_root)
+    assert instance.data["stagingTransferMode"] == "copy"
+    os.rmdir(staging_dir)
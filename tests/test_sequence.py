@@ -0,0 +1,223 @@
+import os
+import random
+import tracemalloc
+
+import pytest
+
+pytest.importorskip("avalon.api")
+pytest.importorskip("pyblish.api")
+
+from colorbleed import sequence  # noqa: E402
+from colorbleed.sequence import FrameRanges  # noqa: E402
+
+
+def test_describe():
+    description = sequence.describe(["beauty.1001.exr",
+                                     "beauty.1002.exr",
+                                     "beauty.1005.exr"])
+    assert description == {"head": "beauty.",
+                           "padding": 4,
+                           "tail": ".exr",
+                           "ranges": [[1001, 1002], [1005, 1005]]}
+    assert list(sequence.iter_filenames(description)) == ["beauty.1001.exr",
+                                                          "beauty.1002.exr",
+                                                          "beauty.1005.exr"]
+
+
+@pytest.mark.parametrize("filenames", [
+    [],
+    ["beauty.exr"],
+    ["beauty.1001.exr", "diffuse.1002.exr"],
+    ["beauty.1001.exr", "beauty.1002.tif"],
+    ["beauty.0999.exr", "beauty.999.exr"],
+    ["beauty.01.exr", "beauty.001.exr"],
+])
+def test_describe_not_reproducible(filenames):
+    assert sequence.describe(filenames) is None
+
+
+def test_describe_unpadded():
+    description = sequence.describe(["cache_8.bgeo.sc",
+                                     "cache_9.bgeo.sc",
+                                     "cache_10.bgeo.sc"])
+    assert description == {"head": "cache_",
+                           "padding": 1,
+                           "tail": ".bgeo.sc",
+                           "ranges": [[8, 10]]}
+
+
+def test_scan(tmpdir):
+    for name in ["beauty.1001.exr", "beauty.1002.exr", "beauty.1004.exr",
+                 "depth.01.exr", "depth.001.exr", "notes.txt"]:
+        tmpdir.join(name).write("")
+
+    sequences, remainder = sequence.scan(str(tmpdir))
+    assert [sequence.format_sequence(s) for s in sequences] == [
+        "beauty.%04d.exr [1001-1002, 1004]",
+        "depth.%02d.exr [1]",
+        "depth.%03d.exr [1]",
+    ]
+    assert remainder == ["notes.txt"]
+
+    sequences, remainder = sequence.scan(str(tmpdir),
+                                         include=r"\.exr$",
+                                         exclude="^depth")
+    assert len(sequences) == 1
+    assert remainder == []
+
+
+def test_ranges_helpers():
+    description = {"head": "beauty.",
+                   "padding": 4,
+                   "tail": ".exr",
+                   "ranges": [[1001, 1003], [1006, 1006], [1010, 1012]]}
+
+    assert sequence.get_frame_count(description) == 7
+    assert sequence.get_first_filename(description) == "beauty.1001.exr"
+    assert sequence.get_holes(description) == [[1004, 1005], [1007, 1009]]
+    assert [frame for frame in range(1000, 1014)
+            if sequence.has_frame(description, frame)] == list(
+        sequence.iter_frames(description))
+
+    clipped = sequence.clip(description, start=1002, end=1010)
+    assert clipped["ranges"] == [[1002, 1003], [1006, 1006], [1010, 1010]]
+    assert description["ranges"][0] == [1001, 1003]
+    assert sequence.clip(description, start=1004, end=1005) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("", ""),
+    ("15", "15"),
+    ("1-10", "1-10"),
+    ("1-10x2,15", "1-9x2,15"),
+    ("1,5,6,7", "1,5-7"),
+    ("1,3", "1,3"),
+    ("1,3,5", "1-5x2"),
+    (" 5-7, 1-3 ", "1-3,5-7"),
+    ("1-10,5-20", "1-20"),
+    ("-5--1", "-5--1"),
+])
+def test_frame_ranges_parse(text, expected):
+    frames = FrameRanges.parse(text)
+    assert str(frames) == expected
+    assert FrameRanges.parse(str(frames)) == frames
+
+
+@pytest.mark.parametrize("text", ["a", "1-", "5-1", "1-10x0", "1-10y2"])
+def test_frame_ranges_parse_invalid(text):
+    with pytest.raises(ValueError):
+        FrameRanges.parse(text)
+
+
+def test_frame_ranges_large_range():
+    frames = FrameRanges.from_range(1, 10 ** 12)
+    assert len(frames) == 10 ** 12
+    assert frames.ranges == [(1, 10 ** 12, 1)]
+    assert 10 ** 11 in frames
+    assert frames.is_continuous()
+
+    odd = FrameRanges.from_range(1, 10 ** 12, 2)
+    assert odd.ranges == [(1, 10 ** 12 - 1, 2)]
+    assert 10 ** 11 not in odd
+    assert not odd.is_continuous()
+    assert frames - FrameRanges.from_range(2, 10 ** 12) == FrameRanges([1])
+
+
+def test_frame_ranges_step():
+    frames = FrameRanges.parse("1-10,21-30")
+    assert list(frames.step(5)) == [1, 6, 21, 26]
+    assert str(FrameRanges.from_range(1, 10).step(3)) == "1-10x3"
+    assert str(frames.step(4)) == "1-9x4,21-29x4"
+    assert not FrameRanges().step(2)
+    with pytest.raises(ValueError):
+        frames.step(0)
+
+
+def test_frame_ranges_properties():
+    frames = FrameRanges([7, 3, 5, 3, 1])
+    assert list(frames) == [1, 3, 5, 7]
+    assert (frames.first, frames.last) == (1, 7)
+    assert FrameRanges(frames) == frames
+    assert hash(FrameRanges("1357")) == hash(frames)
+    assert not FrameRanges()
+    assert FrameRanges().first is None
+    assert repr(frames) == "FrameRanges('1-7x2')"
+    assert FrameRanges.from_sequence({"ranges": [[1, 3], [5, 5]]}) == (
+        FrameRanges([1, 2, 3, 5]))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_frame_ranges_set_operations(seed):
+    rng = random.Random(seed)
+
+    def generate():
+        frames = set()
+        for _ in range(rng.randint(0, 4)):
+            start = rng.randint(-20, 80)
+            frames.update(range(start, start + rng.randint(0, 30),
+                                rng.choice([1, 1, 2, 3])))
+        return frames
+
+    a, b = generate(), generate()
+    ranges_a, ranges_b = FrameRanges(a), FrameRanges(b)
+
+    assert list(ranges_a) == sorted(a)
+    assert len(ranges_a) == len(a)
+    assert list(ranges_a | ranges_b) == sorted(a | b)
+    assert list(ranges_a & ranges_b) == sorted(a & b)
+    assert list(ranges_a - ranges_b) == sorted(a - b)
+    assert list(ranges_a | b) == sorted(a | b)
+    assert all((frame in ranges_a) == (frame in a)
+               for frame in range(-25, 115))
+
+    # The runs are canonical so equal sets compare equal
+    assert (ranges_a | ranges_b) == FrameRanges(a | b)
+    assert FrameRanges.parse(str(ranges_a)) == ranges_a
+
+
+@pytest.mark.benchmark
+def test_benchmark_scan(tmpdir, timer):
+    # 100k files of 10 AOVs with 10k frames and a hole each
+    aovs = ["aov%i" % index for index in range(10)]
+    for aov in aovs:
+        for frame in range(1, 10002):
+            if frame != 5000:
+                tmpdir.join("%s.%05d.exr" % (aov, frame)).write("")
+
+    def list_files(directory):
+        # The listing CollectFileSequences used before the scanner
+        return [name for name in os.listdir(directory)
+                if os.path.isfile(os.path.join(directory, name))]
+
+    files = timer("listdir+isfile", list_files, str(tmpdir))
+    sequences, remainder = timer("scan", sequence.scan, str(tmpdir))
+
+    assert len(files) == 100000
+    assert [s["head"] for s in sequences] == [aov + "." for aov in aovs]
+    assert all(sequence.get_holes(s) == [[5000, 5000]] for s in sequences)
+    assert not remainder
+
+
+@pytest.mark.benchmark
+def test_benchmark_frame_ranges_memory(timer):
+
+    def use_frame_ranges(count):
+        """Return the peak memory used by the operations on count frames"""
+        tracemalloc.start()
+        try:
+            frames = FrameRanges.parse("1-%i" % count)
+            frames |= FrameRanges.from_range(count // 2, count + 100)
+            frames -= FrameRanges([10, 20, 30])
+            odd = frames.step(2)
+            assert count // 2 in frames
+            assert sum(1 for _ in odd) == len(odd)
+            assert str(frames) == "1-9,11-19,21-29,31-%i" % (count + 100)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    small = timer("1k frames", use_frame_ranges, 10 ** 3)
+    large = timer("1M frames", use_frame_ranges, 10 ** 6)
+
+    # The memory doesn't grow with the amount of frames
+    assert large < small + 4096
@@ -0,0 +1,205 @@
+import hashlib
+import os
+import sys
+import threading
+
+import pytest
+
+pytest.importorskip("avalon.api")
+pytest.importorskip("pyblish.api")
+
+from colorbleed.vendor import speedcopy  # noqa: E402
+
+pytestmark = pytest.mark.skipif(sys.platform.startswith("win32"),
+                                reason="Copy engines are POSIX only")
+
+
+@pytest.fixture
+def engines(monkeypatch):
+    """Replace the copy engines with fakes that record their calls"""
+    calls = []
+    lock = threading.Lock()
+
+    def fake(name, supported):
+        def engine(fsrc, fdst):
+            with lock:
+                calls.append(name)
+            if not supported:
+                # Write some data to ensure the files are reset on failure
+                fdst.write(b"garbage")
+                return False
+            fdst.write(fsrc.read())
+            return True
+        return engine
+
+    monkeypatch.setattr(speedcopy, "_engines", {
+        "reflink": fake("reflink", False),
+        "copychunk": fake("copychunk", True),
+        "copy_file_range": fake("copy_file_range", True),
+        "sendfile": fake("sendfile", True),
+    })
+    monkeypatch.setattr(speedcopy, "FILESYSTEM_ENGINES", {
+        "XFS": ("reflink", "copy_file_range", "sendfile"),
+        "CIFS": ("copychunk", "copy_file_range", "sendfile"),
+    })
+    monkeypatch.setattr(speedcopy, "_get_filesystem",
+                        lambda fobj, device: "XFS")
+    speedcopy.clear_cache()
+    yield calls
+    speedcopy.clear_cache()
+
+
+def _write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_unsupported_engine_is_skipped_afterwards(tmpdir, engines):
+    src = str(tmpdir.join("src.bin"))
+    _write(src, b"data" * 1000)
+
+    speedcopy.copyfile(src, str(tmpdir.join("a.bin")))
+    speedcopy.copyfile(src, str(tmpdir.join("b.bin")))
+
+    assert engines == ["reflink", "copy_file_range", "copy_file_range"]
+    assert _read(str(tmpdir.join("a.bin"))) == b"data" * 1000
+    assert _read(str(tmpdir.join("b.bin"))) == b"data" * 1000
+
+
+def test_cached_engines_are_not_modified(tmpdir, engines):
+    src = str(tmpdir.join("src.bin"))
+    _write(src, b"data")
+
+    key = (os.stat(src).st_dev, os.stat(str(tmpdir)).st_dev)
+    with open(src, "rb") as fsrc:
+        cached = speedcopy._get_engines(key, fsrc, fsrc)
+    before = list(cached)
+
+    speedcopy.copyfile(src, str(tmpdir.join("dst.bin")))
+
+    assert cached == before
+    assert "reflink" not in speedcopy._engine_cache[key]
+
+
+def test_same_filesystem_engines_across_filesystem_types(tmpdir,
+                                                         monkeypatch,
+                                                         engines):
+    types = iter(["XFS", "CIFS"])
+    monkeypatch.setattr(speedcopy, "_get_filesystem",
+                        lambda fobj, device: next(types))
+
+    src = str(tmpdir.join("src.bin"))
+    _write(src, b"data")
+    speedcopy.copyfile(src, str(tmpdir.join("dst.bin")))
+
+    # Copychunk is only supported when both are on CIFS
+    assert engines == ["copy_file_range"]
+
+
+def test_all_engines_unsupported_falls_back(tmpdir, monkeypatch, engines):
+    monkeypatch.setattr(speedcopy, "FILESYSTEM_ENGINES",
+                        {"XFS": ("reflink",)})
+
+    src = str(tmpdir.join("src.bin"))
+    _write(src, b"data" * 1000)
+    speedcopy.copyfile(src, str(tmpdir.join("dst.bin")))
+
+    assert _read(str(tmpdir.join("dst.bin"))) == b"data" * 1000
+
+
+def test_copyfiles_in_parallel(tmpdir, engines):
+    pairs = []
+    for index in range(200):
+        src = str(tmpdir.join("src", "{0}.bin".format(index)))
+        if index == 0:
+            tmpdir.mkdir("src")
+        _write(src, str(index).encode("ascii"))
+        pairs.append((src, str(tmpdir.join("dst", "{0}.bin".format(index)))))
+
+    results = speedcopy.copyfiles(pairs, max_workers=16)
+
+    assert [error for _, _, error in results] == [None] * len(pairs)
+    for index, (_, dst) in enumerate(pairs):
+        assert _read(dst) == str(index).encode("ascii")
+
+
+def test_copyfile_hash_uses_engines(tmpdir, engines):
+    src = str(tmpdir.join("src.bin"))
+    _write(src, b"data" * 1000)
+
+    digest = speedcopy.copyfile_hash(src, str(tmpdir.join("dst.bin")))
+
+    assert engines == ["reflink", "copy_file_range"]
+    assert digest == hashlib.sha1(b"data" * 1000).hexdigest()
+    assert _read(str(tmpdir.join("dst.bin"))) == b"data" * 1000
+
+
+def test_copyfile_hash_without_engines(tmpdir, monkeypatch, engines):
+    monkeypatch.setattr(speedcopy, "FILESYSTEM_ENGINES",
+                        {"XFS": ("reflink",)})
+    monkeypatch.setattr(speedcopy, "COPY_BUFSIZE", 1000)
+
+    src = str(tmpdir.join("src.bin"))
+    data = os.urandom(4500)
+    _write(src, data)
+
+    digest = speedcopy.copyfile_hash(src, str(tmpdir.join("dst.bin")),
+                                     algorithm="md5")
+
+    assert digest == hashlib.md5(data).hexdigest()
+    assert _read(str(tmpdir.join("dst.bin"))) == data
+
+
+@pytest.mark.benchmark
+def test_benchmark_copyfile_hash(tmpdir, timer):
+    # Four files of 64 MiB
+    sources = []
+    for index in range(4):
+        src = str(tmpdir.join("src{0}.bin".format(index)))
+        _write(src, os.urandom(64 * 1024 * 1024))
+        sources.append(src)
+
+    def copy(function, name):
+        return [function(src, str(tmpdir.join(name + os.path.basename(src))))
+                for src in sources]
+
+    timer("copy", copy, speedcopy.copyfile, "copy")
+    digests = timer("copy+hash", copy, speedcopy.copyfile_hash, "hash")
+
+    assert digests == [hashlib.sha1(_read(src)).hexdigest()
+                       for src in sources]
+
+
+@pytest.mark.benchmark
+def test_benchmark_copyfiles(tmpdir, timer):
+    # 10k tiny files, e.g. per frame caches of 100 objects
+    tmpdir.mkdir("src")
+    sources = []
+    for index in range(10000):
+        src = str(tmpdir.join("src", "{0}.fur".format(index)))
+        _write(src, str(index).encode("ascii"))
+        sources.append(src)
+
+    def get_pairs(name):
+        return [(src, str(tmpdir.join(name,
+                                      "object{0}".format(index % 100),
+                                      os.path.basename(src))))
+                for index, src in enumerate(sources)]
+
+    def copy(pairs):
+        for src, dst in pairs:
+            if not os.path.isdir(os.path.dirname(dst)):
+                os.makedirs(os.path.dirname(dst))
+            speedcopy.copyfile(src, dst)
+
+    timer("copyfile", copy, get_pairs("copy"))
+    pairs = get_pairs("batch")
+    results = timer("copyfiles", speedcopy.copyfiles, pairs)
+
+    assert [error for _, _, error in results] == [None] * len(pairs)
+    assert all(_read(src) == _read(dst) for src, dst in pairs)
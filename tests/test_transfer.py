@@ -0,0 +1,450 @@
+import ntpath
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("avalon.api")
+pytest.importorskip("pyblish.api")
+
+from colorbleed import transfer  # noqa: E402
+
+
+def _write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("mode", ["copy", "hardlink", "symlink"])
+def test_replace_existing_file(tmpdir, mode):
+    src = str(tmpdir.join("src.usd"))
+    dst = str(tmpdir.join("master", "dst.usd"))
+    _write(src, b"new")
+    os.makedirs(os.path.dirname(dst))
+    _write(dst, b"old")
+
+    used = transfer.replace_file(src, dst, mode=mode)
+
+    assert used in (mode, "copy")
+    assert _read(dst) == b"new"
+    assert os.listdir(os.path.dirname(dst)) == ["dst.usd"]
+
+
+@pytest.mark.skipif(not sys.platform.startswith("win32"),
+                    reason="MoveFileEx is only available on Windows")
+def test_replace_windows_overwrites_existing_file(tmpdir):
+    src = str(tmpdir.join("src.usd"))
+    dst = str(tmpdir.join("dst.usd"))
+    _write(src, b"new")
+    _write(dst, b"old")
+
+    transfer._replace_windows(src, dst)
+
+    assert not os.path.exists(src)
+    assert _read(dst) == b"new"
+
+
+def test_replace_file_readers_see_complete_files(tmpdir):
+    size = 1024 * 1024
+    sources = []
+    for char in (b"a", b"b"):
+        path = str(tmpdir.join("{0}.usd".format(char.decode("ascii"))))
+        _write(path, char * size)
+        sources.append(path)
+
+    dst = str(tmpdir.join("master.usd"))
+    transfer.replace_file(sources[0], dst)
+
+    errors = []
+    done = threading.Event()
+
+    def reader():
+        while not done.is_set():
+            data = _read(dst)
+            if data not in (b"a" * size, b"b" * size):
+                errors.append(len(data))
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for index in range(50):
+            transfer.replace_file(sources[index % 2], dst)
+    finally:
+        done.set()
+        thread.join()
+
+    assert not errors
+
+
+def test_get_filesystem_limits(monkeypatch):
+    value = os.pathsep.join(["/mnt/projects=4",
+                             "/mnt/renders = 0",
+                             "invalid",
+                             "=3",
+                             ""])
+    monkeypatch.setenv("CB_TRANSFER_LIMITS", value)
+
+    assert transfer.get_filesystem_limits() == {"/mnt/projects": 4,
+                                                "/mnt/renders": 1}
+
+    monkeypatch.delenv("CB_TRANSFER_LIMITS")
+    assert transfer.get_filesystem_limits() == {}
+
+
+def test_executor_filesystem_limit(tmpdir):
+    lock = threading.Lock()
+    state = {"active": 0, "maximum": 0}
+
+    def copy_function(src, dst):
+        with lock:
+            state["active"] += 1
+            state["maximum"] = max(state["maximum"], state["active"])
+        time.sleep(0.01)
+        transfer.copy_file(src, dst)
+        with lock:
+            state["active"] -= 1
+
+    transfers = []
+    for index in range(20):
+        src = str(tmpdir.join("src", "{0}.bin".format(index)))
+        if index == 0:
+            tmpdir.mkdir("src")
+        _write(src, b"data")
+        dst = str(tmpdir.join("dst", "{0}.bin".format(index)))
+        transfers.append([src, dst])
+
+    executor = transfer.TransferExecutor(
+        max_workers=8,
+        filesystem_limits={str(tmpdir): 2},
+        copy_function=copy_function
+    )
+    executor.execute(transfers)
+
+    assert state["maximum"] == 2
+    assert all(_read(dst) == b"data" for _, dst in transfers)
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_executor_rollback_keeps_existing_files(tmpdir, max_workers):
+    tmpdir.mkdir("src")
+    tmpdir.mkdir("dst")
+    transfers = []
+    for index in range(6):
+        name = "{0}.bin".format(index)
+        src = str(tmpdir.join("src", name))
+        _write(src, b"new")
+        transfers.append([src, str(tmpdir.join("dst", name))])
+
+    # Files of a previous publish the transfers overwrite
+    existing = [dst for _, dst in transfers[::2]]
+    for dst in existing:
+        _write(dst, b"old")
+
+    def copy_function(src, dst):
+        transfer.copy_file(src, dst)
+        if dst in (transfers[4][1], transfers[5][1]):
+            raise OSError("Disk full")
+
+    executor = transfer.TransferExecutor(max_workers=max_workers,
+                                         copy_function=copy_function)
+    with pytest.raises(transfer.TransferError):
+        executor.execute(transfers)
+
+    assert sorted(os.listdir(str(tmpdir.join("dst")))) == sorted(
+        os.path.basename(dst) for dst in existing)
+
+
+def test_is_inside_without_resolving():
+    root = os.path.join(os.sep, "staging", "pyblish_tmp_abc")
+
+    assert transfer.is_inside(os.path.join(root, "a.ma"), root,
+                              resolve=False)
+    assert transfer.is_inside(os.path.join(root, "..foo"), root,
+                              resolve=False)
+    assert not transfer.is_inside(os.path.join(root, "..", "b.ma"), root,
+                                  resolve=False)
+    assert not transfer.is_inside(root + "_other", root, resolve=False)
+    assert not transfer.is_inside(root, root, resolve=False)
+
+
+def test_is_inside_other_drive(monkeypatch):
+    monkeypatch.setattr(os, "path", ntpath)
+    monkeypatch.setattr(os, "sep", "\\")
+
+    root = "C:\\Users\\artist\\Temp\\pyblish_tmp_abc"
+    assert transfer.is_inside(root + "\\a.ma", root, resolve=False)
+    assert transfer.is_inside("c:\\users\\ARTIST\\temp\\pyblish_tmp_abc\\b",
+                              root, resolve=False)
+    assert not transfer.is_inside("P:\\textures\\a.tx", root, resolve=False)
+
+
+def test_transfer_plan_skips_identical_transfers(tmpdir):
+    src = os.path.join(str(tmpdir), "staging", "a.ma")
+    dst = os.path.join(str(tmpdir), "publish", "v001", "a.ma")
+    plan = transfer.TransferPlan([
+        [src, dst],
+        [os.path.join(str(tmpdir), "staging", ".", "a.ma"), dst],
+        [src, os.path.join(str(tmpdir), "publish", "v001", "b.ma")],
+    ])
+
+    assert len(plan) == 2
+    assert list(plan)[0] == (src, dst)
+    assert list(plan.directories) == [os.path.dirname(dst)]
+    assert not plan.collisions
+    assert not plan.case_collisions
+    plan.validate()
+
+
+def test_transfer_plan_collisions(tmpdir):
+    dst = os.path.join(str(tmpdir), "publish", "a.ma")
+    plan = transfer.TransferPlan([
+        [os.path.join(str(tmpdir), "one", "a.ma"), dst],
+        [os.path.join(str(tmpdir), "two", "a.ma"), dst],
+    ])
+
+    key = os.path.normcase(os.path.normpath(dst))
+    assert list(plan.collisions) == [key]
+    assert len(plan.collisions[key]) == 2
+    assert list(plan.case_collisions) == [key.lower()]
+    with pytest.raises(RuntimeError) as exc:
+        plan.validate()
+    assert "Non-unique file transfers" in str(exc.value)
+
+
+@pytest.mark.skipif(sys.platform.startswith("win32"),
+                    reason="Paths are case insensitive on Windows")
+def test_transfer_plan_case_collisions(tmpdir):
+    plan = transfer.TransferPlan([
+        [str(tmpdir.join("diffuse.tx")), str(tmpdir.join("pub", "a.tx"))],
+        [str(tmpdir.join("specular.tx")), str(tmpdir.join("pub", "A.tx"))],
+    ])
+
+    # Only a collision on case insensitive filesystems
+    assert not plan.collisions
+    plan.validate()
+    assert list(plan.case_collisions) == [
+        str(tmpdir.join("pub", "a.tx")).lower()
+    ]
+
+
+def _journal_copy(journal, src, dst):
+    transfer.ensure_directory(os.path.dirname(dst))
+    checksum = transfer.copy_file_checksum(src, dst)
+    journal.record(src, dst, checksum=checksum)
+    return checksum
+
+
+def test_journal_resume(tmpdir):
+    partial = str(tmpdir.join(".v001.partial"))
+    src = str(tmpdir.join("a.abc"))
+    dst = os.path.join(partial, "cache", "a.abc")
+    _write(src, b"data")
+
+    journal = transfer.TransferJournal(partial)
+    checksum = _journal_copy(journal, src, dst)
+    journal.close()
+
+    # Simulate a process that died while writing the next entry
+    with open(journal.path, "a") as f:
+        f.write('{"src": "b.abc", "dst": "cac')
+
+    entry = transfer.TransferJournal(partial).get_completed(src, dst)
+    assert entry["checksum"] == checksum
+    assert transfer.TransferJournal(partial).get_sources() == {src}
+
+    # The destinations are relative so the directory may be renamed
+    directory = str(tmpdir.join("v001"))
+    os.rename(partial, directory)
+    renamed = os.path.join(directory, "cache", "a.abc")
+    assert transfer.TransferJournal(directory).get_completed(src, renamed)
+
+    transfer.TransferJournal(directory).remove()
+    assert not transfer.TransferJournal(directory).get_completed(src,
+                                                                 renamed)
+
+
+def test_journal_resume_changed_files(tmpdir):
+    partial = str(tmpdir.join(".v001.partial"))
+    src = str(tmpdir.join("a.abc"))
+    dst = os.path.join(partial, "a.abc")
+    _write(src, b"data")
+
+    journal = transfer.TransferJournal(partial)
+    _journal_copy(journal, src, dst)
+    journal.close()
+
+    def get_completed():
+        return transfer.TransferJournal(partial).get_completed(src, dst)
+
+    # Other source for the same destination
+    assert not transfer.TransferJournal(partial).get_completed(
+        str(tmpdir.join("b.abc")), dst
+    )
+
+    # Destination was corrupted with the same size
+    _write(dst, b"dat!")
+    assert not get_completed()
+
+    # Source changed after it was copied
+    _write(dst, b"data")
+    assert get_completed()
+    stat = os.stat(src)
+    os.utime(src, (stat.st_atime, stat.st_mtime + 10))
+    assert not get_completed()
+
+    os.remove(src)
+    assert not get_completed()
+
+
+def test_journal_resume_moved_file(tmpdir):
+    partial = str(tmpdir.join(".v001.partial"))
+    src = str(tmpdir.join("a.abc"))
+    dst = os.path.join(partial, "a.abc")
+    _write(src, b"data")
+    os.makedirs(partial)
+    os.rename(src, dst)
+
+    journal = transfer.TransferJournal(partial)
+    journal.record(src, dst, moved=True)
+    journal.close()
+
+    assert transfer.TransferJournal(partial).get_completed(src, dst)
+
+    # A new file at the source was not transferred yet
+    _write(src, b"data")
+    assert not transfer.TransferJournal(partial).get_completed(src, dst)
+
+
+def test_replace_file_symlink_across_drives(tmpdir, monkeypatch):
+    src = str(tmpdir.join("src.usd"))
+    dst = str(tmpdir.join("master", "dst.usd"))
+    _write(src, b"new")
+
+    def relpath(path, start=None):
+        raise ValueError("path is on mount 'P:', start on mount 'C:'")
+
+    monkeypatch.setattr(os.path, "relpath", relpath)
+    assert transfer.replace_file(src, dst, mode="symlink") == "copy"
+    assert not os.path.islink(dst)
+    assert _read(dst) == b"new"
+
+
+def test_resource_store_deduplicates_content(tmpdir):
+    store = transfer.ResourceStore(str(tmpdir.join("store")))
+    src = str(tmpdir.join("staging", "diffuse.1001.tx"))
+    tmpdir.join("staging").ensure(dir=True)
+    _write(src, b"texture")
+
+    blob, is_new = store.add(src)
+    assert is_new
+    assert blob == store.get_blob_path(transfer.hash_file(src), ".tx")
+    assert store.add(src) == (blob, False)
+
+    # Identical content of another file is stored by the same blob
+    other = str(tmpdir.join("staging", "other.TX"))
+    _write(other, b"texture")
+    assert store.add(other) == (blob, False)
+    assert len(os.listdir(os.path.dirname(blob))) == 1
+
+
+def test_resource_store_transfer_links_blob(tmpdir):
+    store = transfer.ResourceStore(str(tmpdir.join("store")))
+    src = str(tmpdir.join("diffuse.tx"))
+    _write(src, b"texture")
+
+    dst = str(tmpdir.join("v001", "resources", "diffuse.tx"))
+    digest = store.transfer(src, dst)
+    assert digest == transfer.hash_file(src)
+    assert _read(dst) == b"texture"
+    assert os.path.samefile(dst, store.get_blob_path(digest, ".tx"))
+
+
+def _create_tree(root):
+    root.join("a", "b", "file.txt").write("data", ensure=True)
+    root.join("c.txt").write("data")
+    return str(root)
+
+
+def test_remove_tree_does_not_follow_symlinks(tmpdir):
+    outside = tmpdir.join("outside")
+    outside.join("keep.txt").write("data", ensure=True)
+
+    path = _create_tree(tmpdir.join("staging"))
+    if hasattr(os, "symlink"):
+        os.symlink(str(outside), os.path.join(path, "link"))
+
+    transfer.remove_tree(path)
+    assert not os.path.exists(path)
+    assert outside.join("keep.txt").check(file=True)
+
+
+def test_background_cleaner_removes_in_background(tmpdir, monkeypatch):
+    path = _create_tree(tmpdir.join("staging"))
+    started = threading.Event()
+    release = threading.Event()
+    remove_tree = transfer.remove_tree
+
+    def slow_remove_tree(path):
+        started.set()
+        assert release.wait(5)
+        remove_tree(path)
+
+    monkeypatch.setattr(transfer, "remove_tree", slow_remove_tree)
+    cleaner = transfer.BackgroundCleaner()
+    cleaner.remove(path, roots=[str(tmpdir)])
+
+    # The removal is still running when `remove` returns
+    assert started.wait(5)
+    assert os.path.exists(path)
+
+    release.set()
+    cleaner.wait(5)
+    assert not os.path.exists(path)
+
+
+def test_background_cleaner_refuses_paths_outside_roots(tmpdir):
+    path = _create_tree(tmpdir.join("publish"))
+    cleaner = transfer.BackgroundCleaner()
+    for roots in [[str(tmpdir.join("staging"))], [None], [path]]:
+        with pytest.raises(ValueError):
+            cleaner.remove(path, roots=roots)
+
+    cleaner.wait(5)
+    assert os.path.exists(path)
+
+
+def test_background_cleaner_continues_after_failure(tmpdir):
+    missing = str(tmpdir.join("missing"))
+    path = _create_tree(tmpdir.join("staging"))
+
+    cleaner = transfer.BackgroundCleaner()
+    cleaner.remove(missing, roots=[str(tmpdir)])
+    cleaner.remove(path, roots=[str(tmpdir)])
+    cleaner.wait(5)
+    assert not os.path.exists(path)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("max_workers", [1, 8])
+def test_benchmark_transfer_sequence(tmpdir, timer, max_workers):
+    # Publish a synthetic sequence of 2000 frames of 32 KiB
+    staging = tmpdir.join("staging")
+    staging.ensure(dir=True)
+    transfers = list()
+    for frame in range(1001, 3001):
+        name = "beauty.%04d.exr" % frame
+        src = staging.join(name)
+        src.write_binary(os.urandom(32 * 1024))
+        transfers.append((str(src), str(tmpdir.join("publish", name))))
+
+    executor = transfer.TransferExecutor(max_workers=max_workers)
+    timer("%i workers" % max_workers, executor.execute, transfers)
+
+    assert all(_read(src) == _read(dst) for src, dst in transfers)
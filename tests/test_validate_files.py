@@ -0,0 +1,205 @@
+import os
+import logging
+import importlib.util
+
+import pytest
+
+pytest.importorskip("avalon.api")
+pytest.importorskip("pyblish.api")
+
+from colorbleed import transfer  # noqa: E402
+
+PLUGINS = os.path.join(os.path.dirname(__file__), "..", "colorbleed",
+                       "plugins", "global", "publish")
+
+
+def _load_plugin(name):
+    """Return the publish plug-in module, the folder is not a package"""
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(PLUGINS, name + ".py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Context(object):
+    def __init__(self):
+        self.data = dict()
+
+
+class Instance(object):
+    def __init__(self, data):
+        self.data = data
+        self.context = Context()
+
+
+@pytest.fixture
+def listings(monkeypatch):
+    """Record the directories that are listed"""
+    listings = list()
+    scandir = transfer._scandir
+
+    def counting_scandir(path):
+        listings.append(os.path.normcase(os.path.abspath(path)))
+        return scandir(path)
+
+    monkeypatch.setattr(transfer, "_scandir", counting_scandir)
+    return listings
+
+
+def _write_sequence(directory, frames):
+    """Write the frames with their size in bytes, None for a missing frame"""
+    directory.ensure(dir=True)
+    names = list()
+    for frame, size in frames:
+        name = "beauty.%04d.exr" % frame
+        if size is not None:
+            directory.join(name).write_binary(b"\x00" * size)
+        names.append(name)
+    return names
+
+
+def test_validate_files_exist(tmpdir, listings, caplog):
+    plugin = _load_plugin("validate_files_exist").ValidateFilesExist()
+    plugin.log = logging.getLogger("test_validate_files")
+
+    files = _write_sequence(tmpdir, [(1001, 1000),
+                                     (1002, 1000),
+                                     (1003, None),
+                                     (1004, 0),
+                                     (1005, 20),
+                                     (1006, 1000)])
+    instance = Instance({"stagingDir": str(tmpdir),
+                         "files": [files, "beauty.exr"]})
+
+    with caplog.at_level(logging.WARNING), pytest.raises(RuntimeError):
+        plugin.process(instance)
+
+    messages = dict((record.getMessage(), record.levelname)
+                    for record in caplog.records)
+    assert messages == {
+        "File does not exist: %s" % tmpdir.join(files[2]): "ERROR",
+        "File is empty: %s" % tmpdir.join(files[3]): "ERROR",
+        "File may be truncated: %s (20 bytes)" % tmpdir.join(files[4]):
+            "WARNING",
+        "File does not exist: %s" % tmpdir.join("beauty.exr"): "ERROR",
+    }
+
+    # The folder is only listed once for all of the files
+    assert listings == [os.path.normcase(str(tmpdir))]
+
+
+def test_validate_files_exist_valid(tmpdir, listings):
+    plugin = _load_plugin("validate_files_exist").ValidateFilesExist()
+    files = _write_sequence(tmpdir, [(frame, 1000)
+                                     for frame in range(1001, 1101)])
+
+    plugin.process(Instance({"stagingDir": str(tmpdir), "files": [files]}))
+    assert len(listings) == 1
+
+
+@pytest.mark.parametrize("sizes, expected", [
+    ({"a": 100, "b": 100}, []),
+    ({"a": 100, "b": 100, "c": 5}, ["c"]),
+    ({"a": 100, "b": 100, "c": 10}, []),
+    ({"a": 100, "b": 100, "c": 5, "d": 0, "e": None}, ["c"]),
+])
+def test_get_truncated_files(sizes, expected):
+    module = _load_plugin("validate_files_exist")
+    assert module.get_truncated_files(sizes, 0.1) == expected
+
+
+def test_validate_resources(tmpdir, listings):
+    plugin = _load_plugin("validate_resources").ValidateResources()
+    textures = tmpdir.join("textures")
+    files = [str(textures.join(name))
+             for name in _write_sequence(textures, [(1001, 100),
+                                                    (1002, 100)])]
+    resources = [{"source": files[0], "files": files}]
+
+    plugin.process(Instance({"resources": resources}))
+    assert listings == [os.path.normcase(str(textures))]
+
+    textures.join("beauty.1002.exr").write_binary(b"")
+    with pytest.raises(AssertionError) as exc:
+        plugin.process(Instance({"resources": resources}))
+    assert "Found empty files" in str(exc.value)
+
+    resources[0]["files"].append(str(textures.join("missing.exr")))
+    with pytest.raises(AssertionError) as exc:
+        plugin.process(Instance({"resources": resources}))
+    assert "non-existing files" in str(exc.value)
+
+
+class CountingEntry(object):
+    """Directory entry that records its stat calls"""
+
+    def __init__(self, entry, stats):
+        self._entry = entry
+        self._stats = stats
+        self.name = entry.name
+        self.path = entry.path
+
+    def is_file(self, *args, **kwargs):
+        return self._entry.is_file(*args, **kwargs)
+
+    def is_dir(self, *args, **kwargs):
+        return self._entry.is_dir(*args, **kwargs)
+
+    def stat(self, *args, **kwargs):
+        self._stats.append(os.path.normcase(self.path))
+        return self._entry.stat(*args, **kwargs)
+
+
+def test_stat_cache_shared_by_publish(tmpdir, monkeypatch):
+    stats = list()
+    scandir = transfer._scandir
+    stat = os.stat
+
+    def counting_scandir(path):
+        return [CountingEntry(entry, stats) for entry in scandir(path)]
+
+    def counting_stat(path, *args, **kwargs):
+        stats.append(os.path.normcase(os.path.abspath(path)))
+        return stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(transfer, "_scandir", counting_scandir)
+    monkeypatch.setattr(transfer.os, "stat", counting_stat)
+
+    staging = tmpdir.join("staging")
+    files = _write_sequence(staging, [(frame, 100)
+                                      for frame in range(1001, 1011)])
+    sources = [str(staging.join(name)) for name in files]
+    instance = Instance({"stagingDir": str(staging),
+                         "files": [files],
+                         "resources": [{"source": sources[0],
+                                        "files": sources}]})
+
+    _load_plugin("validate_files_exist").ValidateFilesExist().process(
+        instance)
+    _load_plugin("validate_resources").ValidateResources().process(instance)
+
+    directory = tmpdir.join("publish", "v001")
+    journal = transfer.TransferJournal(
+        str(directory), stat_cache=transfer.get_stat_cache(instance.context)
+    )
+    for src in sources:
+        # The copy itself stats the files outside of the stat cache
+        dst = str(directory.join(os.path.basename(src)))
+        count = len(stats)
+        transfer.copy_file(src, dst)
+        del stats[count:]
+        journal.record(src, dst, checksum="0")
+    journal.close()
+
+    sources = [os.path.normcase(src) for src in sources]
+    assert all(stats.count(src) == 1 for src in sources)
+
+    # Written files are statted again once invalidated
+    cache = transfer.get_stat_cache(instance.context)
+    cache.invalidate(sources[:1])
+    assert cache.exists(sources[0])
+    assert cache.exists(sources[1])
+    assert stats.count(sources[0]) == 2
+    assert stats.count(sources[1]) == 1